@@ -2,130 +2,326 @@
 AI Chatbot service using OpenAI API for hotel management insights
 """
 import os
-import sqlite3
-import datetime
-import json
-from typing import Dict, Any, List
-import openai
+import re
+import time
+import threading
+from collections import Counter
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from dotenv import load_dotenv
+from hotel_metrics import HotelMetrics
+from response_cache import ResponseCache, normalize_question, snapshot_hash
+from llm_gateway import LLMGateway, LLMUnavailable
 
 load_dotenv()
 
-class HotelAIChatbot:
+CHAT_MODEL = "provider-3/gpt-4.1-nano"
+
+# Questions about a single figure from the analytics dict, answered without
+# the LLM. Checked in this order; a question can match several.
+INTENT_PATTERNS = [
+    ('occupancy', re.compile(r"\b(occupancy|occupied|how (full|busy)\b(?!.*\b(next|coming|upcoming)\b)|vacan\w*|(rooms?|beds?) (are |is )?"
+                             r"(free|available|empty|taken|booked)|available rooms?|free rooms?)")),
+    ('checkins', re.compile(r"\b(check[- ]?ins?|checking in|arriv\w*)\b")),
+    ('checkouts', re.compile(r"\b(check[- ]?outs?|checking out|depart\w*|leaving)\b")),
+    ('revenue', re.compile(r"\b(revenue|earn\w*|income|sales|turnover|how much (money|did|have|have i)\b.*\b(make|made|earn\w*))")),
+    ('pending_payments', re.compile(r"\b(pending|unpaid|outstanding|owed?|dues?|not (yet )?paid)\b")),
+    ('upcoming', re.compile(r"\b(upcoming|next (7|seven) days|next week|coming (up|week))\b")),
+    ('room_types', re.compile(r"\b(room types?|by type|per type|breakdown|each type)\b")),
+]
+
+# Advice, explanations and periods the analytics don't cover go to the LLM
+OPEN_ENDED = re.compile(r"\b(why|should|suggest\w*|recommend\w*|improve|increase|boost|grow|strategy|strategies|"
+                        r"advice|advise|tips?|ideas?|predict\w*|forecast\w*|compare|comparison|explain|plan|"
+                        r"trend\w*|analy[sz]\w*|tomorrow|yesterday|last|previous|year\w*|annual|quarter\w*|"
+                        r"guest names?|who|which guests?|email|write|draft)\b")
+
+# Dates and periods; the analytics only have figures for today, except those
+# listed per intent in INTENT_PERIODS, so a figure question scoped to any
+# other date or period goes to the LLM
+PERIOD = re.compile(r"\b(next|coming|past|ago|weekends?|weeks?|weekly|months?|monthly|days|nights|"
+                    r"(mon|tues|wednes|thurs|fri|satur|sun)days?|january|february|march|april|june|july|"
+                    r"august|september|october|november|december|(in|on|for|during) may|"
+                    r"\d{1,4}[-/.]\d{1,2}([-/.]\d{1,4})?|\d{1,2}(st|nd|rd|th))\b")
+
+INTENT_PERIODS = {
+    'revenue': re.compile(r"\b((this|current) (week|month)|weekly|monthly)\b"),
+    'upcoming': re.compile(r"\b(next (7|seven) days|(next|coming) week|coming up)\b"),
+}
+
+# Labelled owner questions the patterns are scored against (see evaluate_router);
+# [] marks questions that need the LLM
+INTENT_EXAMPLES = [
+    ("What is my occupancy rate today?", ['occupancy']),
+    ("What's the occupancy?", ['occupancy']),
+    ("How full is the hotel?", ['occupancy']),
+    ("How many rooms are free?", ['occupancy']),
+    ("How many rooms are available right now?", ['occupancy']),
+    ("Any vacancies tonight?", ['occupancy']),
+    ("How many rooms are occupied", ['occupancy']),
+    ("How many check-ins do I have today?", ['checkins']),
+    ("checkins today", ['checkins']),
+    ("How many guests are arriving today?", ['checkins']),
+    ("Any arrivals today?", ['checkins']),
+    ("How many check-outs today?", ['checkouts']),
+    ("Who is checking out", []),
+    ("How many guests are leaving today?", ['checkouts']),
+    ("Is anyone due to leave today?", ['checkouts']),
+    ("Room-nights sold this month?", []),
+    ("Check-ins and check-outs today?", ['checkins', 'checkouts']),
+    ("How much revenue did I make this month?", ['revenue']),
+    ("What's today's revenue?", ['revenue']),
+    ("How much money did I make this week?", ['revenue']),
+    ("Total earnings this month", ['revenue']),
+    ("Show me my income", ['revenue']),
+    ("sales this week", ['revenue']),
+    ("Any pending payments?", ['pending_payments']),
+    ("How much is still unpaid?", ['pending_payments']),
+    ("What's outstanding?", ['pending_payments']),
+    ("Which bookings have not paid yet?", ['pending_payments']),
+    ("How many upcoming bookings?", ['upcoming']),
+    ("Bookings in the next 7 days", ['upcoming']),
+    ("How busy is next week?", ['upcoming']),
+    ("Show me the breakdown by room type", ['room_types']),
+    ("Occupancy per room type", ['occupancy', 'room_types']),
+    ("Which room type sells best?", ['room_types']),
+    ("Revenue and occupancy today", ['occupancy', 'revenue']),
+    ("How can I increase occupancy?", []),
+    ("Why is revenue down?", []),
+    ("Suggest ways to boost weekend bookings", []),
+    ("What should I charge for the deluxe suite?", []),
+    ("Predict occupancy for next month", []),
+    ("Compare this month's revenue with last month", []),
+    ("What were bookings last month?", []),
+    ("How many check-ins tomorrow?", []),
+    ("Who checks in today?", []),
+    ("How many rooms are booked next month?", []),
+    ("How many check-ins on Friday?", []),
+    ("What was occupancy on 2024-05-01?", []),
+    ("Check-outs this weekend?", []),
+    ("How many arrivals this week?", []),
+    ("Occupancy for the next 7 days", []),
+    ("Revenue next month", []),
+    ("Revenue and occupancy this month", []),
+    ("Pending payments on 12/05", []),
+    ("How many arrivals on the 3rd?", []),
+    ("Write a welcome message for guests", []),
+    ("Draft a reply to a guest complaint", []),
+    ("Give me tips for better reviews", []),
+    ("Explain my revenue trend", []),
+    ("hello", []),
+    ("Thanks!", []),
+    ("What can you do?", []),
+    ("How do I add a new room?", []),
+    ("What's the weather like?", []),
+]
+
+
+def classify_intent(message: str) -> List[str]:
+    """Figures a question asks for, or [] if it needs the LLM"""
+    text = normalize_question(message)
+    if not text or OPEN_ENDED.search(text):
+        return []
+    intents = [intent for intent, pattern in INTENT_PATTERNS if pattern.search(text)]
+    for intent in intents:
+        covered = INTENT_PERIODS.get(intent)
+        if PERIOD.search(covered.sub(' ', text) if covered else text):
+            return []
+    return intents
+
+
+def answer_intents(intents: List[str], message: str, analytics: Dict[str, Any]) -> str:
+    """Answer classified intents straight from the analytics dict"""
+    total = analytics.get('total_rooms', 0)
+    occupied = analytics.get('occupied_rooms', 0)
+    text = normalize_question(message)
+    lines = []
+    for intent in intents:
+        if intent == 'occupancy':
+            lines.append(f"🏨 Current occupancy: {occupied}/{total} rooms "
+                         f"({occupied / max(total, 1) * 100:.1f}%), {total - occupied} available")
+        elif intent == 'checkins':
+            lines.append(f"🛎️ Today's check-ins: {analytics.get('today_checkins', 0)}")
+        elif intent == 'checkouts':
+            lines.append(f"🧳 Today's check-outs: {analytics.get('today_checkouts', 0)}")
+        elif intent == 'revenue':
+            periods = [(label, key) for word, label, key in (('today', 'Today', 'today_revenue'),
+                                                             ('week', 'Last 7 days', 'weekly_revenue'),
+                                                             ('month', 'This month', 'monthly_revenue'))
+                       if word in text]
+            periods = periods or [('Today', 'today_revenue'), ('Last 7 days', 'weekly_revenue'),
+                                  ('This month', 'monthly_revenue')]
+            lines.append('💰 Revenue - ' + ', '.join(f"{label}: ${analytics.get(key, 0):.2f}"
+                                                    for label, key in periods))
+        elif intent == 'pending_payments':
+            lines.append(f"⏳ {analytics.get('pending_payments_count', 0)} pending payments "
+                         f"(${analytics.get('pending_payments_amount', 0):.2f})")
+        elif intent == 'upcoming':
+            lines.append(f"📅 Upcoming bookings (next 7 days): {analytics.get('upcoming_bookings', 0)}")
+        elif intent == 'room_types':
+            breakdown = analytics.get('room_breakdown', [])
+            lines.append("🛏️ Rooms by type:\n" + (
+                "\n".join(f"- {room_type}: {occupied_count}/{count} occupied"
+                          for room_type, count, occupied_count in breakdown) or "No room data available"))
+    return "\n".join(lines)
+
+
+class IntentRouter:
+    """Counts how many questions are answered locally vs. sent to the LLM"""
+
     def __init__(self):
-        self.client = openai.OpenAI(
-            api_key=os.getenv('OPENAI_API_KEY'),
-            base_url=os.getenv('OPENAI_BASE_URL', 'https://api.a4f.co/v1')
-        )
+        self._lock = threading.Lock()
+        self._local = Counter()
+        self._llm = 0
+
+    def route(self, message: str) -> List[str]:
+        intents = classify_intent(message)
+        with self._lock:
+            if intents:
+                self._local.update(intents)
+                self._local['_answered'] += 1
+            else:
+                self._llm += 1
+        return intents
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            local = self._local['_answered']
+            total = local + self._llm
+            return {
+                'questions': total,
+                'answered_locally': local,
+                'sent_to_llm': self._llm,
+                'local_rate': round(local / total, 4) if total else 0.0,
+                'intents': {intent: count for intent, count in self._local.items() if intent != '_answered'},
+            }
+
+
+def evaluate_router(examples: Iterable[Tuple[str, List[str]]]) -> Dict[str, Any]:
+    """Score classify_intent against (question, expected intents) pairs; [] means "needs the LLM".
+
+    A misclassification is a question answered locally that should have gone
+    to the LLM or got the wrong figures; a missed route is a figure question
+    sent to the LLM anyway (slower, but still answered).
+    """
+    results = {'questions': 0, 'routed_locally': 0, 'misclassified': 0, 'missed_routes': 0, 'errors': []}
+    start = time.perf_counter()
+    for question, expected in examples:
+        intents = classify_intent(question)
+        results['questions'] += 1
+        results['routed_locally'] += bool(intents)
+        if intents and sorted(intents) != sorted(expected):
+            results['misclassified'] += 1
+            results['errors'].append((question, expected, intents))
+        elif expected and not intents:
+            results['missed_routes'] += 1
+            results['errors'].append((question, expected, intents))
+    elapsed = time.perf_counter() - start
+    count = max(results['questions'], 1)
+    results['routing_rate'] = results['routed_locally'] / count
+    results['misclassification_rate'] = results['misclassified'] / count
+    results['microseconds_per_question'] = elapsed / count * 1e6
+    return results
+
+class HotelAIChatbot:
+    def __init__(self, metrics: Optional[HotelMetrics] = None, cache: Optional[ResponseCache] = None,
+                 gateway: Optional[LLMGateway] = None):
+        self.gateway = gateway or LLMGateway()
         self.db_name = 'multi_hotel.db'
+        self.metrics = metrics or HotelMetrics(self.db_name)
+        self.cache = cache or ResponseCache()
+        self.router = IntentRouter()
     
     def get_hotel_analytics(self, hotel_id: int) -> Dict[str, Any]:
         """Get comprehensive hotel analytics data"""
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        today = datetime.datetime.now().strftime("%Y-%m-%d")
-        week_start = (datetime.datetime.now() - datetime.timedelta(days=7)).strftime("%Y-%m-%d")
-        month_start = datetime.datetime.now().replace(day=1).strftime("%Y-%m-%d")
-        
+        try:
+            return self.metrics.get_metrics(hotel_id)
+        except Exception as e:
+            print(f"Error getting analytics: {e}")
+            return {}
+    
+    def generate_response(self, hotel_id: int, user_message: str) -> str:
+        """Generate AI response based on user query and hotel data.
+
+        Questions about a figure the analytics already hold (occupancy,
+        check-ins, revenue, ...) are answered locally without an API call.
+        Other answers are cached per hotel, normalized question and analytics
+        snapshot, so a repeated question is only sent upstream again once the
+        hotel's figures change or the entry expires. If the model is busy or
+        misses its deadline, the quick-insights summary is returned instead.
+        """
         analytics = {}
-        
         try:
-            # Hotel basic info
-            cursor.execute('SELECT name FROM hotels WHERE id = ?', (hotel_id,))
-            analytics['hotel_name'] = cursor.fetchone()[0]
-            
-            # Total rooms
-            cursor.execute('SELECT COUNT(*) FROM rooms WHERE hotel_id = ? AND is_active = 1', (hotel_id,))
-            analytics['total_rooms'] = cursor.fetchone()[0]
-            
-            # Today's check-ins
-            cursor.execute('''
-                SELECT COUNT(*) FROM bookings 
-                WHERE hotel_id = ? AND check_in_date = ? AND booking_status = 'confirmed'
-            ''', (hotel_id, today))
-            analytics['today_checkins'] = cursor.fetchone()[0]
-            
-            # Today's check-outs
-            cursor.execute('''
-                SELECT COUNT(*) FROM bookings 
-                WHERE hotel_id = ? AND check_out_date = ? AND booking_status = 'confirmed'
-            ''', (hotel_id, today))
-            analytics['today_checkouts'] = cursor.fetchone()[0]
-            
-            # Current occupancy
-            cursor.execute('''
-                SELECT COUNT(DISTINCT r.id)
-                FROM rooms r
-                JOIN bookings b ON r.id = b.room_id
-                WHERE r.hotel_id = ? AND b.booking_status = 'confirmed'
-                AND b.check_in_date <= ? AND b.check_out_date > ?
-            ''', (hotel_id, today, today))
-            analytics['occupied_rooms'] = cursor.fetchone()[0]
-            
-            # Daily revenue
-            cursor.execute('''
-                SELECT COALESCE(SUM(total_amount), 0) FROM bookings 
-                WHERE hotel_id = ? AND check_in_date = ? AND booking_status = 'confirmed' AND payment_status = 'paid'
-            ''', (hotel_id, today))
-            analytics['today_revenue'] = cursor.fetchone()[0]
-            
-            # Weekly revenue
-            cursor.execute('''
-                SELECT COALESCE(SUM(total_amount), 0) FROM bookings 
-                WHERE hotel_id = ? AND check_in_date >= ? AND booking_status = 'confirmed' AND payment_status = 'paid'
-            ''', (hotel_id, week_start))
-            analytics['weekly_revenue'] = cursor.fetchone()[0]
-            
-            # Monthly revenue
-            cursor.execute('''
-                SELECT COALESCE(SUM(total_amount), 0) FROM bookings 
-                WHERE hotel_id = ? AND check_in_date >= ? AND booking_status = 'confirmed' AND payment_status = 'paid'
-            ''', (hotel_id, month_start))
-            analytics['monthly_revenue'] = cursor.fetchone()[0]
-            
-            # Pending payments
-            cursor.execute('''
-                SELECT COUNT(*), COALESCE(SUM(total_amount), 0) FROM bookings 
-                WHERE hotel_id = ? AND payment_status = 'pending' AND booking_status = 'confirmed'
-            ''', (hotel_id,))
-            pending_data = cursor.fetchone()
-            analytics['pending_payments_count'] = pending_data[0]
-            analytics['pending_payments_amount'] = pending_data[1]
+            analytics = self.get_hotel_analytics(hotel_id)
+            intents = self.router.route(user_message) if analytics else []
+            if intents:
+                return answer_intents(intents, user_message, analytics)
             
-            # Room type breakdown
-            cursor.execute('''
-                SELECT r.room_type, COUNT(*) as total, 
-                       COUNT(CASE WHEN b.check_in_date <= ? AND b.check_out_date > ? AND b.booking_status = 'confirmed' THEN 1 END) as occupied
-                FROM rooms r
-                LEFT JOIN bookings b ON r.id = b.room_id
-                WHERE r.hotel_id = ? AND r.is_active = 1
-                GROUP BY r.room_type
-            ''', (today, today, hotel_id))
-            analytics['room_breakdown'] = cursor.fetchall()
+            complete = lambda: self._complete(self._build_context(analytics), user_message)
+            if not analytics:
+                return complete()
             
-            # Upcoming bookings (next 7 days)
-            next_week = (datetime.datetime.now() + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
-            cursor.execute('''
-                SELECT COUNT(*) FROM bookings 
-                WHERE hotel_id = ? AND check_in_date BETWEEN ? AND ? AND booking_status = 'confirmed'
-            ''', (hotel_id, today, next_week))
-            analytics['upcoming_bookings'] = cursor.fetchone()[0]
+            key = (hotel_id, normalize_question(user_message), snapshot_hash(analytics))
+            response, _ = self.cache.get_or_compute(key, complete)
+            return response
             
+        except LLMUnavailable:
+            return self._fallback_response(analytics)
         except Exception as e:
-            print(f"Error getting analytics: {e}")
+            return f"I'm sorry, I'm having trouble accessing the hotel data right now. Error: {str(e)}"
+    
+    def stream_response(self, hotel_id: int, user_message: str) -> Iterator[str]:
+        """Yield the answer as text pieces as the model produces them.
+
+        Local and cached answers are yielded in one piece; a fresh one is
+        streamed from the API and cached once complete. If the model is busy or
+        doesn't finish within the gateway's deadline, the quick-insights summary
+        is yielded instead (after the partial answer, which is not cached);
+        other errors propagate to the caller.
+        """
+        analytics = self.get_hotel_analytics(hotel_id)
+        intents = self.router.route(user_message) if analytics else []
+        if intents:
+            yield answer_intents(intents, user_message, analytics)
+            return
+        
+        key = (hotel_id, normalize_question(user_message), snapshot_hash(analytics)) if analytics else None
+        cached = self.cache.get(key) if key else None
+        if cached is not None:
+            yield cached
+            return
+        
+        start = time.perf_counter()
+        stream = self.gateway.stream(
+            [
+                {"role": "system", "content": self._build_context(analytics)},
+                {"role": "user", "content": user_message}
+            ],
+            model=CHAT_MODEL,
+            max_tokens=500,
+            temperature=0.7
+        )
+        pieces = []
+        try:
+            for delta in stream:
+                # Leading whitespace of the answer is dropped, as in generate_response
+                if not pieces:
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                pieces.append(delta)
+                yield delta
+        except LLMUnavailable:
+            yield ('\n\n' if pieces else '') + self._fallback_response(analytics)
+            return
         finally:
-            conn.close()
+            stream.close()
         
-        return analytics
+        if key:
+            self.cache.put(key, ''.join(pieces).strip(), time.perf_counter() - start)
     
-    def generate_response(self, hotel_id: int, user_message: str) -> str:
-        """Generate AI response based on user query and hotel data"""
-        try:
-            analytics = self.get_hotel_analytics(hotel_id)
-            
-            # Create context for the AI
-            context = f"""
+    def _build_context(self, analytics: Dict[str, Any]) -> str:
+        """System prompt describing the hotel's current figures"""
+        return f"""
             You are an AI assistant for {analytics.get('hotel_name', 'the hotel')} management system. 
             
             Current hotel data:
@@ -138,6 +334,7 @@ class HotelAIChatbot:
             - Today's Revenue: ${analytics.get('today_revenue', 0):.2f}
             - Weekly Revenue: ${analytics.get('weekly_revenue', 0):.2f}
             - Monthly Revenue: ${analytics.get('monthly_revenue', 0):.2f}
+            - Room-nights Sold This Month: {analytics.get('monthly_room_nights', 0)}
             - Pending Payments: {analytics.get('pending_payments_count', 0)} bookings (${analytics.get('pending_payments_amount', 0):.2f})
             - Upcoming Bookings (next 7 days): {analytics.get('upcoming_bookings', 0)}
             
@@ -147,21 +344,25 @@ class HotelAIChatbot:
             Provide helpful, concise responses about hotel operations, analytics, and insights.
             Use emojis appropriately and format numbers clearly.
             """
-            
-            response = self.client.chat.completions.create(
-                model="provider-3/gpt-4.1-nano",
-                messages=[
-                    {"role": "system", "content": context},
-                    {"role": "user", "content": user_message}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            return response.choices[0].message.content.strip()
-            
-        except Exception as e:
-            return f"I'm sorry, I'm having trouble accessing the hotel data right now. Error: {str(e)}"
+    
+    def _complete(self, context: str, user_message: str) -> str:
+        """One upstream chat completion; raises on API errors so they aren't cached"""
+        response = self.gateway.complete(
+            [
+                {"role": "system", "content": context},
+                {"role": "user", "content": user_message}
+            ],
+            model=CHAT_MODEL,
+            max_tokens=500,
+            temperature=0.7
+        )
+        
+        return response.strip()
+    
+    def _fallback_response(self, analytics: Dict[str, Any]) -> str:
+        """Quick-insights summary for when the model can't answer in time"""
+        insights = self._insights(analytics)
+        return "⚡ The assistant is busy right now, so here is a quick snapshot:\n" + "\n".join(insights.values())
     
     def _format_room_breakdown(self, room_breakdown: List) -> str:
         """Format room breakdown data for context"""
@@ -178,8 +379,9 @@ class HotelAIChatbot:
     
     def get_quick_insights(self, hotel_id: int) -> Dict[str, str]:
         """Get pre-formatted quick insights"""
-        analytics = self.get_hotel_analytics(hotel_id)
-        
+        return self._insights(self.get_hotel_analytics(hotel_id))
+    
+    def _insights(self, analytics: Dict[str, Any]) -> Dict[str, str]:
         insights = {
             "occupancy": f"🏨 Current occupancy: {analytics.get('occupied_rooms', 0)}/{analytics.get('total_rooms', 0)} rooms ({(analytics.get('occupied_rooms', 0) / max(analytics.get('total_rooms', 1), 1) * 100):.1f}%)",
             "today_activity": f"📅 Today: {analytics.get('today_checkins', 0)} check-ins, {analytics.get('today_checkouts', 0)} check-outs",
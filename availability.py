@@ -0,0 +1,119 @@
+"""
+Room availability engine: answers "which rooms are free for [check_in, check_out)"
+for a whole hotel with a single set-based query.
+
+Plain searches are bit tests against the room_calendar occupancy bitmaps; a
+search that must ignore one booking (editing it) reads the bookings table,
+since the calendar doesn't record which booking holds a night.
+
+Rooms another clerk currently holds (room_holds) count as busy; pass the
+caller's own hold token to see the room it is holding as free.
+"""
+import time
+from typing import List, Dict, Optional
+import database
+import room_calendar
+
+# A booking blocks a room for [check_in_date, check_out_date); two stays overlap
+# when each starts before the other ends. Dates are ISO strings, so text
+# comparison is date comparison.
+_OVERLAPS = "b.booking_status = 'confirmed' AND b.check_in_date < ? AND b.check_out_date > ?"
+
+# A live room hold placed by anyone but the caller (token) that overlaps the range;
+# parameters are (now, token, check_out_date, check_in_date)
+_HELD = 'h.expires_at > ? AND h.token != ? AND h.check_in_date < ? AND h.check_out_date > ?'
+
+
+def overlapping_booking(cursor, room_id: int, check_in_date: str, check_out_date: str,
+                        exclude_booking_id: Optional[int] = None) -> Optional[int]:
+    """Id of a confirmed booking holding the room during the range, read on the caller's
+    connection so a write transaction can check and insert under the same lock"""
+    cursor.execute(f'''
+        SELECT b.id FROM bookings b
+        WHERE b.room_id = ? AND {_OVERLAPS} AND b.id != ?
+        LIMIT 1
+    ''', (room_id, check_out_date, check_in_date, exclude_booking_id or 0))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def overlapping_hold(cursor, room_id: int, check_in_date: str, check_out_date: str,
+                     token: Optional[str] = None, now: Optional[float] = None) -> bool:
+    """Whether someone other than the token's holder holds the room during the range,
+    read on the caller's connection like overlapping_booking"""
+    cursor.execute(f'''
+        SELECT EXISTS (SELECT 1 FROM room_holds h WHERE h.room_id = ? AND {_HELD})
+    ''', (room_id, now or time.time(), token or '', check_out_date, check_in_date))
+    return bool(cursor.fetchone()[0])
+
+
+class AvailabilityEngine:
+    def __init__(self, db_name: str = 'multi_hotel.db'):
+        self.db_name = db_name
+
+    def available_rooms(self, hotel_id: int, check_in_date: str, check_out_date: str,
+                        exclude_booking_id: Optional[int] = None,
+                        hold_token: Optional[str] = None) -> List[Dict]:
+        """Get every active room of a hotel that is free for the date range"""
+        if exclude_booking_id:
+            # Uncorrelated NOT IN: SQLite materialises the busy room ids once instead
+            # of probing bookings per room
+            busy = f'''
+                SELECT b.room_id FROM bookings b
+                WHERE b.hotel_id = ? AND {_OVERLAPS} AND b.id != ?
+            '''
+            busy_params = [hotel_id, check_out_date, check_in_date, exclude_booking_id]
+        else:
+            condition, busy_params = room_calendar.busy_condition(check_in_date, check_out_date)
+            busy = f'SELECT c.room_id FROM room_calendar c WHERE c.hotel_id = ? AND {condition}'
+            busy_params = [hotel_id] + busy_params
+        query = f'''
+            SELECT r.id, r.room_number, r.room_type, r.price_per_night, r.capacity
+            FROM rooms r
+            WHERE r.hotel_id = ? AND r.is_active = 1
+            AND r.id NOT IN ({busy})
+            AND r.id NOT IN (SELECT h.room_id FROM room_holds h WHERE h.hotel_id = ? AND {_HELD})
+        '''
+        params = [hotel_id] + busy_params + [hotel_id, time.time(), hold_token or '',
+                                             check_out_date, check_in_date]
+
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [{
+                'id': row[0],
+                'room_number': row[1],
+                'room_type': row[2],
+                'price_per_night': row[3],
+                'capacity': row[4]
+            } for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
+    def is_room_available(self, room_id: int, check_in_date: str, check_out_date: str,
+                          exclude_booking_id: Optional[int] = None,
+                          hold_token: Optional[str] = None) -> bool:
+        """Check a single room for the date range"""
+        if exclude_booking_id:
+            query = f'''
+                SELECT EXISTS (
+                    SELECT 1 FROM bookings b
+                    WHERE b.room_id = ? AND {_OVERLAPS} AND b.id != ?
+                )
+            '''
+            params = [room_id, check_out_date, check_in_date, exclude_booking_id]
+        else:
+            condition, params = room_calendar.busy_condition(check_in_date, check_out_date)
+            query = f'SELECT EXISTS (SELECT 1 FROM room_calendar c WHERE c.room_id = ? AND {condition})'
+            params = [room_id] + params
+        query += f' OR EXISTS (SELECT 1 FROM room_holds h WHERE h.room_id = ? AND {_HELD})'
+        params += [room_id, time.time(), hold_token or '', check_out_date, check_in_date]
+
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return not cursor.fetchone()[0]
+        finally:
+            conn.close()
@@ -0,0 +1,1076 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the multi-hotel platform
+
+Usage: python benchmarks.py [benchmark ...]   (no arguments runs all of them)
+"""
+import os
+import sys
+import time
+import random
+import sqlite3
+import datetime
+import tempfile
+import statistics
+
+# The chatbot's LLM gateway needs an API key to build its client
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+import database
+import room_calendar
+from multi_hotel_app import setup_database
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register a benchmark function under a command-line name"""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def measure(func, repeat=20):
+    """Run func repeatedly and return the median wall time in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def temp_database():
+    """Create an empty multi-hotel database in a temporary directory"""
+    db_name = os.path.join(tempfile.mkdtemp(prefix='hotel_bench_'), 'multi_hotel.db')
+    setup_database(db_name)
+    return db_name
+
+
+def seed_hotel(db_name, room_count, bookings_per_room=4, hotel_id=1, start_date=None):
+    """Insert one hotel with room_count rooms and back-to-back bookings per room"""
+    start_date = start_date or datetime.date.today()
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    rng = random.Random(hotel_id)
+
+    conn = database.connect(db_name)
+    cursor = conn.cursor()
+    cursor.execute('''
+    INSERT INTO hotels (id, name, address, owner_name, owner_email, created_at)
+    VALUES (?, ?, 'Benchmark Street', 'Owner', 'owner@example.com', ?)
+    ''', (hotel_id, f'Benchmark Hotel {hotel_id}', now))
+
+    rooms = [(hotel_id, f'{hotel_id}-{n:05d}', rng.choice(['Standard', 'Deluxe', 'Suite']),
+              100.0, 2, now) for n in range(room_count)]
+    cursor.executemany('''
+    INSERT INTO rooms (hotel_id, room_number, room_type, price_per_night, capacity, created_at)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ''', rooms)
+    cursor.execute('SELECT id FROM rooms WHERE hotel_id = ?', (hotel_id,))
+    room_ids = [row[0] for row in cursor.fetchall()]
+
+    bookings = []
+    for room_id in room_ids:
+        day = start_date + datetime.timedelta(days=rng.randint(0, 3))
+        for _ in range(bookings_per_room):
+            nights = rng.randint(1, 5)
+            check_out = day + datetime.timedelta(days=nights)
+            bookings.append((hotel_id, f'Guest {room_id}', room_id, day.isoformat(), check_out.isoformat(),
+                             2, 100.0 * nights, rng.choice(['paid', 'pending']), 'confirmed', now))
+            day = check_out + datetime.timedelta(days=rng.randint(0, 3))
+    cursor.executemany('''
+    INSERT INTO bookings (hotel_id, guest_name, room_id, check_in_date, check_out_date,
+                          guest_count, total_amount, payment_status, booking_status, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', bookings)
+    room_calendar.rebuild(conn, hotel_id)
+    conn.commit()
+    conn.close()
+    return room_ids
+
+
+def report(title, rows):
+    print(f"\n{title}")
+    for label, value in rows:
+        print(f"  {label:<40} {value}")
+
+
+@benchmark('availability')
+def bench_availability():
+    """/api/available-rooms: per-room COUNT loop vs. one anti-join"""
+    from availability import AvailabilityEngine
+
+    def legacy_available_rooms(db_name, hotel_id, check_in_date, check_out_date):
+        # The original N+1 implementation, one connection per room
+        conn = sqlite3.connect(db_name)
+        rooms = conn.execute('SELECT id FROM rooms WHERE hotel_id = ? AND is_active = 1', (hotel_id,)).fetchall()
+        conn.close()
+        free = []
+        for (room_id,) in rooms:
+            room_conn = sqlite3.connect(db_name)
+            count = room_conn.execute('''
+            SELECT COUNT(*) FROM bookings
+            WHERE room_id = ? AND booking_status = 'confirmed'
+            AND NOT (check_out_date <= ? OR check_in_date >= ?)
+            ''', (room_id, check_in_date, check_out_date)).fetchone()[0]
+            room_conn.close()
+            if count == 0:
+                free.append(room_id)
+        return free
+
+    check_in = (datetime.date.today() + datetime.timedelta(days=5)).isoformat()
+    check_out = (datetime.date.today() + datetime.timedelta(days=8)).isoformat()
+    rows = []
+    for room_count in (50, 500, 5000):
+        db_name = temp_database()
+        seed_hotel(db_name, room_count)
+        engine = AvailabilityEngine(db_name)
+        repeat = 5 if room_count >= 5000 else 20
+        legacy = measure(lambda: legacy_available_rooms(db_name, 1, check_in, check_out), repeat)
+        engine_ms = measure(lambda: engine.available_rooms(1, check_in, check_out), repeat)
+        rows.append((f'{room_count} rooms: per-room COUNT', f'{legacy:9.2f} ms'))
+        rows.append((f'{room_count} rooms: AvailabilityEngine', f'{engine_ms:9.2f} ms'))
+    report('Room availability search', rows)
+
+
+
+@benchmark('room_calendar')
+def bench_room_calendar():
+    """Availability and occupancy: date-range scans over bookings vs. occupancy calendar bits"""
+    from availability import AvailabilityEngine, _OVERLAPS
+    from room_calendar import RoomCalendar
+
+    def scan_available(db_name, hotel_id, check_in_date, check_out_date):
+        conn = database.connect(db_name)
+        try:
+            return conn.execute(f'''
+                SELECT r.id FROM rooms r WHERE r.hotel_id = ? AND r.is_active = 1
+                AND r.id NOT IN (SELECT b.room_id FROM bookings b WHERE b.hotel_id = ? AND {_OVERLAPS})
+            ''', (hotel_id, hotel_id, check_out_date, check_in_date)).fetchall()
+        finally:
+            conn.close()
+
+    def scan_occupancy_by_night(db_name, hotel_id, start, days):
+        # One range-overlap count per night, as the dashboard computes tonight's figure
+        conn = database.connect(db_name)
+        try:
+            return [conn.execute('''
+                SELECT COUNT(DISTINCT b.room_id) FROM bookings b JOIN rooms r ON r.id = b.room_id
+                WHERE b.hotel_id = ? AND r.is_active = 1 AND b.booking_status = 'confirmed'
+                AND b.check_in_date <= ? AND b.check_out_date > ?
+            ''', (hotel_id, night, night)).fetchone()[0]
+                    for night in ((start + datetime.timedelta(days=n)).isoformat() for n in range(days))]
+        finally:
+            conn.close()
+
+    today = datetime.date.today()
+    check_in = (today + datetime.timedelta(days=5)).isoformat()
+    check_out = (today + datetime.timedelta(days=8)).isoformat()
+    rows = []
+    for room_count in (50, 500):
+        db_name = temp_database()
+        # A year of back-to-back history per room, ending around today
+        seed_hotel(db_name, room_count, bookings_per_room=120, start_date=today - datetime.timedelta(days=330))
+        engine = AvailabilityEngine(db_name)
+        calendar = RoomCalendar(db_name)
+        label = f'{room_count} rooms'
+        rows.append((f'{label}: search, bookings scan',
+                     f'{measure(lambda: scan_available(db_name, 1, check_in, check_out)):9.2f} ms'))
+        rows.append((f'{label}: search, calendar',
+                     f'{measure(lambda: engine.available_rooms(1, check_in, check_out)):9.2f} ms'))
+        rows.append((f'{label}: 30-night occupancy, scan',
+                     f'{measure(lambda: scan_occupancy_by_night(db_name, 1, today, 30), 5):9.2f} ms'))
+        rows.append((f'{label}: 30-night occupancy, calendar',
+                     f'{measure(lambda: calendar.occupancy_by_night(1, today.isoformat(), 30), 5):9.2f} ms'))
+    report('Room occupancy calendar (~120 bookings of history per room)', rows)
+
+
+@benchmark('availability_grid')
+def bench_availability_grid():
+    """365-night availability of 500 rooms: one search per night vs. one pass vs. the calendar grid"""
+    import gzip
+    import json
+    from availability import AvailabilityEngine
+    from room_calendar import RoomCalendar
+
+    def search_per_night(engine, start, days):
+        # What the add-booking page did: one /api/available-rooms call per date tried
+        return [engine.available_rooms(1, (start + datetime.timedelta(days=n)).isoformat(),
+                                       (start + datetime.timedelta(days=n + 1)).isoformat())
+                for n in range(days)]
+
+    def bookings_pass(db_name, start, days):
+        # One set-based pass over the window's bookings, bits built in Python
+        end = start + datetime.timedelta(days=days)
+        conn = database.connect(db_name)
+        try:
+            window = {room_id: 0 for room_id, in conn.execute(
+                'SELECT id FROM rooms WHERE hotel_id = 1 AND is_active = 1').fetchall()}
+            for room_id, check_in, check_out in conn.execute('''
+                SELECT room_id, check_in_date, check_out_date FROM bookings
+                WHERE hotel_id = 1 AND booking_status = 'confirmed' AND check_in_date < ? AND check_out_date > ?
+            ''', (end.isoformat(), start.isoformat())):
+                first = max((datetime.date.fromisoformat(check_in) - start).days, 0)
+                last = min((datetime.date.fromisoformat(check_out) - start).days, days)
+                if room_id in window:
+                    window[room_id] |= ((1 << (last - first)) - 1) << first
+            return window
+        finally:
+            conn.close()
+
+    today = datetime.date.today()
+    db_name = temp_database()
+    seed_hotel(db_name, 500, bookings_per_room=120, start_date=today - datetime.timedelta(days=120))
+    engine = AvailabilityEngine(db_name)
+    calendar = RoomCalendar(db_name)
+
+    grid = calendar.grid(1, today.isoformat(), 365)
+    body = json.dumps(grid).encode()
+    rows = [
+        ('365 searches, one per night', f'{measure(lambda: search_per_night(engine, today, 365), 3):9.1f} ms'),
+        ('one pass over bookings', f'{measure(lambda: bookings_pass(db_name, today, 365), 5):9.1f} ms'),
+        ('calendar grid (booked_nights)',
+         f'{measure(lambda: calendar.booked_nights(1, today.isoformat(), 365), 5):9.1f} ms'),
+        ('calendar grid + room details', f'{measure(lambda: calendar.grid(1, today.isoformat(), 365), 5):9.1f} ms'),
+        ('grid response size', f'{len(body) / 1024:9.1f} KiB ({len(gzip.compress(body)) / 1024:.1f} KiB gzipped)'),
+    ]
+    report('Availability grid, 500 rooms x 365 nights', rows)
+
+
+@benchmark('booking_race')
+def bench_booking_race():
+    """Parallel clerks booking one room: separate check and insert vs. one BEGIN IMMEDIATE transaction"""
+    import daily_stats
+    import room_nights
+    from concurrent.futures import ThreadPoolExecutor
+    from availability import AvailabilityEngine, overlapping_booking
+
+    def insert_booking(cursor, room_id, check_in, check_out):
+        # Room lookup, pricing and form handling between the check and the insert
+        time.sleep(0.001)
+        cursor.execute('''
+            INSERT INTO bookings (hotel_id, guest_name, room_id, check_in_date, check_out_date,
+                                  guest_count, total_amount, payment_status, created_at)
+            VALUES (1, 'Race', ?, ?, ?, 1, 100.0, 'pending', datetime('now'))
+        ''', (room_id, check_in, check_out))
+        booking_id = cursor.lastrowid
+        daily_stats.record_booking_change(cursor, booking_id, None)
+        room_calendar.record_booking_change(cursor, booking_id, None)
+        return booking_id
+
+    def check_then_insert(db_name, room_id, check_in, check_out):
+        # The old add_booking: availability on one connection, insert on the next
+        if not AvailabilityEngine(db_name).is_room_available(room_id, check_in, check_out):
+            return False
+        conn = database.connect(db_name)
+        try:
+            insert_booking(conn.cursor(), room_id, check_in, check_out)
+            conn.commit()
+            return True
+        finally:
+            conn.close()
+
+    def guarded(db_name, room_id, check_in, check_out):
+        conn = database.connect(db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            if overlapping_booking(cursor, room_id, check_in, check_out):
+                conn.rollback()
+                return False
+            booking_id = insert_booking(cursor, room_id, check_in, check_out)
+            room_nights.record_booking_change(cursor, booking_id)
+            conn.commit()
+            return True
+        except room_nights.RoomUnavailable:
+            conn.rollback()
+            return False
+        finally:
+            conn.close()
+
+    def double_booked_nights(db_name):
+        conn = database.connect(db_name)
+        try:
+            return conn.execute('''
+                SELECT COUNT(*) FROM bookings a JOIN bookings b
+                ON a.room_id = b.room_id AND a.id < b.id
+                AND a.check_in_date < b.check_out_date AND b.check_in_date < a.check_out_date
+                WHERE a.booking_status = 'confirmed' AND b.booking_status = 'confirmed'
+            ''').fetchone()[0]
+        finally:
+            conn.close()
+
+    rng = random.Random(21)
+    start = datetime.date.today() + datetime.timedelta(days=30)
+    # 16 clerks, 25 attempts each, at 4 rooms over the same fortnight
+    attempts = []
+    for _ in range(400):
+        check_in = start + datetime.timedelta(days=rng.randint(0, 13))
+        attempts.append((rng.randint(0, 3), check_in.isoformat(),
+                         (check_in + datetime.timedelta(days=rng.randint(1, 3))).isoformat()))
+
+    rows = []
+    for label, book in (('check, then insert', check_then_insert), ('BEGIN IMMEDIATE + guard', guarded)):
+        db_name = temp_database()
+        room_ids = seed_hotel(db_name, 4, bookings_per_room=0)
+        began = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=16) as clerks:
+            results = list(clerks.map(lambda a: book(db_name, room_ids[a[0]], a[1], a[2]), attempts))
+        elapsed = time.perf_counter() - began
+        rows.append((f'{label}: bookings/s', f'{len(attempts) / elapsed:9.0f}'))
+        rows.append((f'{label}: booked / refused', f'{sum(results):9d} {len(results) - sum(results):5d}'))
+        rows.append((f'{label}: overlapping pairs', f'{double_booked_nights(db_name):9d}'))
+    report('Booking race, 16 clerks x 25 attempts on 4 rooms', rows)
+
+
+@benchmark('room_holds')
+def bench_room_holds():
+    """Latency of placing a room hold and converting it into a booking, and what holds cost searches"""
+    import itertools
+    import room_nights
+    from availability import AvailabilityEngine, overlapping_booking, overlapping_hold
+    from room_holds import RoomHolds
+
+    db_name = temp_database()
+    room_ids = seed_hotel(db_name, 500)
+    engine = AvailabilityEngine(db_name)
+    holds = RoomHolds(db_name)
+    start = datetime.date.today() + datetime.timedelta(days=60)
+    # Every hold and booking below is on a distinct room or fortnight, so none is refused
+    stays = itertools.product(range(0, 700, 14), room_ids)
+
+    def next_stay():
+        offset, room_id = next(stays)
+        check_in = start + datetime.timedelta(days=offset)
+        return room_id, check_in.isoformat(), (check_in + datetime.timedelta(days=3)).isoformat()
+
+    def book(hold_token):
+        room_id, check_in, check_out = next_stay()
+        if hold_token:
+            hold_token = holds.place(1, room_id, check_in, check_out)['token']
+        conn = database.connect(db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            if overlapping_booking(cursor, room_id, check_in, check_out):
+                raise room_nights.RoomUnavailable(room_id)
+            if overlapping_hold(cursor, room_id, check_in, check_out, hold_token):
+                raise room_nights.RoomUnavailable(room_id)
+            cursor.execute('''
+                INSERT INTO bookings (hotel_id, guest_name, room_id, check_in_date, check_out_date,
+                                      guest_count, total_amount, payment_status, created_at)
+                VALUES (1, 'Hold', ?, ?, ?, 1, 300.0, 'pending', datetime('now'))
+            ''', (room_id, check_in, check_out))
+            booking_id = cursor.lastrowid
+            room_nights.record_booking_change(cursor, booking_id)
+            room_calendar.record_booking_change(cursor, booking_id, None)
+            holds.convert(cursor, hold_token)
+            conn.commit()
+        finally:
+            conn.close()
+
+    search_from = start.isoformat()
+    search_to = (start + datetime.timedelta(days=3)).isoformat()
+    search_before = measure(lambda: engine.available_rooms(1, search_from, search_to), repeat=50)
+    place = measure(lambda: holds.place(1, *next_stay()), repeat=200)
+    live = holds.stats()['active']
+    search_after = measure(lambda: engine.available_rooms(1, search_from, search_to), repeat=50)
+    plain = measure(lambda: book(None), repeat=100)
+    held = measure(lambda: book(True), repeat=100)
+
+    sweep_holds = RoomHolds(db_name, clock=lambda: time.time() + 2 * holds.ttl)
+    began = time.perf_counter()
+    swept = sweep_holds.sweep()
+    sweep = (time.perf_counter() - began) * 1000
+
+    report(f'Room holds, 500 rooms, {live} live holds', [
+        ('place a hold (ms)', f'{place:9.2f}'),
+        ('booking without a hold (ms)', f'{plain:9.2f}'),
+        ('place + convert into a booking (ms)', f'{held:9.2f}'),
+        ('search, no holds (ms)', f'{search_before:9.2f}'),
+        (f'search, {live} live holds (ms)', f'{search_after:9.2f}'),
+        (f'sweep {swept} expired holds (ms)', f'{sweep:9.2f}'),
+    ])
+
+@benchmark('hotel_events')
+def bench_hotel_events():
+    """Front-desk screens: polling the current-guests join vs. one tailer feeding SSE streams"""
+    import threading
+    import hotel_events
+    from hotel_events import HotelEventBroker
+
+    def current_guests(db_name):
+        # What /owner/current-guests runs for every poll of every open tab
+        conn = database.connect(db_name)
+        try:
+            return conn.execute('''
+                SELECT b.guest_name, r.room_number, b.guest_count, b.check_in_date, b.check_out_date, b.id
+                FROM bookings b
+                JOIN rooms r ON b.room_id = r.id
+                JOIN check_in_out c ON b.id = c.booking_id
+                WHERE b.hotel_id = ? AND b.booking_status = 'confirmed'
+                AND c.check_in_time IS NOT NULL AND c.check_out_time IS NULL
+                AND b.check_out_date >= ?
+                ORDER BY r.room_number
+            ''', (1, datetime.date.today().isoformat())).fetchall()
+        finally:
+            conn.close()
+
+    db_name = temp_database()
+    today = datetime.date.today()
+    seed_hotel(db_name, 300, bookings_per_room=12, start_date=today - datetime.timedelta(days=40))
+    conn = database.connect(db_name)
+    # Past stays checked in and out, stays in progress checked in
+    conn.execute('''
+        INSERT INTO check_in_out (booking_id, check_in_time, check_out_time)
+        SELECT id, check_in_date || ' 14:00:00',
+               CASE WHEN check_out_date <= ? THEN check_out_date || ' 11:00:00' END
+        FROM bookings WHERE check_in_date <= ?
+    ''', (today.isoformat(), today.isoformat()))
+    conn.commit()
+    booking_ids = [row[0] for row in conn.execute('SELECT id FROM bookings ORDER BY id').fetchall()]
+    conn.close()
+
+    screens, poll_every = 10, 30
+    poll = measure(lambda: current_guests(db_name), repeat=50)
+    broker = HotelEventBroker(db_name)
+    received = [dict() for _ in range(screens)]
+
+    def screen(inbox):
+        for chunk in broker.stream(1, duration=8):
+            if chunk.startswith('id: '):
+                inbox[int(chunk.split('\n', 1)[0][4:])] = time.perf_counter()
+
+    listeners = [threading.Thread(target=screen, args=(inbox,)) for inbox in received]
+    for listener in listeners:
+        listener.start()
+    while broker.stats()['streams'] < screens:
+        time.sleep(0.01)
+    # Let the last streams finish connecting before the first write
+    time.sleep(0.1)
+
+    publish_times, committed = [], {}
+    for booking_id in booking_ids[:50]:
+        began = time.perf_counter()
+        conn = database.connect(db_name)
+        try:
+            event_id = hotel_events.publish_booking(conn.cursor(), booking_id, 'updated')
+            conn.commit()
+        finally:
+            conn.close()
+        committed[event_id] = time.perf_counter()
+        publish_times.append((committed[event_id] - began) * 1000)
+        broker.notify()
+        time.sleep(0.02)
+    idle_poll = measure(broker.poll_once, repeat=50)
+    for listener in listeners:
+        listener.join()
+
+    latencies = [(max(inbox[event_id] for inbox in received) - at) * 1000
+                 for event_id, at in committed.items() if all(event_id in inbox for inbox in received)]
+    per_minute = 60 / poll_every * screens
+    report(f'Front-desk updates, {len(booking_ids)} bookings, {screens} screens', [
+        ('current-guests poll (ms)', f'{poll:9.2f}'),
+        (f'polling every {poll_every} s: query ms/min', f'{poll * per_minute:9.2f}'),
+        ('idle tailer read (ms)', f'{idle_poll:9.3f}'),
+        ('event stream: tailer ms/min', f'{idle_poll * 60:9.2f}'),
+        ('publish a booking change (ms)', f'{statistics.median(publish_times):9.2f}'),
+        (f'commit to all {screens} screens, p50 (ms)', f'{statistics.median(latencies):9.2f}'),
+        ('events delivered / published', f'{len(latencies):9d} {len(committed):5d}'),
+    ])
+
+
+@benchmark('change_log')
+def bench_change_log():
+    """Refreshing a client: full re-download vs. /api/changes since a cursor, and the triggers' write cost"""
+    import json
+    import change_log
+    from booking_listing import BookingListing
+    from change_log import ChangeFeed
+
+    db_name = temp_database()
+    room_ids = seed_hotel(db_name, 300, bookings_per_room=30, start_date=datetime.date.today() - datetime.timedelta(days=300))
+    feed = ChangeFeed(db_name)
+    listing = BookingListing(db_name)
+
+    def full_refresh():
+        # Every booking the owner can page through, as the JS clients would rebuild it
+        rows, cursor = [], None
+        while True:
+            page = listing.page(1, cursor=cursor, limit=500)
+            rows += BookingListing.as_dicts(page['bookings'])
+            cursor = page['next_cursor']
+            if not cursor:
+                return rows
+
+    cursor = feed.changes(1)['cursor']
+    conn = database.connect(db_name)
+    for booking_id in range(1, 11):
+        conn.execute("UPDATE bookings SET payment_status = 'paid' WHERE id = ?", (booking_id,))
+    conn.commit()
+    conn.close()
+
+    full_ms = measure(full_refresh, repeat=5)
+    full_bytes = len(json.dumps(full_refresh()))
+    delta_ms = measure(lambda: feed.changes(1, cursor))
+    delta_bytes = len(json.dumps(feed.changes(1, cursor)))
+
+    def insert_bookings(db_name):
+        conn = database.connect(db_name)
+        try:
+            conn.executemany('''
+                INSERT INTO bookings (hotel_id, guest_name, room_id, check_in_date, check_out_date,
+                                      guest_count, total_amount, payment_status, booking_status, created_at)
+                VALUES (1, 'Bulk', ?, '2031-01-01', '2031-01-02', 1, 100.0, 'pending', 'cancelled', datetime('now'))
+            ''', [(room_ids[n % len(room_ids)],) for n in range(10_000)])
+            conn.rollback()
+        finally:
+            conn.close()
+
+    with_triggers = measure(lambda: insert_bookings(db_name), repeat=5)
+    conn = database.connect(db_name)
+    for table in ('bookings', 'check_in_out', 'guest_documents'):
+        for event in ('insert', 'update', 'delete'):
+            conn.execute(f'DROP TRIGGER change_log_{table}_{event}')
+    conn.commit()
+    conn.close()
+    without_triggers = measure(lambda: insert_bookings(db_name), repeat=5)
+
+    report('Client refresh after 10 booking changes, 9000 bookings', [
+        ('full re-download (ms)', f'{full_ms:9.2f}'),
+        ('full re-download (KiB)', f'{full_bytes / 1024:9.1f}'),
+        ('/api/changes since cursor (ms)', f'{delta_ms:9.2f}'),
+        ('/api/changes since cursor (KiB)', f'{delta_bytes / 1024:9.1f}'),
+        ('10k inserts, no triggers (ms)', f'{without_triggers:9.2f}'),
+        ('10k inserts, change-log triggers (ms)', f'{with_triggers:9.2f}'),
+    ])
+
+
+@benchmark('telegram_updates')
+def bench_telegram_updates():
+    """Bot update throughput: one-at-a-time loop vs. bounded concurrent dispatcher"""
+    import telegram_clients
+    import simple_telegram_bot
+    from fake_telegram import FakeTelegramServer
+    from telegram_updates import UpdateDispatcher
+
+    update_count, chat_count = 200, 20
+    rows = []
+    with FakeTelegramServer(latency=0.02) as server:
+        telegram_clients.registry = telegram_clients.TelegramClientRegistry(api_url=server.url)
+        updates = [{'update_id': n, 'message': {'chat': {'id': n % chat_count}, 'text': '/help'}}
+                   for n in range(1, update_count + 1)]
+
+        start = time.perf_counter()
+        for update in updates:
+            simple_telegram_bot.process_update(update)
+        sequential = time.perf_counter() - start
+        rows.append((f'{update_count} updates, sequential loop', f'{update_count / sequential:9.1f} updates/s'))
+
+        for workers in (2, 4, 8):
+            dispatcher = UpdateDispatcher(simple_telegram_bot.process_update, max_workers=workers)
+            start = time.perf_counter()
+            simple_telegram_bot.handle_updates([dict(update, update_id=update['update_id'] + workers * 1000)
+                                                for update in updates], dispatcher)
+            elapsed = time.perf_counter() - start
+            dispatcher.shutdown()
+            rows.append((f'{update_count} updates, {workers} workers', f'{update_count / elapsed:9.1f} updates/s'))
+        telegram_clients.registry.close_all()
+    report('Telegram update processing (fake Bot API, 20 ms per sendMessage)', rows)
+
+
+@benchmark('image_optimization')
+def bench_image_optimization():
+    """Document uploads: inline Pillow optimization vs. background process pool"""
+    import io
+    from PIL import Image, ImageFilter
+    from werkzeug.datastructures import FileStorage
+    from document_manager import DocumentManager
+    from image_optimizer import ImageOptimizer, optimize_image
+
+    # Phone-camera sized JPEGs with some texture so they don't compress to nothing
+    batch_size = 16
+    photo = Image.effect_noise((4032, 3024), 40).filter(ImageFilter.GaussianBlur(2)).convert('RGB')
+    buffer = io.BytesIO()
+    photo.save(buffer, 'JPEG', quality=90)
+    content = buffer.getvalue()
+
+    db_name = temp_database()
+    seed_hotel(db_name, 1, bookings_per_room=1)
+    upload_folder = tempfile.mkdtemp(prefix='hotel_bench_uploads_')
+    rows = [('JPEG size', f'{len(content) / 1024 / 1024:9.2f} MB')]
+
+    def upload_batch(manager, prefix):
+        latencies = []
+        for n in range(batch_size):
+            # Bytes after the JPEG end marker make each upload unique without changing the image
+            unique = content + f'{prefix}-{n}'.encode()
+            file = FileStorage(stream=io.BytesIO(unique), filename='photo.jpg')
+            start = time.perf_counter()
+            manager.save_document(file, 1, 'Guest', 'passport', f'{prefix}-{n}')
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies
+
+    # Inline: the old request path, optimizing before the request returns
+    manager = DocumentManager(optimizer=ImageOptimizer())
+    manager.db_name, manager.upload_folder = db_name, upload_folder
+    manager.optimizer.submit = lambda db, file_path: optimize_image(file_path)
+    start = time.perf_counter()
+    latencies = upload_batch(manager, 'inline')
+    elapsed = time.perf_counter() - start
+    rows.append(('inline: upload request (median)', f'{statistics.median(latencies):9.2f} ms'))
+    rows.append(('inline: throughput', f'{batch_size / elapsed:9.2f} images/s'))
+
+    for workers in (1, 2, 4):
+        manager = DocumentManager(optimizer=ImageOptimizer(max_workers=workers))
+        manager.db_name, manager.upload_folder = db_name, upload_folder
+        manager.optimizer.wait_idle()
+        start = time.perf_counter()
+        latencies = upload_batch(manager, f'pool{workers}')
+        manager.optimizer.wait_idle()
+        elapsed = time.perf_counter() - start
+        manager.optimizer.shutdown()
+        rows.append((f'{workers} worker(s): upload request (median)', f'{statistics.median(latencies):9.2f} ms'))
+        rows.append((f'{workers} worker(s): throughput', f'{batch_size / elapsed:9.2f} images/s'))
+
+    # The same scan uploaded again, e.g. for a returning guest
+    manager = DocumentManager(optimizer=ImageOptimizer())
+    manager.db_name, manager.upload_folder = db_name, tempfile.mkdtemp(prefix='hotel_bench_uploads_')
+    manager.save_document(FileStorage(stream=io.BytesIO(content), filename='photo.jpg'), 1, 'Guest', 'passport', 'dup-0')
+    manager.optimizer.wait_idle()
+    latencies = []
+    for n in range(1, batch_size):
+        file = FileStorage(stream=io.BytesIO(content), filename='photo.jpg')
+        start = time.perf_counter()
+        manager.save_document(file, 1, 'Guest', 'passport', f'dup-{n}')
+        latencies.append((time.perf_counter() - start) * 1000)
+    manager.optimizer.shutdown()
+    stored = sum(os.path.getsize(os.path.join(root, name))
+                 for root, _, names in os.walk(manager.upload_folder) for name in names)
+    rows.append(('duplicate upload request (median)', f'{statistics.median(latencies):9.2f} ms'))
+    rows.append((f'disk used by {batch_size} identical uploads', f'{stored / 1024:9.1f} KB'))
+    report(f'Image optimization, {batch_size} uploads ({os.cpu_count()} CPU)', rows)
+
+
+@benchmark('document_search')
+def bench_document_search():
+    """Document search: triple LIKE '%term%' vs. FTS5 index, first page of 50"""
+    from document_manager import DocumentManager
+
+    def legacy_search(db_name, hotel_id, term):
+        conn = database.connect(db_name)
+        try:
+            return conn.execute('''
+                SELECT gd.id FROM guest_documents gd
+                JOIN bookings b ON gd.booking_id = b.id
+                JOIN rooms r ON b.room_id = r.id
+                WHERE b.hotel_id = ? AND (gd.guest_name LIKE ? OR gd.document_id LIKE ? OR gd.document_type LIKE ?)
+                ORDER BY gd.uploaded_at DESC
+            ''', (hotel_id, f'%{term}%', f'%{term}%', f'%{term}%')).fetchall()
+        finally:
+            conn.close()
+
+    first_names = ['Aarav', 'Priya', 'John', 'Maria', 'Wei', 'Fatima', 'Kiran', 'Olga', 'Sanjay', 'Emma']
+    last_names = ['Sharma', 'Smith', 'Garcia', 'Chen', 'Khan', 'Rao', 'Ivanova', 'Patel', 'Brown', 'Das']
+    types = ['passport', 'aadhar', 'license', 'voter_id']
+    hotel_count = 10
+    rows = []
+    for document_count in (10_000, 100_000, 1_000_000):
+        db_name = temp_database()
+        booking_ids = []
+        for hotel_id in range(1, hotel_count + 1):
+            seed_hotel(db_name, 20, hotel_id=hotel_id)
+        conn = database.connect(db_name)
+        booking_ids = [row[0] for row in conn.execute('SELECT id FROM bookings')]
+        rng = random.Random(document_count)
+        documents = ((rng.choice(booking_ids),
+                      f'{rng.choice(first_names)}{n % 97} {rng.choice(last_names)}',
+                      rng.choice(types), f'{rng.choice("ABCDEFGH")}{n:08d}', 'unused', 'scan.jpg', 1,
+                      '2024-01-01 00:00:00') for n in range(document_count))
+        conn.executemany('''
+            INSERT INTO guest_documents (booking_id, guest_name, document_type, document_id,
+                                         file_path, file_name, file_size, uploaded_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', documents)
+        conn.commit()
+        conn.close()
+
+        manager = DocumentManager()
+        manager.db_name = db_name
+        repeat = 3 if document_count >= 1_000_000 else 10
+        for term in ('sharma', 'C0000123', 'passport'):
+            legacy = measure(lambda: legacy_search(db_name, 1, term), repeat)
+            fts = measure(lambda: manager.search_documents(1, term), repeat)
+            rows.append((f'{document_count:>9,} docs, "{term}": LIKE', f'{legacy:9.2f} ms'))
+            rows.append((f'{document_count:>9,} docs, "{term}": FTS5', f'{fts:9.2f} ms'))
+    report('Guest document search (one hotel of 10)', rows)
+
+
+@benchmark('booking_listing')
+def bench_booking_listing():
+    """Owner bookings: full history query vs. keyset pages at depth"""
+    from booking_listing import BookingListing, encode_cursor
+
+    def legacy_owner_bookings(db_name, hotel_id):
+        conn = database.connect(db_name)
+        try:
+            return conn.execute('''
+                SELECT b.id, b.guest_name, b.guest_email, b.guest_phone, r.room_number,
+                       b.check_in_date, b.check_out_date, b.guest_count, b.total_amount,
+                       b.payment_status, b.booking_status, b.created_at
+                FROM bookings b JOIN rooms r ON b.room_id = r.id
+                WHERE b.hotel_id = ? ORDER BY b.created_at DESC
+            ''', (hotel_id,)).fetchall()
+        finally:
+            conn.close()
+
+    rows = []
+    for booking_count in (1_000, 100_000, 1_000_000):
+        db_name = temp_database()
+        room_ids = seed_hotel(db_name, 100, bookings_per_room=0)
+        rng = random.Random(booking_count)
+        start = datetime.datetime(2015, 1, 1)
+        bookings = []
+        for n in range(booking_count):
+            # Roughly time-ordered, a few per second at the busiest, 5% cancelled
+            created = start + datetime.timedelta(seconds=n * 300 + rng.randint(0, 60))
+            check_in = created.date() + datetime.timedelta(days=rng.randint(1, 60))
+            bookings.append((1, f'Guest {n}', rng.choice(room_ids), check_in.isoformat(),
+                             (check_in + datetime.timedelta(days=2)).isoformat(), 2, 200.0,
+                             rng.choice(['paid', 'pending']),
+                             'cancelled' if rng.random() < 0.05 else 'confirmed',
+                             created.strftime('%Y-%m-%d %H:%M:%S')))
+        conn = database.connect(db_name)
+        conn.executemany('''
+            INSERT INTO bookings (hotel_id, guest_name, room_id, check_in_date, check_out_date,
+                                  guest_count, total_amount, payment_status, booking_status, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', bookings)
+        conn.commit()
+        middle = conn.execute('''
+            SELECT created_at, id FROM bookings WHERE hotel_id = 1
+            ORDER BY created_at DESC, id DESC LIMIT 1 OFFSET ?
+        ''', (booking_count // 2,)).fetchone()
+        conn.close()
+        del bookings
+
+        listing = BookingListing(db_name)
+        deep = encode_cursor(*middle)
+        repeat = 3 if booking_count >= 1_000_000 else 10
+        label = f'{booking_count:>9,} bookings'
+        rows.append((f'{label}: full history', f'{measure(lambda: legacy_owner_bookings(db_name, 1), repeat):9.2f} ms'))
+        rows.append((f'{label}: first page', f'{measure(lambda: listing.page(1)):9.2f} ms'))
+        rows.append((f'{label}: page at middle', f'{measure(lambda: listing.page(1, cursor=deep)):9.2f} ms'))
+        rows.append((f'{label}: cancelled, middle',
+                     f'{measure(lambda: listing.page(1, status="cancelled", cursor=deep)):9.2f} ms'))
+        rows.append((f'{label}: pending, first page',
+                     f'{measure(lambda: listing.page(1, payment_status="pending")):9.2f} ms'))
+    report('Owner bookings listing, 50 rows per page', rows)
+
+
+@benchmark('booking_export')
+def bench_booking_export():
+    """Bookings CSV export: build the whole body in memory vs. stream it in chunks"""
+    import io
+    import csv
+    import tracemalloc
+    import booking_export
+
+    def legacy_export(db_name):
+        conn = database.connect(db_name)
+        try:
+            rows = conn.execute('''
+                SELECT b.id, b.hotel_id, h.name, b.guest_name, b.guest_email, b.guest_phone,
+                       r.room_number, r.room_type, b.check_in_date, b.check_out_date, b.guest_count,
+                       b.total_amount, b.payment_status, b.booking_status, b.created_at, b.cancelled_at
+                FROM bookings b JOIN hotels h ON h.id = b.hotel_id JOIN rooms r ON r.id = b.room_id
+                WHERE b.hotel_id = 1 ORDER BY b.created_at
+            ''').fetchall()
+        finally:
+            conn.close()
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(booking_export.BOOKING_COLUMNS)
+        writer.writerows(rows)
+        return len(buffer.getvalue().encode('utf-8'))
+
+    def streamed_export(db_name):
+        rows = booking_export.iter_bookings(db_name, 1)
+        return sum(len(chunk) for chunk in booking_export.export_chunks(rows, booking_export.BOOKING_COLUMNS, 'csv'))
+
+    def profile(func, db_name):
+        tracemalloc.start()
+        start = time.perf_counter()
+        size = func(db_name)
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return f'{elapsed * 1000:9.0f} ms {peak / 2**20:8.1f} MiB peak  ({size / 2**20:.0f} MiB output)'
+
+    rows = []
+    for booking_count in (10_000, 100_000, 1_000_000):
+        db_name = temp_database()
+        room_ids = seed_hotel(db_name, 100, bookings_per_room=0)
+        start = datetime.datetime(2015, 1, 1)
+        conn = database.connect(db_name)
+        conn.executemany('''
+            INSERT INTO bookings (hotel_id, guest_name, guest_email, guest_phone, room_id, check_in_date,
+                                  check_out_date, guest_count, total_amount, payment_status, created_at)
+            VALUES (1, ?, ?, '+91 98765 43210', ?, ?, ?, 2, 200.0, 'paid', ?)
+        ''', ((f'Guest {n}', f'guest{n}@example.com', room_ids[n % len(room_ids)],
+               (start + datetime.timedelta(days=n // 50)).date().isoformat(),
+               (start + datetime.timedelta(days=n // 50 + 2)).date().isoformat(),
+               (start + datetime.timedelta(seconds=n * 300)).strftime('%Y-%m-%d %H:%M:%S'))
+              for n in range(booking_count)))
+        conn.commit()
+        conn.close()
+
+        label = f'{booking_count:>9,} bookings'
+        rows.append((f'{label}: fetchall + csv', profile(legacy_export, db_name)))
+        rows.append((f'{label}: streamed', profile(streamed_export, db_name)))
+    report('Bookings CSV export (time, tracemalloc peak)', rows)
+
+
+@benchmark('booking_import')
+def bench_booking_import():
+    """Migrating a hotel's bookings: one add_booking-style write per row vs. the bulk importer"""
+    import io
+    import daily_stats
+    import notification_outbox
+    from availability import AvailabilityEngine
+    from booking_import import BookingImporter
+
+    def csv_text(room_numbers, booking_count):
+        lines = ['room_number,guest_name,check_in_date,check_out_date,guest_count,payment_status']
+        start = datetime.date.today() - datetime.timedelta(days=365)
+        for n in range(booking_count):
+            day = start + datetime.timedelta(days=(n // len(room_numbers)) * 3)
+            lines.append(f'{room_numbers[n % len(room_numbers)]},Guest {n},{day.isoformat()},'
+                         f'{(day + datetime.timedelta(days=2)).isoformat()},2,paid')
+        return '\n'.join(lines) + '\n'
+
+    def per_booking(db_name, text):
+        # What add_booking does for each submitted form
+        engine = AvailabilityEngine(db_name)
+        conn = database.connect(db_name)
+        rooms = dict(conn.execute('SELECT room_number, id FROM rooms').fetchall())
+        conn.close()
+        for line in text.splitlines()[1:]:
+            room_number, guest_name, check_in, check_out, guest_count, payment_status = line.split(',')
+            room_id = rooms[room_number]
+            if not engine.is_room_available(room_id, check_in, check_out):
+                continue
+            conn = database.connect(db_name)
+            cursor = conn.cursor()
+            cursor.execute('SELECT price_per_night, capacity FROM rooms WHERE id = ? AND hotel_id = 1', (room_id,))
+            price = cursor.fetchone()[0]
+            cursor.execute('''
+                INSERT INTO bookings (hotel_id, guest_name, room_id, check_in_date, check_out_date,
+                                      guest_count, total_amount, payment_status, created_at)
+                VALUES (1, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            ''', (guest_name, room_id, check_in, check_out, int(guest_count), price * 2, payment_status))
+            booking_id = cursor.lastrowid
+            daily_stats.record_booking_change(cursor, booking_id, None)
+            room_calendar.record_booking_change(cursor, booking_id, None)
+            cursor.execute('SELECT room_number FROM rooms WHERE id = ?', (room_id,))
+            notification_outbox.enqueue(cursor, 1, f'New booking for room {cursor.fetchone()[0]}')
+            conn.commit()
+            conn.close()
+
+    rows = []
+    for booking_count in (1_000, 10_000, 50_000):
+        text = None
+        for label, run in (('per-booking writes', per_booking),
+                           ('bulk import', lambda db, t: BookingImporter(db).import_csv(1, io.StringIO(t)))):
+            db_name = temp_database()
+            seed_hotel(db_name, 100, bookings_per_room=0)
+            if text is None:
+                conn = database.connect(db_name)
+                text = csv_text([row[0] for row in conn.execute('SELECT room_number FROM rooms')], booking_count)
+                conn.close()
+            start = time.perf_counter()
+            run(db_name, text)
+            elapsed = time.perf_counter() - start
+            rows.append((f'{booking_count:>7,} bookings: {label}',
+                         f'{elapsed * 1000:9.0f} ms {booking_count / elapsed:9.0f} rows/s'))
+    report('Bulk booking import, 100 rooms', rows)
+
+
+@benchmark('chatbot_cache')
+def bench_chatbot_cache():
+    """Owner chatbot traffic against a fake 300 ms LLM: uncached vs. response cache"""
+    from concurrent.futures import ThreadPoolExecutor
+    from fake_openai import FakeOpenAIServer
+    from llm_gateway import LLMGateway
+    from ai_chatbot import HotelAIChatbot
+    from hotel_metrics import HotelMetrics
+    from response_cache import ResponseCache
+
+    db_name = temp_database()
+    for hotel_id in range(1, 6):
+        seed_hotel(db_name, 50, hotel_id=hotel_id)
+    # Repeats and rephrasings of a handful of questions, as owners ask them
+    # (open-ended ones: figure questions are answered by the local intent router)
+    questions = ['How can I improve occupancy?', 'how can i improve occupancy', 'Why is revenue down?',
+                 'Why is revenue down', 'Suggest a weekend promotion', 'Who checks in today?',
+                 'Predict occupancy for next month', 'What should I charge for suites?']
+    rng = random.Random(15)
+    traffic = [(rng.randint(1, 5), rng.choice(questions)) for _ in range(200)]
+
+    rows = []
+    with FakeOpenAIServer(latency=0.3, reply='📊 Occupancy is 62%.') as server:
+        # Enough slots for every worker: this measures caching, not load shedding
+        gateway = LLMGateway(api_key='benchmark', base_url=server.url, max_inflight=16)
+        variants = (('uncached', None), ('coalescing only', ResponseCache(max_entries=0)),
+                    ('coalescing + cache', ResponseCache()))
+        for label, cache in variants:
+            chatbot = HotelAIChatbot(metrics=HotelMetrics(db_name), cache=cache, gateway=gateway)
+            if cache is None:
+                ask = lambda item: chatbot._complete(chatbot._build_context(chatbot.get_hotel_analytics(item[0])),
+                                                     item[1])
+            else:
+                ask = lambda item: chatbot.generate_response(*item)
+            calls_before = len(server.calls)
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=16) as pool:
+                list(pool.map(ask, traffic))
+            elapsed = time.perf_counter() - start
+            hit_rate = cache.stats()['hit_rate'] if cache else 0.0
+            rows.append((f'200 questions: {label}',
+                         f'{elapsed * 1000:6.0f} ms {len(server.calls) - calls_before:4d} upstream calls, '
+                         f'{hit_rate:.0%} served locally'))
+    report('AI chatbot, 16 concurrent owners (fake LLM, 300 ms per completion)', rows)
+
+
+@benchmark('chatbot_stream')
+def bench_chatbot_stream():
+    """Time until the owner sees the answer: full completion vs. first streamed token"""
+    from fake_openai import FakeOpenAIServer
+    from llm_gateway import LLMGateway
+    from ai_chatbot import HotelAIChatbot
+    from hotel_metrics import HotelMetrics
+    from response_cache import ResponseCache
+
+    db_name = temp_database()
+    seed_hotel(db_name, 50)
+    reply = ' '.join(['📊 Occupancy is 62% today with 31 of 50 rooms taken.'] * 8)   # ~80 tokens
+
+    def first_piece(chatbot):
+        pieces = chatbot.stream_response(1, 'How can I improve occupancy?')
+        next(pieces)
+        pieces.close()
+
+    rows = []
+    with FakeOpenAIServer(latency=0.3, token_delay=0.02, reply=reply) as server:
+        # max_entries=0: every question goes upstream
+        chatbot = HotelAIChatbot(metrics=HotelMetrics(db_name), cache=ResponseCache(max_entries=0),
+                                 gateway=LLMGateway(api_key='benchmark', base_url=server.url))
+        rows.append(('full answer (generate_response)',
+                     f'{measure(lambda: chatbot.generate_response(1, "How can I improve occupancy?"), 5):7.0f} ms'))
+        rows.append(('streamed: first token',
+                     f'{measure(lambda: first_piece(chatbot), 5):7.0f} ms'))
+        rows.append(('streamed: last token',
+                     f'{measure(lambda: list(chatbot.stream_response(1, "How can I improve occupancy?")), 5):7.0f} ms'))
+    report('AI chatbot latency (fake LLM: 300 ms to first token, 20 ms per token)', rows)
+
+
+@benchmark('chatbot_router')
+def bench_chatbot_router():
+    """Labelled owner questions: every one sent to the LLM vs. the local intent router"""
+    from fake_openai import FakeOpenAIServer
+    from llm_gateway import LLMGateway
+    from ai_chatbot import HotelAIChatbot, INTENT_EXAMPLES, evaluate_router
+    from hotel_metrics import HotelMetrics
+    from response_cache import ResponseCache
+
+    db_name = temp_database()
+    seed_hotel(db_name, 50)
+    questions = [question for question, _ in INTENT_EXAMPLES]
+    results = evaluate_router(INTENT_EXAMPLES)
+
+    rows = [
+        ('labelled questions', f"{results['questions']:7d}"),
+        ('routing rate (answered locally)', f"{results['routing_rate']:7.1%}"),
+        ('misclassification rate', f"{results['misclassification_rate']:7.1%}"),
+        ('figure questions sent to LLM', f"{results['missed_routes']:7d}"),
+        ('classification time', f"{results['microseconds_per_question']:7.1f} µs"),
+    ]
+    with FakeOpenAIServer(latency=0.3, token_delay=0.02, reply='📊 Occupancy is 62% today.') as server:
+        for label, use_router in (('all to LLM', False), ('intent router', True)):
+            chatbot = HotelAIChatbot(metrics=HotelMetrics(db_name), cache=ResponseCache(max_entries=0),
+                                     gateway=LLMGateway(api_key='benchmark', base_url=server.url))
+            if not use_router:
+                chatbot.router.route = lambda message: []
+            timings = []
+            for question in questions:
+                start = time.perf_counter()
+                chatbot.generate_response(1, question)
+                timings.append((time.perf_counter() - start) * 1000)
+            rows.append((f'{label}: median / total',
+                         f'{statistics.median(timings):8.2f} ms {sum(timings):8.0f} ms'))
+    report('Chatbot intent routing (fake LLM: 300 ms + 20 ms per token)', rows)
+
+
+
+@benchmark('chatbot_burst')
+def bench_chatbot_burst():
+    """Booking pages served by 8 worker threads while a burst of chatbot questions hits a slow LLM"""
+    from concurrent.futures import ThreadPoolExecutor
+    from fake_openai import FakeOpenAIServer
+    from llm_gateway import LLMGateway
+    from ai_chatbot import HotelAIChatbot
+    from booking_listing import BookingListing
+    from hotel_metrics import HotelMetrics
+    from response_cache import ResponseCache
+
+    db_name = temp_database()
+    seed_hotel(db_name, 50)
+    listing = BookingListing(db_name)
+
+    def timed(func, submitted):
+        func()
+        return (time.perf_counter() - submitted) * 1000
+
+    rows = []
+    with FakeOpenAIServer(latency=2.0, reply='📊 Occupancy is 62% today.') as server:
+        variants = (
+            ('unbounded', dict(max_inflight=64, deadline=30)),
+            ('4 slots, 1 s', dict(max_inflight=4, deadline=1)),
+        )
+        for label, limits in variants:
+            gateway = LLMGateway(api_key='benchmark', base_url=server.url, **limits)
+            chatbot = HotelAIChatbot(metrics=HotelMetrics(db_name), cache=ResponseCache(max_entries=0),
+                                     gateway=gateway)
+            with ThreadPoolExecutor(max_workers=8) as workers:
+                # 32 different open-ended questions arrive at once, then 40 booking page views
+                chats = [workers.submit(timed, lambda n=n: chatbot.generate_response(1, f'Any tips for room {n}?'),
+                                        time.perf_counter()) for n in range(32)]
+                time.sleep(0.05)
+                pages = [workers.submit(timed, lambda: listing.page(1), time.perf_counter()) for _ in range(40)]
+                page_ms = [future.result() for future in pages]
+                chat_ms = [future.result() for future in chats]
+            stats = gateway.stats()
+            gateway.close()
+            rows.append((f'{label}: booking page p50 / max',
+                         f'{statistics.median(page_ms):7.0f} ms {max(page_ms):7.0f} ms'))
+            rows.append((f'{label}: chatbot p50 / max',
+                         f'{statistics.median(chat_ms):7.0f} ms {max(chat_ms):7.0f} ms'))
+            rows.append((f'{label}: answered/busy/timed out',
+                         f"{stats['completed']:4d} {stats['rejected_busy']:4d} {stats['timed_out']:4d}"))
+    report('Chatbot burst vs. booking pages, 8 workers (fake LLM, 2 s per completion)', rows)
+
+def main(argv):
+    names = argv or list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        print(f"Unknown benchmark(s): {', '.join(unknown)}")
+        print(f"Available: {', '.join(BENCHMARKS)}")
+        return 1
+    for name in names:
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
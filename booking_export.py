@@ -0,0 +1,167 @@
+"""
+Streaming CSV / NDJSON exports of bookings and daily revenue.
+
+Rows are read in fixed-size batches from an open cursor and encoded into
+chunks as they are produced, so an export of any size holds only one batch
+and one output chunk in memory. Chunks can be gzip-compressed on the fly.
+"""
+import io
+import csv
+import json
+import zlib
+import datetime
+from typing import Iterable, Iterator, Optional, List
+import database
+
+BATCH_SIZE = 1000         # rows fetched from SQLite at a time
+CHUNK_SIZE = 64 * 1024    # approximate bytes per yielded chunk
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+DATE_FIELDS = {'created': 'created_at', 'check_in': 'check_in_date'}
+
+BOOKING_COLUMNS = ['booking_id', 'hotel_id', 'hotel_name', 'guest_name', 'guest_email', 'guest_phone',
+                   'room_number', 'room_type', 'check_in_date', 'check_out_date', 'guest_count',
+                   'total_amount', 'payment_status', 'booking_status', 'created_at', 'cancelled_at',
+                   'checked_in_at', 'checked_out_at']
+
+REVENUE_COLUMNS = ['hotel_id', 'hotel_name', 'date', 'bookings', 'revenue', 'paid_revenue',
+                   'arrival_paid_revenue', 'occupied_room_nights']
+
+
+def _hotel_ids(cursor, hotel_id: Optional[int]) -> List[int]:
+    if hotel_id is not None:
+        return [hotel_id]
+    cursor.execute('SELECT id FROM hotels ORDER BY id')
+    return [row[0] for row in cursor.fetchall()]
+
+
+def _fetch_batches(cursor) -> Iterator[tuple]:
+    while True:
+        rows = cursor.fetchmany(BATCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def iter_bookings(db_name: str, hotel_id: Optional[int] = None, date_from: Optional[str] = None,
+                  date_to: Optional[str] = None, date_field: str = 'created') -> Iterator[tuple]:
+    """Bookings with room and check-in/out details, one hotel at a time in creation order.
+
+    date_from / date_to (YYYY-MM-DD, inclusive) apply to the booking date
+    (date_field='created') or the check-in date (date_field='check_in').
+    """
+    column = DATE_FIELDS[date_field]
+    conditions = ['b.hotel_id = ?']
+    params = []
+    if date_from:
+        conditions.append(f'b.{column} >= ?')
+        params.append(date_from)
+    if date_to:
+        # created_at carries a time of day; compare against the start of the next day
+        if column == 'created_at':
+            conditions.append('b.created_at < ?')
+            params.append((datetime.date.fromisoformat(date_to) + datetime.timedelta(days=1)).isoformat())
+        else:
+            conditions.append('b.check_in_date <= ?')
+            params.append(date_to)
+
+    conn = database.connect(db_name)
+    try:
+        cursor = conn.cursor()
+        for h_id in _hotel_ids(cursor, hotel_id):
+            # Walks idx_bookings_hotel_created, so no sort of the whole result is needed
+            cursor.execute(f'''
+                SELECT b.id, b.hotel_id, h.name, b.guest_name, b.guest_email, b.guest_phone,
+                       r.room_number, r.room_type, b.check_in_date, b.check_out_date, b.guest_count,
+                       b.total_amount, b.payment_status, b.booking_status, b.created_at, b.cancelled_at,
+                       c.check_in_time, c.check_out_time
+                FROM bookings b
+                JOIN hotels h ON h.id = b.hotel_id
+                JOIN rooms r ON r.id = b.room_id
+                LEFT JOIN check_in_out c ON c.id = (
+                    SELECT MAX(id) FROM check_in_out WHERE booking_id = b.id
+                )
+                WHERE {' AND '.join(conditions)}
+                ORDER BY b.created_at, b.id
+            ''', [h_id] + params)
+            yield from _fetch_batches(cursor)
+    finally:
+        conn.close()
+
+
+def iter_revenue(db_name: str, hotel_id: Optional[int] = None, date_from: Optional[str] = None,
+                 date_to: Optional[str] = None) -> Iterator[tuple]:
+    """Daily rollup rows from hotel_daily_stats, one hotel at a time in date order"""
+    conditions = ['s.hotel_id = ?']
+    params = []
+    if date_from:
+        conditions.append('s.stat_date >= ?')
+        params.append(date_from)
+    if date_to:
+        conditions.append('s.stat_date <= ?')
+        params.append(date_to)
+
+    conn = database.connect(db_name)
+    try:
+        cursor = conn.cursor()
+        for h_id in _hotel_ids(cursor, hotel_id):
+            cursor.execute(f'''
+                SELECT s.hotel_id, h.name, s.stat_date, s.bookings, s.revenue, s.paid_revenue,
+                       s.arrival_paid_revenue, s.occupied_room_nights
+                FROM hotel_daily_stats s
+                JOIN hotels h ON h.id = s.hotel_id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY s.stat_date
+            ''', [h_id] + params)
+            yield from _fetch_batches(cursor)
+    finally:
+        conn.close()
+
+
+def csv_chunks(rows: Iterable[tuple], columns: List[str]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def ndjson_chunks(rows: Iterable[tuple], columns: List[str]) -> Iterator[str]:
+    lines = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+        lines.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(lines)
+            lines, size = [], 0
+    yield ''.join(lines)
+
+
+def encode_chunks(chunks: Iterable[str], compress: bool = False) -> Iterator[bytes]:
+    """UTF-8 encode text chunks, optionally as one continuous gzip stream"""
+    if not compress:
+        for chunk in chunks:
+            if chunk:
+                yield chunk.encode('utf-8')
+        return
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_chunks(rows: Iterable[tuple], columns: List[str], fmt: str, compress: bool = False) -> Iterator[bytes]:
+    chunks = csv_chunks(rows, columns) if fmt == 'csv' else ndjson_chunks(rows, columns)
+    return encode_chunks(chunks, compress)
@@ -0,0 +1,86 @@
+"""
+Keyset-paginated booking listings for the owner bookings page and its JSON API
+"""
+import base64
+from typing import Dict, Any, List, Optional
+import database
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Column order of a listing row, as used by owner_bookings.html
+BOOKING_FIELDS = ['id', 'guest_name', 'guest_email', 'guest_phone', 'room_number',
+                  'check_in_date', 'check_out_date', 'guest_count', 'total_amount',
+                  'payment_status', 'booking_status', 'created_at']
+
+
+def encode_cursor(created_at: str, booking_id: int) -> str:
+    """Opaque token for the position after a row"""
+    return base64.urlsafe_b64encode(f'{created_at}|{booking_id}'.encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    """(created_at, booking_id) from a cursor token; ValueError if it is malformed"""
+    try:
+        created_at, booking_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit('|', 1)
+        return created_at, int(booking_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+class BookingListing:
+    def __init__(self, db_name: str = 'multi_hotel.db'):
+        self.db_name = db_name
+
+    def page(self, hotel_id: int, status: Optional[str] = None, payment_status: Optional[str] = None,
+             check_in_from: Optional[str] = None, check_in_to: Optional[str] = None,
+             cursor: Optional[str] = None, limit: int = PAGE_SIZE) -> Dict[str, Any]:
+        """Newest-first page of a hotel's bookings.
+
+        Rows are ordered by (created_at, id) descending and the next page starts
+        strictly after the last row returned, so every page is an index range
+        seek no matter how deep it is. next_cursor is None on the last page.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        conditions = ['b.hotel_id = ?']
+        params: List[Any] = [hotel_id]
+        if status:
+            conditions.append('b.booking_status = ?')
+            params.append(status)
+        if payment_status:
+            conditions.append('b.payment_status = ?')
+            params.append(payment_status)
+        if check_in_from:
+            conditions.append('b.check_in_date >= ?')
+            params.append(check_in_from)
+        if check_in_to:
+            conditions.append('b.check_in_date <= ?')
+            params.append(check_in_to)
+        if cursor:
+            conditions.append('(b.created_at, b.id) < (?, ?)')
+            params.extend(decode_cursor(cursor))
+
+        conn = database.connect(self.db_name)
+        try:
+            rows = conn.execute(f'''
+                SELECT b.id, b.guest_name, b.guest_email, b.guest_phone, r.room_number,
+                       b.check_in_date, b.check_out_date, b.guest_count, b.total_amount,
+                       b.payment_status, b.booking_status, b.created_at
+                FROM bookings b
+                JOIN rooms r ON b.room_id = r.id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY b.created_at DESC, b.id DESC
+                LIMIT ?
+            ''', params + [limit + 1]).fetchall()
+        finally:
+            conn.close()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][11], rows[-1][0])
+        return {'bookings': rows, 'next_cursor': next_cursor}
+
+    @staticmethod
+    def as_dicts(rows) -> List[Dict[str, Any]]:
+        return [dict(zip(BOOKING_FIELDS, row)) for row in rows]
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Change log for delta sync: "what changed since cursor C?"
+
+Triggers on bookings, check_in_out and guest_documents append one row per
+write to change_log, whatever code path makes it. A client keeps the id of
+the last row it saw as its cursor and asks /api/changes?since=<cursor> for
+the rows changed after it, getting each changed row's current state once
+instead of downloading the whole dataset again.
+
+A check-in/out write is logged as a change to its booking, since the booking
+snapshot carries the check-in/out times.
+
+Run this module to prune old entries:
+python change_log.py [days]   (default: keep 30 days)
+"""
+import sys
+import json
+import time
+from typing import Any, Dict, Optional
+import database
+from hotel_events import load_bookings
+
+DB_NAME = 'multi_hotel.db'
+
+# Most changed rows returned by one /api/changes call
+MAX_CHANGES = 500
+RETENTION_DAYS = 30
+
+CHANGE_LOG_TABLE = '''
+CREATE TABLE IF NOT EXISTS change_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hotel_id INTEGER,
+    table_name TEXT NOT NULL,
+    row_id INTEGER NOT NULL,
+    op TEXT NOT NULL,
+    changed_at REAL NOT NULL
+)
+'''
+
+# Unix time in SQL, matching the time.time() timestamps used elsewhere
+_NOW = "(julianday('now') - 2440587.5) * 86400.0"
+
+# (logged table, row id, hotel id) for each tracked table, in terms of the
+# trigger's NEW/OLD row
+_TRACKED = {
+    'bookings': ('bookings', '{row}.id', '{row}.hotel_id'),
+    'check_in_out': ('bookings', '{row}.booking_id',
+                     '(SELECT hotel_id FROM bookings WHERE id = {row}.booking_id)'),
+    'guest_documents': ('guest_documents', '{row}.id',
+                        '(SELECT hotel_id FROM bookings WHERE id = {row}.booking_id)'),
+}
+
+
+def _trigger(table: str, event: str) -> str:
+    logged_table, row_id, hotel_id = _TRACKED[table]
+    row = 'OLD' if event == 'DELETE' else 'NEW'
+    op = 'delete' if event == 'DELETE' and logged_table == table else 'upsert'
+    return f'''
+CREATE TRIGGER IF NOT EXISTS change_log_{table}_{event.lower()} AFTER {event} ON {table}
+BEGIN
+    INSERT INTO change_log (hotel_id, table_name, row_id, op, changed_at)
+    VALUES ({hotel_id.format(row=row)}, '{logged_table}', {row_id.format(row=row)}, '{op}', {_NOW});
+END
+'''
+
+
+CHANGE_LOG_TRIGGERS = [_trigger(table, event) for table in _TRACKED for event in ('INSERT', 'UPDATE', 'DELETE')]
+
+
+def prune(conn, older_than_days: float = RETENTION_DAYS) -> int:
+    """Delete entries older than the given age; clients with older cursors resync fully"""
+    cursor = conn.execute('DELETE FROM change_log WHERE changed_at < ?',
+                          (time.time() - older_than_days * 86400,))
+    return cursor.rowcount
+
+
+class ChangeFeed:
+    def __init__(self, db_name: str = DB_NAME):
+        self.db_name = db_name
+
+    def changes(self, hotel_id: int, since: Optional[int] = None, limit: int = MAX_CHANGES) -> Dict[str, Any]:
+        """A hotel's changed rows after cursor `since`, at most `limit` log entries at a time.
+
+        Returns the new cursor, whether more changes are waiting, and per table
+        the changed rows' current state and the ids of deleted rows. `reset` is
+        set when the client has no usable cursor and must reload everything.
+        """
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT MIN(id), MAX(id) FROM change_log')
+            oldest, latest = cursor.fetchone()
+            if oldest is None:
+                cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM sqlite_sequence WHERE name = 'change_log'")
+                latest = cursor.fetchone()[0]
+                oldest = latest + 1
+            result = {
+                'cursor': latest,
+                'has_more': False,
+                'reset': False,
+                'bookings': {'upserted': [], 'deleted': []},
+                'guest_documents': {'upserted': [], 'deleted': []},
+            }
+            # No cursor, one from before pruned entries, or one from another database
+            if since is None or since < oldest - 1 or since > latest:
+                result['reset'] = True
+                return result
+
+            cursor.execute('''
+                SELECT id, table_name, row_id, op FROM change_log
+                WHERE hotel_id = ? AND id > ?
+                ORDER BY id
+                LIMIT ?
+            ''', (hotel_id, since, limit + 1))
+            entries = cursor.fetchall()
+            if len(entries) > limit:
+                entries = entries[:limit]
+                result['has_more'] = True
+                result['cursor'] = entries[-1][0]
+
+            # Only the last change of each row matters
+            final = {}
+            for _, table_name, row_id, op in entries:
+                final[(table_name, row_id)] = op
+            changed = {'bookings': [], 'guest_documents': []}
+            for (table_name, row_id), op in final.items():
+                if op == 'delete':
+                    result[table_name]['deleted'].append(row_id)
+                else:
+                    changed[table_name].append(row_id)
+
+            bookings = load_bookings(cursor, changed['bookings'])
+            documents = self._load_documents(cursor, changed['guest_documents'])
+        finally:
+            conn.close()
+
+        for table_name, rows in (('bookings', bookings), ('guest_documents', documents)):
+            for row_id in changed[table_name]:
+                if row_id in rows:
+                    result[table_name]['upserted'].append(rows[row_id])
+                else:
+                    # Deleted by a change past this page
+                    result[table_name]['deleted'].append(row_id)
+        return result
+
+    def cursor(self) -> int:
+        """Cursor of the latest change, so a page can poll for what changes after it renders"""
+        conn = database.connect(self.db_name)
+        try:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'change_log'").fetchone()
+        finally:
+            conn.close()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _load_documents(cursor, document_ids) -> Dict[int, Dict[str, Any]]:
+        cursor.execute('''
+            SELECT id, booking_id, guest_name, document_type, document_id, file_name,
+                   uploaded_at, is_verified
+            FROM guest_documents
+            WHERE id IN (SELECT value FROM json_each(?))
+        ''', (json.dumps(list(document_ids)),))
+        return {row[0]: {
+            'id': row[0],
+            'booking_id': row[1],
+            'guest_name': row[2],
+            'document_type': row[3],
+            'document_id': row[4],
+            'file_name': row[5],
+            'uploaded_at': row[6],
+            'is_verified': bool(row[7]),
+        } for row in cursor.fetchall()}
+
+
+def main(argv):
+    days = float(argv[1]) if len(argv) > 1 else RETENTION_DAYS
+    conn = database.connect(DB_NAME)
+    try:
+        removed = prune(conn, days)
+        conn.commit()
+        print(f"✅ Pruned {removed} change log entries older than {days:g} days")
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
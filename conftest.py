@@ -0,0 +1,90 @@
+"""
+Shared pytest fixtures: an isolated multi-hotel database per test
+"""
+import os
+import datetime
+import pytest
+
+# The chatbot's LLM gateway needs an API key to build its client
+os.environ.setdefault('OPENAI_API_KEY', 'test-key')
+
+
+@pytest.fixture
+def hotel_db(tmp_path, monkeypatch):
+    """Point multi_hotel_app and its services at a fresh database with one hotel"""
+    import multi_hotel_app
+
+    db_path = str(tmp_path / 'multi_hotel.db')
+    monkeypatch.setattr(multi_hotel_app, 'DB_NAME', db_path)
+    for service in (multi_hotel_app.ai_chatbot, multi_hotel_app.document_manager,
+                    multi_hotel_app.availability_engine, multi_hotel_app.hotel_metrics,
+                    multi_hotel_app.booking_listing, multi_hotel_app.booking_importer,
+                    multi_hotel_app.occupancy_calendar, multi_hotel_app.held_rooms,
+                    multi_hotel_app.event_broker, multi_hotel_app.change_feed):
+        monkeypatch.setattr(service, 'db_name', db_path)
+    multi_hotel_app.setup_database()
+    multi_hotel_app.hotel_metrics.clear()
+
+    conn = multi_hotel_app.database.connect(db_path)
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute('''
+    INSERT INTO hotels (id, name, address, owner_name, owner_email, created_at)
+    VALUES (1, 'Test Hotel', '1 Test Street', 'Owner', 'owner@test.com', ?)
+    ''', (now,))
+    conn.commit()
+    conn.close()
+    return db_path
+
+
+def add_room(db_path, room_number, hotel_id=1, room_type='Standard', price=100.0, capacity=2):
+    import database
+    conn = database.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('''
+    INSERT INTO rooms (hotel_id, room_number, room_type, price_per_night, capacity, created_at)
+    VALUES (?, ?, ?, ?, ?, '2024-01-01 00:00:00')
+    ''', (hotel_id, room_number, room_type, price, capacity))
+    conn.commit()
+    conn.close()
+    return cursor.lastrowid
+
+
+def add_booking(db_path, room_id, check_in_date, check_out_date, hotel_id=1,
+                booking_status='confirmed', payment_status='pending', total_amount=100.0,
+                guest_name='Guest', created_at='2024-01-01 00:00:00'):
+    import database
+    import daily_stats
+    import room_calendar
+    conn = database.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute('''
+    INSERT INTO bookings (hotel_id, guest_name, room_id, check_in_date, check_out_date,
+                          guest_count, total_amount, payment_status, booking_status, created_at)
+    VALUES (?, ?, ?, ?, ?, 1, ?, ?, ?, ?)
+    ''', (hotel_id, guest_name, room_id, check_in_date, check_out_date, total_amount,
+          payment_status, booking_status, created_at))
+    booking_id = cursor.lastrowid
+    daily_stats.record_booking_change(cursor, booking_id, None)
+    room_calendar.record_booking_change(cursor, booking_id, None)
+    conn.commit()
+    conn.close()
+    return booking_id
+
+
+@pytest.fixture
+def doc_manager(hotel_db, tmp_path):
+    """A DocumentManager storing uploads under tmp_path, with its own optimizer"""
+    from document_manager import DocumentManager
+    from image_optimizer import ImageOptimizer
+
+    manager = DocumentManager(optimizer=ImageOptimizer(max_workers=1))
+    manager.db_name = hotel_db
+    manager.upload_folder = str(tmp_path / 'documents')
+    yield manager
+    manager.optimizer.shutdown()
+
+
+@pytest.fixture
+def booking_id(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    return add_booking(hotel_db, room_id, '2024-06-01', '2024-06-03')
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Per-hotel daily rollup of bookings, revenue and occupied room-nights.
+
+hotel_daily_stats is maintained incrementally: every booking write loads the
+booking before and after the change and applies the difference in the same
+transaction. Run this module to rebuild the table from the bookings history.
+"""
+import sys
+import datetime
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Tuple
+import database
+
+DB_NAME = 'multi_hotel.db'
+
+DAILY_STATS_TABLE = '''
+CREATE TABLE IF NOT EXISTS hotel_daily_stats (
+    hotel_id INTEGER NOT NULL,
+    stat_date TEXT NOT NULL,
+    bookings INTEGER NOT NULL DEFAULT 0,
+    revenue REAL NOT NULL DEFAULT 0,
+    paid_revenue REAL NOT NULL DEFAULT 0,
+    arrival_paid_revenue REAL NOT NULL DEFAULT 0,
+    occupied_room_nights INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hotel_id, stat_date)
+) WITHOUT ROWID
+'''
+
+# Columns of a booking that feed the rollup, in the order load_booking returns them
+BOOKING_COLUMNS = 'hotel_id, created_at, check_in_date, check_out_date, total_amount, payment_status, booking_status'
+
+def booking_contributions(booking: Optional[Tuple]) -> Dict[Tuple[int, str], list]:
+    """What a single booking adds to hotel_daily_stats, keyed by (hotel_id, date).
+
+    - bookings / revenue / paid_revenue are attributed to the day it was made
+    - arrival_paid_revenue is attributed to the check-in day
+    - occupied_room_nights counts each night in [check_in, check_out)
+    Cancelled bookings contribute nothing.
+    """
+    contributions = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0])
+    if booking is None:
+        return contributions
+
+    hotel_id, created_at, check_in_date, check_out_date, total_amount, payment_status, booking_status = booking
+    if booking_status == 'cancelled':
+        return contributions
+
+    paid = payment_status == 'paid'
+    booked = contributions[(hotel_id, created_at[:10])]
+    booked[0] += 1
+    booked[1] += total_amount
+    if paid:
+        booked[2] += total_amount
+        contributions[(hotel_id, check_in_date)][3] += total_amount
+
+    night = datetime.date.fromisoformat(check_in_date)
+    check_out = datetime.date.fromisoformat(check_out_date)
+    while night < check_out:
+        contributions[(hotel_id, night.isoformat())][4] += 1
+        night += datetime.timedelta(days=1)
+
+    return contributions
+
+
+def load_booking(cursor, booking_id: int) -> Optional[Tuple]:
+    """Read the rollup-relevant columns of a booking (None if it doesn't exist)"""
+    cursor.execute(f'SELECT {BOOKING_COLUMNS} FROM bookings WHERE id = ?', (booking_id,))
+    return cursor.fetchone()
+
+
+def apply_booking_change(cursor, before: Optional[Tuple], after: Optional[Tuple]):
+    """Move a booking's contribution from its `before` to its `after` state"""
+    deltas = booking_contributions(after)
+    for key, values in booking_contributions(before).items():
+        delta = deltas[key]
+        for i, value in enumerate(values):
+            delta[i] -= value
+
+    _add_to_rollup(cursor, deltas)
+
+
+def record_new_bookings(cursor, bookings: Iterable[Tuple]):
+    """Add many inserted bookings (BOOKING_COLUMNS tuples) to the rollup in one pass"""
+    totals = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0])
+    for booking in bookings:
+        for key, values in booking_contributions(booking).items():
+            total = totals[key]
+            for i, value in enumerate(values):
+                total[i] += value
+    _add_to_rollup(cursor, totals)
+
+
+def _add_to_rollup(cursor, deltas: Dict[Tuple[int, str], list]):
+    rows = [(hotel_id, stat_date, *values)
+            for (hotel_id, stat_date), values in deltas.items() if any(values)]
+    if rows:
+        cursor.executemany('''
+            INSERT INTO hotel_daily_stats
+            (hotel_id, stat_date, bookings, revenue, paid_revenue, arrival_paid_revenue, occupied_room_nights)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (hotel_id, stat_date) DO UPDATE SET
+                bookings = bookings + excluded.bookings,
+                revenue = ROUND(revenue + excluded.revenue, 2),
+                paid_revenue = ROUND(paid_revenue + excluded.paid_revenue, 2),
+                arrival_paid_revenue = ROUND(arrival_paid_revenue + excluded.arrival_paid_revenue, 2),
+                occupied_room_nights = occupied_room_nights + excluded.occupied_room_nights
+        ''', rows)
+
+
+def record_booking_change(cursor, booking_id: int, before: Optional[Tuple]):
+    """Apply a booking write to the rollup; call after the write, before commit"""
+    apply_booking_change(cursor, before, load_booking(cursor, booking_id))
+
+
+def compute_daily_stats(cursor, hotel_id: Optional[int] = None) -> Dict[Tuple[int, str], list]:
+    """Recompute the rollup from scratch out of the bookings table"""
+    query = f'SELECT {BOOKING_COLUMNS} FROM bookings'
+    params = ()
+    if hotel_id is not None:
+        query += ' WHERE hotel_id = ?'
+        params = (hotel_id,)
+
+    totals = defaultdict(lambda: [0, 0.0, 0.0, 0.0, 0])
+    cursor.execute(query, params)
+    for booking in cursor:
+        for key, values in booking_contributions(booking).items():
+            total = totals[key]
+            for i, value in enumerate(values):
+                total[i] += value
+    return totals
+
+
+def backfill(conn, hotel_id: Optional[int] = None) -> int:
+    """Rebuild hotel_daily_stats for one hotel or all of them.
+
+    Runs inside the caller's transaction; returns the number of rollup rows written.
+    """
+    cursor = conn.cursor()
+    totals = compute_daily_stats(cursor, hotel_id)
+    rows = [(h_id, stat_date, values[0], round(values[1], 2), round(values[2], 2),
+             round(values[3], 2), values[4])
+            for (h_id, stat_date), values in totals.items()]
+
+    if hotel_id is None:
+        cursor.execute('DELETE FROM hotel_daily_stats')
+    else:
+        cursor.execute('DELETE FROM hotel_daily_stats WHERE hotel_id = ?', (hotel_id,))
+    cursor.executemany('''
+        INSERT INTO hotel_daily_stats
+        (hotel_id, stat_date, bookings, revenue, paid_revenue, arrival_paid_revenue, occupied_room_nights)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', rows)
+    return len(rows)
+
+
+def main(argv):
+    """Rebuild the rollup: python daily_stats.py [hotel_id]"""
+    hotel_id = int(argv[0]) if argv else None
+    conn = database.connect(DB_NAME)
+    try:
+        conn.execute(DAILY_STATS_TABLE)
+        rows = backfill(conn, hotel_id)
+        conn.commit()
+        scope = f"hotel {hotel_id}" if hotel_id is not None else "all hotels"
+        print(f"✅ Rebuilt hotel_daily_stats for {scope}: {rows} day(s)")
+    except Exception as e:
+        print(f"❌ Backfill failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,239 @@
+"""
+Shared SQLite access layer with pooled, per-thread connections
+"""
+import os
+import sqlite3
+import threading
+from typing import Dict, Any, Optional
+
+# Applied to every new connection before it is handed out
+CONNECTION_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('mmap_size', 256 * 1024 * 1024),  # 256MB
+    ('cache_size', -16000),  # ~16MB page cache (negative = KiB)
+)
+
+MAX_CONNECTIONS = 16
+ACQUIRE_TIMEOUT = 30.0  # seconds to wait for a free connection
+
+
+class PooledConnection:
+    """Thin proxy around a pooled sqlite3 connection.
+
+    Behaves like sqlite3.Connection, except close() hands the connection back
+    to its pool instead of closing it.
+    """
+
+    def __init__(self, pool: 'ConnectionPool', conn: sqlite3.Connection):
+        object.__setattr__(self, '_pool', pool)
+        object.__setattr__(self, '_conn', conn)
+
+    def __getattr__(self, name):
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._raw(), name, value)
+
+    def _raw(self) -> sqlite3.Connection:
+        conn = self.__dict__.get('_conn')
+        if conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return conn
+
+    def close(self):
+        """Return the connection to the pool (safe to call more than once)"""
+        conn = self.__dict__.get('_conn')
+        if conn is not None:
+            object.__setattr__(self, '_conn', None)
+            self._pool.release(conn)
+
+    def __enter__(self):
+        self._raw().__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return self._raw().__exit__(exc_type, exc, tb)
+
+
+class ConnectionPool:
+    """Pool of SQLite connections for a single database file.
+
+    A thread keeps the same connection for as long as it holds at least one
+    PooledConnection, so nested helpers share one connection (and one
+    transaction). Once the outermost holder closes, the connection goes back
+    to the idle list for any other thread to reuse.
+    """
+
+    def __init__(self, db_name: str, max_connections: int = MAX_CONNECTIONS,
+                 timeout: float = ACQUIRE_TIMEOUT):
+        self.db_name = db_name
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._local = threading.local()
+        self._cond = threading.Condition()
+        self._idle = []
+        self._open = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+
+    def _new_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_name, check_same_thread=False)
+        for pragma, value in CONNECTION_PRAGMAS:
+            conn.execute(f'PRAGMA {pragma} = {value}')
+        return conn
+
+    def connect(self) -> PooledConnection:
+        """Check out this thread's connection, reusing a pooled one if possible"""
+        held = getattr(self._local, 'conn', None)
+        if held is not None:
+            self._local.depth += 1
+            with self._cond:
+                self._hits += 1
+            return PooledConnection(self, held)
+
+        conn = None
+        with self._cond:
+            if not self._idle and self._open >= self.max_connections:
+                self._waits += 1
+                available = lambda: self._idle or self._open < self.max_connections
+                if not self._cond.wait_for(available, timeout=self.timeout):
+                    raise sqlite3.OperationalError(
+                        f'Timed out waiting for a connection to {self.db_name}')
+            if self._idle:
+                conn = self._idle.pop()
+                self._hits += 1
+            else:
+                self._open += 1
+                self._misses += 1
+
+        if conn is None:
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+
+        self._local.conn = conn
+        self._local.depth = 1
+        return PooledConnection(self, conn)
+
+    def release(self, conn: sqlite3.Connection):
+        """Give back one checkout; the last one returns the connection to the pool"""
+        if getattr(self._local, 'conn', None) is not conn:
+            return
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        self._checkin(conn)
+
+    def release_thread(self):
+        """Return this thread's connection regardless of outstanding checkouts"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            self._local.conn = None
+            self._local.depth = 0
+            self._checkin(conn)
+
+    def _checkin(self, conn: sqlite3.Connection):
+        try:
+            # Never leak a half-finished transaction to the next borrower
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+        except sqlite3.Error:
+            conn.close()
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection (connections in use are closed on return)"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool counters: hits, misses, waits and open/idle connections"""
+        with self._cond:
+            return {
+                'hits': self._hits,
+                'misses': self._misses,
+                'waits': self._waits,
+                'open_connections': self._open,
+                'idle_connections': len(self._idle),
+                'max_connections': self.max_connections,
+            }
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_name: str) -> ConnectionPool:
+    """Get (or create) the shared pool for a database file"""
+    pool = _pools.get(db_name)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_name)
+            if pool is None:
+                pool = _pools[db_name] = ConnectionPool(db_name)
+    return pool
+
+
+def connect(db_name: str) -> PooledConnection:
+    """Drop-in replacement for sqlite3.connect() backed by the shared pool"""
+    return get_pool(db_name).connect()
+
+
+def release_thread_connections():
+    """Return any connections still held by the current thread to their pools"""
+    for pool in list(_pools.values()):
+        pool.release_thread()
+
+
+def pool_stats(db_name: Optional[str] = None) -> Dict[str, Any]:
+    """Statistics for one pool, or for every pool keyed by database file"""
+    if db_name is not None:
+        return get_pool(db_name).stats()
+    return {name: pool.stats() for name, pool in list(_pools.items())}
+
+
+def close_all_pools():
+    """Close idle connections in every pool and forget the pools"""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
+
+
+# Pools inherited across a fork; kept referenced so their connections are
+# never closed (and the parent's WAL checkpointed) from the child
+_inherited_pools = []
+
+
+def _forget_pools_after_fork():
+    # SQLite connections must not cross a fork: a forked worker sets aside
+    # the pools it inherited and opens its own connections on first use
+    global _pools_lock
+    _inherited_pools.extend(_pools.values())
+    _pools.clear()
+    _pools_lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_pools_after_fork)
@@ -1,51 +1,225 @@
 #!/usr/bin/env python3
 """
 Database migration script to add document management features
+and keep the schema at the latest version
 """
-import sqlite3
 import os
+import database
+import daily_stats
+import notification_outbox
+import document_manager
+import room_calendar
+import room_nights
+import room_holds
+import hotel_events
+import change_log
+import telegram_inbox
+import hotel_metrics
 
 DB_NAME = 'multi_hotel.db'
 
+GUEST_DOCUMENTS_TABLE = '''
+CREATE TABLE IF NOT EXISTS guest_documents (
+    id INTEGER PRIMARY KEY,
+    booking_id INTEGER NOT NULL,
+    guest_name TEXT NOT NULL,
+    document_type TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    file_size INTEGER,
+    uploaded_at TEXT NOT NULL,
+    is_verified BOOLEAN DEFAULT 0,
+    FOREIGN KEY (booking_id) REFERENCES bookings (id),
+    UNIQUE(document_id, document_type)
+)
+'''
+
+# Versioned schema changes, applied in order and recorded in PRAGMA user_version.
+# Append new versions at the end; never edit one that has already shipped.
+MIGRATIONS = [
+    (1, 'Guest documents table', [
+        GUEST_DOCUMENTS_TABLE,
+    ]),
+    (2, 'Indexes for booking, check-in/out and document hot paths', [
+        # Dashboard, today's check-ins, pending payments, availability search
+        'CREATE INDEX IF NOT EXISTS idx_bookings_hotel_status_checkin '
+        'ON bookings (hotel_id, booking_status, check_in_date)',
+        # Today's check-outs
+        'CREATE INDEX IF NOT EXISTS idx_bookings_hotel_status_checkout '
+        'ON bookings (hotel_id, booking_status, check_out_date)',
+        # Booking lists ordered by creation time
+        'CREATE INDEX IF NOT EXISTS idx_bookings_hotel_created '
+        'ON bookings (hotel_id, created_at)',
+        # Platform-wide monthly figures on the admin dashboard
+        'CREATE INDEX IF NOT EXISTS idx_bookings_created '
+        'ON bookings (created_at)',
+        # Per-room overlap checks and room/booking joins
+        'CREATE INDEX IF NOT EXISTS idx_bookings_room_dates '
+        'ON bookings (room_id, check_in_date, check_out_date)',
+        'CREATE INDEX IF NOT EXISTS idx_check_in_out_booking '
+        'ON check_in_out (booking_id)',
+        'CREATE INDEX IF NOT EXISTS idx_guest_documents_booking '
+        'ON guest_documents (booking_id)',
+    ]),
+    (3, 'Daily revenue and occupancy rollup', [
+        daily_stats.DAILY_STATS_TABLE,
+        'CREATE INDEX IF NOT EXISTS idx_hotel_daily_stats_date '
+        'ON hotel_daily_stats (stat_date)',
+        daily_stats.backfill,
+        # Platform-wide monthly figures now come from the rollup
+        'DROP INDEX IF EXISTS idx_bookings_created',
+    ]),
+    (4, 'Telegram notification outbox', [
+        notification_outbox.NOTIFICATION_OUTBOX_TABLE,
+        'CREATE INDEX IF NOT EXISTS idx_notification_outbox_due '
+        'ON notification_outbox (status, next_attempt_at)',
+    ]),
+    (5, 'Background image optimization status', [
+        # NULL for documents that are not optimized (PDFs, Word files)
+        'ALTER TABLE guest_documents ADD COLUMN optimization_status TEXT',
+        # Images uploaded so far were optimized during the upload request
+        "UPDATE guest_documents SET optimization_status = 'optimized' "
+        "WHERE lower(file_path) LIKE '%.jpg' OR lower(file_path) LIKE '%.jpeg' OR lower(file_path) LIKE '%.png'",
+        'CREATE INDEX IF NOT EXISTS idx_guest_documents_pending '
+        "ON guest_documents (id) WHERE optimization_status = 'pending'",
+    ]),
+    (6, 'Content-addressed document storage', [
+        # BLAKE2 hash of the uploaded bytes; documents sharing it share one stored file.
+        # NULL for documents uploaded under the old timestamped file names
+        'ALTER TABLE guest_documents ADD COLUMN content_hash TEXT',
+        'CREATE INDEX IF NOT EXISTS idx_guest_documents_content_hash '
+        'ON guest_documents (content_hash)',
+    ]),
+    (7, 'Full-text search over guest documents', [
+        *document_manager.DOCUMENT_SEARCH_SCHEMA,
+        document_manager.rebuild_search_index,
+    ]),
+    (8, 'Index for status-filtered booking listings', [
+        # Keyset pages of one status, newest first; unfiltered pages use idx_bookings_hotel_created
+        'CREATE INDEX IF NOT EXISTS idx_bookings_hotel_status_created '
+        'ON bookings (hotel_id, booking_status, created_at)',
+    ]),
+    (9, 'Per-room occupancy calendar', [
+        room_calendar.ROOM_CALENDAR_TABLE,
+        # Availability and occupancy across a hotel's rooms for a few months
+        'CREATE INDEX IF NOT EXISTS idx_room_calendar_hotel_month '
+        'ON room_calendar (hotel_id, month)',
+        room_calendar.rebuild,
+    ]),
+    (10, 'Room-night double-booking guard', [
+        room_nights.ROOM_NIGHTS_TABLE,
+        # Releasing a booking's nights on cancel, check-out and edit
+        'CREATE INDEX IF NOT EXISTS idx_room_nights_booking '
+        'ON room_nights (booking_id)',
+        room_nights.rebuild,
+    ]),
+    (11, 'Short-lived room holds', [
+        room_holds.ROOM_HOLDS_TABLE,
+        # Holds on a room's nights, and the sweeper's expiry scan
+        'CREATE INDEX IF NOT EXISTS idx_room_holds_room '
+        'ON room_holds (room_id, check_in_date)',
+        'CREATE INDEX IF NOT EXISTS idx_room_holds_expires '
+        'ON room_holds (expires_at)',
+    ]),
+    (12, 'Per-hotel event stream for front-desk screens', [
+        hotel_events.HOTEL_EVENTS_TABLE,
+        # Replaying a hotel's missed events on reconnect, and pruning old ones
+        'CREATE INDEX IF NOT EXISTS idx_hotel_events_hotel '
+        'ON hotel_events (hotel_id, id)',
+        'CREATE INDEX IF NOT EXISTS idx_hotel_events_created '
+        'ON hotel_events (created_at)',
+    ]),
+    (13, 'Trigger-maintained change log for delta sync', [
+        change_log.CHANGE_LOG_TABLE,
+        # A hotel's changes after a cursor, and pruning old entries
+        'CREATE INDEX IF NOT EXISTS idx_change_log_hotel '
+        'ON change_log (hotel_id, id)',
+        'CREATE INDEX IF NOT EXISTS idx_change_log_changed '
+        'ON change_log (changed_at)',
+        *change_log.CHANGE_LOG_TRIGGERS,
+    ]),
+    (14, 'Durable inbox for Telegram webhook updates', [
+        telegram_inbox.TELEGRAM_INBOX_TABLE,
+        # Each chat's oldest unhandled update, and pruning handled ones
+        "CREATE INDEX IF NOT EXISTS idx_telegram_inbox_open "
+        "ON telegram_inbox (chat_key, update_id) WHERE status != 'done'",
+        'CREATE INDEX IF NOT EXISTS idx_telegram_inbox_handled '
+        'ON telegram_inbox (handled_at)',
+    ]),
+    (15, 'Per-hotel data versions for cross-process metrics caching', [
+        hotel_metrics.HOTEL_VERSIONS_TABLE,
+        *hotel_metrics.HOTEL_VERSION_TRIGGERS,
+    ]),
+    (16, 'Pending-image index keyed by file path', [
+        # The optimizer marks documents done by file path; the restart sweep
+        # reads the same (small) partial index
+        'DROP INDEX IF EXISTS idx_guest_documents_pending',
+        'CREATE INDEX IF NOT EXISTS idx_guest_documents_pending_path '
+        "ON guest_documents (file_path) WHERE optimization_status = 'pending'",
+    ]),
+    (17, 'Version hotel deletions too', [
+        # Adds the hotels DELETE trigger; the others already exist
+        *hotel_metrics.HOTEL_VERSION_TRIGGERS,
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn) -> int:
+    """Current schema version of an open database"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+def apply_migrations(conn) -> int:
+    """Apply every migration newer than the database's schema version.
+
+    Returns the number of migrations applied. Each version is committed on its
+    own so an interrupted run resumes where it stopped.
+    """
+    if conn.in_transaction:
+        conn.commit()
+    current = get_schema_version(conn)
+    applied = 0
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            conn.execute('BEGIN')
+            for statement in statements:
+                # Data migrations are callables that receive the connection
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied += 1
+    return applied
+
+
 def migrate_database():
-    """Add new tables and columns for document management"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
+    """Bring the database schema up to date"""
+    conn = database.connect(DB_NAME)
+
     try:
-        # Create documents table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS guest_documents (
-            id INTEGER PRIMARY KEY,
-            booking_id INTEGER NOT NULL,
-            guest_name TEXT NOT NULL,
-            document_type TEXT NOT NULL,
-            document_id TEXT NOT NULL,
-            file_path TEXT NOT NULL,
-            file_name TEXT NOT NULL,
-            file_size INTEGER,
-            uploaded_at TEXT NOT NULL,
-            is_verified BOOLEAN DEFAULT 0,
-            FOREIGN KEY (booking_id) REFERENCES bookings (id),
-            UNIQUE(document_id, document_type)
-        )
-        ''')
-        
         # Create uploads directory if it doesn't exist
         uploads_dir = 'static/uploads/documents'
         os.makedirs(uploads_dir, exist_ok=True)
-        
-        print("✅ Documents table created successfully")
         print("✅ Upload directory created")
-        
-        conn.commit()
+
+        applied = apply_migrations(conn)
+        print(f"✅ Applied {applied} migration(s), schema version {get_schema_version(conn)}")
         print("✅ Database migration completed successfully!")
-        
+
     except Exception as e:
         print(f"❌ Migration failed: {e}")
-        conn.rollback()
     finally:
         conn.close()
 
 if __name__ == "__main__":
-    migrate_database()
\ No newline at end of file
+    migrate_database()
@@ -2,16 +2,84 @@
 Document management service for guest document uploads and management
 """
 import os
-import sqlite3
+import re
+import database
 import datetime
 import hashlib
 from typing import List, Dict, Any, Optional
 from werkzeug.utils import secure_filename
-from PIL import Image
+from image_optimizer import ImageOptimizer, is_optimizable
+
+# Full-text index over guest name, document ID and type. hotel_id is indexed too so a
+# search only ever walks one hotel's postings; it carries no weight in the ranking.
+DOCUMENT_SEARCH_SCHEMA = [
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS guest_documents_fts USING fts5(
+        hotel_id, guest_name, document_id, document_type,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    ''',
+    # Document ID matches rank above guest names, which rank above the type
+    "INSERT INTO guest_documents_fts (guest_documents_fts, rank) VALUES ('rank', 'bm25(0.0, 5.0, 10.0, 1.0)')",
+    '''
+    CREATE TRIGGER IF NOT EXISTS guest_documents_fts_insert AFTER INSERT ON guest_documents BEGIN
+        INSERT INTO guest_documents_fts (rowid, hotel_id, guest_name, document_id, document_type)
+        VALUES (new.id, (SELECT hotel_id FROM bookings WHERE id = new.booking_id),
+                new.guest_name, new.document_id, new.document_type);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS guest_documents_fts_delete AFTER DELETE ON guest_documents BEGIN
+        DELETE FROM guest_documents_fts WHERE rowid = old.id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS guest_documents_fts_update
+    AFTER UPDATE OF booking_id, guest_name, document_id, document_type ON guest_documents BEGIN
+        DELETE FROM guest_documents_fts WHERE rowid = old.id;
+        INSERT INTO guest_documents_fts (rowid, hotel_id, guest_name, document_id, document_type)
+        VALUES (new.id, (SELECT hotel_id FROM bookings WHERE id = new.booking_id),
+                new.guest_name, new.document_id, new.document_type);
+    END
+    ''',
+]
+
+
+def rebuild_search_index(conn):
+    """Repopulate guest_documents_fts from guest_documents (runs in the caller's transaction)"""
+    conn.execute('DELETE FROM guest_documents_fts')
+    conn.execute('''
+        INSERT INTO guest_documents_fts (rowid, hotel_id, guest_name, document_id, document_type)
+        SELECT gd.id, b.hotel_id, gd.guest_name, gd.document_id, gd.document_type
+        FROM guest_documents gd
+        LEFT JOIN bookings b ON gd.booking_id = b.id
+    ''')
+
+
+def search_query(hotel_id: int, search_term: str) -> Optional[str]:
+    """FTS5 MATCH expression for a hotel and free-text term.
+
+    Every word must match as a token prefix; punctuation inside a word
+    ("AB-1234") becomes a phrase of consecutive tokens. None if the term has
+    nothing searchable.
+    """
+    phrases = []
+    for word in search_term.split():
+        # Same split as the unicode61 tokenizer: letters and digits, '_' separates
+        tokens = re.findall(r'[^\W_]+', word)
+        if tokens:
+            phrases.append('"' + ' '.join(tokens) + '"*')
+    if not phrases:
+        return None
+    return f'hotel_id : "{int(hotel_id)}" AND {{guest_name document_id document_type}} : ({" AND ".join(phrases)})'
+
 
 class DocumentManager:
-    def __init__(self):
+    def __init__(self, optimizer: Optional[ImageOptimizer] = None):
         self.db_name = 'multi_hotel.db'
+        # Image resizing runs in worker processes, off the request path
+        self.optimizer = optimizer or ImageOptimizer()
         self.upload_folder = 'static/uploads/documents'
         self.allowed_extensions = {'pdf', 'jpg', 'jpeg', 'png', 'gif', 'doc', 'docx'}
         self.max_file_size = 5 * 1024 * 1024  # 5MB
@@ -26,11 +94,24 @@ class DocumentManager:
     
     def generate_file_hash(self, file_content: bytes) -> str:
         """Generate hash for file content to detect duplicates"""
-        return hashlib.md5(file_content).hexdigest()
+        return hashlib.blake2b(file_content, digest_size=32).hexdigest()
+    
+    def content_path(self, content_hash: str, file_extension: str) -> str:
+        """Sharded storage path for a content hash: ab/cd/abcd....ext"""
+        return os.path.join(self.upload_folder, content_hash[:2], content_hash[2:4],
+                            f"{content_hash}.{file_extension}")
+    
+    def _write_file(self, file_path: str, content: bytes):
+        """Write via a temporary file so a stored hash never names a partial file"""
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(content)
+        os.replace(temp_path, file_path)
     
     def check_existing_document(self, document_id: str, document_type: str) -> Optional[Dict]:
         """Check if document already exists in system"""
-        conn = sqlite3.connect(self.db_name)
+        conn = database.connect(self.db_name)
         cursor = conn.cursor()
         
         try:
@@ -78,72 +159,72 @@ class DocumentManager:
             }
         
         try:
-            # Generate secure filename
             filename = secure_filename(file.filename)
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             file_extension = filename.rsplit('.', 1)[1].lower()
-            new_filename = f"{booking_id}_{document_type}_{timestamp}.{file_extension}"
-            
-            # Save file
-            file_path = os.path.join(self.upload_folder, new_filename)
-            file.save(file_path)
+            content = file.read()
+            content_hash = self.generate_file_hash(content)
             
-            # Optimize image if it's an image file
-            if file_extension in ['jpg', 'jpeg', 'png']:
-                self._optimize_image(file_path)
-            
-            # Save to database
-            conn = sqlite3.connect(self.db_name)
+            conn = database.connect(self.db_name)
             cursor = conn.cursor()
+            try:
+                # Serialise with other uploads and deletes of the same content
+                cursor.execute('BEGIN IMMEDIATE')
+                cursor.execute('''
+                    SELECT file_path, file_size, optimization_status
+                    FROM guest_documents WHERE content_hash = ? LIMIT 1
+                ''', (content_hash,))
+                stored = cursor.fetchone()
+                
+                if stored and os.path.exists(stored[0]):
+                    # Same bytes already stored (and optimized): just add a reference
+                    file_path, file_size, optimization_status = stored
+                    deduplicated = True
+                else:
+                    file_path = self.content_path(content_hash, file_extension)
+                    if not os.path.exists(file_path):
+                        self._write_file(file_path, content)
+                    # Images are optimized in the background; the original is served until then
+                    optimization_status = 'pending' if is_optimizable(file_path) else None
+                    deduplicated = False
+                
+                now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                cursor.execute('''
+                    INSERT INTO guest_documents 
+                    (booking_id, guest_name, document_type, document_id, file_path, file_name, file_size, uploaded_at,
+                     optimization_status, content_hash)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (booking_id, guest_name, document_type, document_id, file_path, filename, file_size, now,
+                      optimization_status, content_hash))
+                
+                document_db_id = cursor.lastrowid
+                conn.commit()
+            finally:
+                conn.close()
             
-            now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            cursor.execute('''
-                INSERT INTO guest_documents 
-                (booking_id, guest_name, document_type, document_id, file_path, file_name, file_size, uploaded_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (booking_id, guest_name, document_type, document_id, file_path, filename, file_size, now))
-            
-            document_db_id = cursor.lastrowid
-            conn.commit()
-            conn.close()
+            if optimization_status == 'pending' and not deduplicated:
+                self.optimizer.submit(self.db_name, file_path)
             
             return {
                 'success': True,
                 'document_id': document_db_id,
                 'file_path': file_path,
+                'optimization_status': optimization_status,
+                'deduplicated': deduplicated,
                 'message': 'Document uploaded successfully'
             }
             
         except Exception as e:
             return {'success': False, 'error': f'Upload failed: {str(e)}'}
     
-    def _optimize_image(self, file_path: str):
-        """Optimize image file size while maintaining quality"""
-        try:
-            with Image.open(file_path) as img:
-                # Convert to RGB if necessary
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    img = img.convert('RGB')
-                
-                # Resize if too large
-                max_size = (1920, 1080)
-                if img.size[0] > max_size[0] or img.size[1] > max_size[1]:
-                    img.thumbnail(max_size, Image.Resampling.LANCZOS)
-                
-                # Save with optimization
-                img.save(file_path, optimize=True, quality=85)
-        except Exception as e:
-            print(f"Image optimization failed: {e}")
-    
     def get_booking_documents(self, booking_id: int) -> List[Dict]:
         """Get all documents for a specific booking"""
-        conn = sqlite3.connect(self.db_name)
+        conn = database.connect(self.db_name)
         cursor = conn.cursor()
         
         try:
             cursor.execute('''
                 SELECT id, guest_name, document_type, document_id, file_name, 
-                       file_size, uploaded_at, is_verified
+                       file_size, uploaded_at, is_verified, optimization_status
                 FROM guest_documents 
                 WHERE booking_id = ?
                 ORDER BY uploaded_at DESC
@@ -159,16 +240,28 @@ class DocumentManager:
                     'file_name': row[4],
                     'file_size': row[5],
                     'uploaded_at': row[6],
-                    'is_verified': row[7]
+                    'is_verified': row[7],
+                    'optimization_status': row[8]
                 })
             
             return documents
         finally:
             conn.close()
     
-    def search_documents(self, hotel_id: int, search_term: str) -> List[Dict]:
+    def search_documents(self, hotel_id: int, search_term: str, page: int = 1, per_page: int = 50) -> List[Dict]:
         """Search documents by guest name, document ID, or document type"""
-        conn = sqlite3.connect(self.db_name)
+        return self.search_documents_page(hotel_id, search_term, page, per_page)['documents']
+    
+    def search_documents_page(self, hotel_id: int, search_term: str, page: int = 1,
+                              per_page: int = 50) -> Dict[str, Any]:
+        """Best-ranked page of a token/prefix search, plus whether more pages follow"""
+        page = max(1, page)
+        result = {'documents': [], 'page': page, 'per_page': per_page, 'has_more': False}
+        match = search_query(hotel_id, search_term)
+        if match is None:
+            return result
+        
+        conn = database.connect(self.db_name)
         cursor = conn.cursor()
         
         try:
@@ -176,20 +269,18 @@ class DocumentManager:
                 SELECT gd.id, gd.booking_id, gd.guest_name, gd.document_type, 
                        gd.document_id, gd.file_name, gd.uploaded_at, gd.is_verified,
                        b.room_id, r.room_number
-                FROM guest_documents gd
+                FROM guest_documents_fts
+                JOIN guest_documents gd ON gd.id = guest_documents_fts.rowid
                 JOIN bookings b ON gd.booking_id = b.id
                 JOIN rooms r ON b.room_id = r.id
-                WHERE b.hotel_id = ? AND (
-                    gd.guest_name LIKE ? OR 
-                    gd.document_id LIKE ? OR 
-                    gd.document_type LIKE ?
-                )
-                ORDER BY gd.uploaded_at DESC
-            ''', (hotel_id, f'%{search_term}%', f'%{search_term}%', f'%{search_term}%'))
+                WHERE guest_documents_fts MATCH ?
+                ORDER BY guest_documents_fts.rank
+                LIMIT ? OFFSET ?
+            ''', (match, per_page + 1, (page - 1) * per_page))
             
-            documents = []
-            for row in cursor.fetchall():
-                documents.append({
+            rows = cursor.fetchall()
+            for row in rows[:per_page]:
+                result['documents'].append({
                     'id': row[0],
                     'booking_id': row[1],
                     'guest_name': row[2],
@@ -201,14 +292,15 @@ class DocumentManager:
                     'room_id': row[8],
                     'room_number': row[9]
                 })
+            result['has_more'] = len(rows) > per_page
             
-            return documents
+            return result
         finally:
             conn.close()
     
     def verify_document(self, document_id: int, verified: bool = True) -> bool:
         """Mark document as verified or unverified"""
-        conn = sqlite3.connect(self.db_name)
+        conn = database.connect(self.db_name)
         cursor = conn.cursor()
         
         try:
@@ -228,26 +320,41 @@ class DocumentManager:
     
     def delete_document(self, document_id: int) -> bool:
         """Delete document from database and filesystem"""
-        conn = sqlite3.connect(self.db_name)
+        conn = database.connect(self.db_name)
         cursor = conn.cursor()
         
         try:
+            cursor.execute('BEGIN IMMEDIATE')
             # Get file path first
-            cursor.execute('SELECT file_path FROM guest_documents WHERE id = ?', (document_id,))
+            cursor.execute('SELECT file_path, content_hash FROM guest_documents WHERE id = ?', (document_id,))
             result = cursor.fetchone()
             
             if not result:
+                conn.rollback()
                 return False
             
-            file_path = result[0]
+            file_path, content_hash = result
             
             # Delete from database
             cursor.execute('DELETE FROM guest_documents WHERE id = ?', (document_id,))
             conn.commit()
             
-            # Delete file from filesystem
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            # Other documents may share the stored file; remove it with the last
+            # reference, re-checked under the write lock uploads take, and only
+            # once the row is gone for good
+            try:
+                cursor.execute('BEGIN IMMEDIATE')
+                shared = False
+                if content_hash:
+                    cursor.execute('''
+                        SELECT EXISTS(SELECT 1 FROM guest_documents WHERE content_hash = ?)
+                    ''', (content_hash,))
+                    shared = cursor.fetchone()[0]
+                if not shared and os.path.exists(file_path):
+                    os.remove(file_path)
+                conn.rollback()
+            except Exception as e:
+                print(f"Error removing document file {file_path}: {e}")
             
             return True
         except Exception as e:
@@ -258,7 +365,7 @@ class DocumentManager:
     
     def get_hotel_documents_summary(self, hotel_id: int) -> Dict[str, Any]:
         """Get summary of all documents for a hotel"""
-        conn = sqlite3.connect(self.db_name)
+        conn = database.connect(self.db_name)
         cursor = conn.cursor()
         
         try:
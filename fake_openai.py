@@ -0,0 +1,137 @@
+"""
+Local stand-in for an OpenAI-compatible chat completions API, for tests and benchmarks.
+
+Serves POST <base>/chat/completions, records every request, and answers after
+an optional latency plus `token_delay` seconds per generated word. Requests
+with "stream": true get the answer as chunked server-sent events, one word
+per chunk, as the words are "generated". Point HotelAIChatbot's client at
+`server.url`.
+"""
+import re
+import json
+import time
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Callable, Dict, Any, List, Union
+
+
+class FakeOpenAIServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 reply: Union[str, Callable[[List[Dict[str, str]]], str]] = 'OK', token_delay: float = 0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply = reply
+        self.calls: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def start(self) -> 'FakeOpenAIServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _answer(self, request: Dict[str, Any]) -> str:
+        with self._lock:
+            self.calls.append(request)
+        messages = request.get('messages', [])
+        return self.reply(messages) if callable(self.reply) else self.reply
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                try:
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up waiting, e.g. after its deadline passed
+                    self.close_connection = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                request = json.loads(self.rfile.read(length) or b'{}')
+                if not self.path.endswith('/chat/completions'):
+                    self._send_json(404, {'error': {'message': 'Not Found', 'type': 'invalid_request_error'}})
+                    return
+
+                if server.latency:
+                    time.sleep(server.latency)
+                content = server._answer(request)
+                if request.get('stream'):
+                    self._stream(request, content)
+                    return
+                if server.token_delay:
+                    time.sleep(server.token_delay * max(len(content.split()) - 1, 0))
+                self._send_json(200, {
+                    'id': f'chatcmpl-{len(server.calls)}',
+                    'object': 'chat.completion',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'fake'),
+                    'choices': [{'index': 0, 'finish_reason': 'stop',
+                                 'message': {'role': 'assistant', 'content': content}}],
+                    'usage': {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0},
+                })
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f'{len(data):x}\r\n'.encode() + data + b'\r\n')
+                self.wfile.flush()
+
+            def _stream(self, request, content):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+
+                chunk_id = f'chatcmpl-{len(server.calls)}'
+                deltas = [{'role': 'assistant', 'content': ''}]
+                deltas += [{'content': token} for token in re.findall(r'\s*\S+', content)]
+                try:
+                    for n, delta in enumerate(deltas):
+                        if n > 1 and server.token_delay:
+                            time.sleep(server.token_delay)
+                        self._write_event(chunk_id, request, delta, None)
+                    self._write_event(chunk_id, request, {}, 'stop')
+                    self._write_chunk(b'data: [DONE]\n\n')
+                    self._write_chunk(b'')
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client stopped reading, as a browser does when the owner leaves
+                    self.close_connection = True
+
+            def _write_event(self, chunk_id, request, delta, finish_reason):
+                payload = {
+                    'id': chunk_id,
+                    'object': 'chat.completion.chunk',
+                    'created': int(time.time()),
+                    'model': request.get('model', 'fake'),
+                    'choices': [{'index': 0, 'delta': delta, 'finish_reason': finish_reason}],
+                }
+                self._write_chunk(f'data: {json.dumps(payload)}\n\n'.encode())
+
+        return Handler
@@ -0,0 +1,131 @@
+"""
+Local stand-in for the Telegram Bot API, for tests and benchmarks.
+
+Serves /bot<token>/<method> for sendMessage, getUpdates, setWebhook and
+deleteWebhook, records every call, and can add latency or fail requests.
+Point a TelegramClientRegistry at `server.url` to use it.
+"""
+import json
+import time
+import threading
+from collections import deque
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from typing import Dict, Any, List, Optional
+
+
+class FakeTelegramServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0):
+        self.latency = latency
+        self.calls: List[Dict[str, Any]] = []
+        self.webhook: Optional[Dict[str, Any]] = None
+        self.fail_next: deque = deque()  # (status_code, payload) replies to return first
+        self._updates: List[Dict[str, Any]] = []
+        self._next_update_id = 1
+        self._next_message_id = 1
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self) -> 'FakeTelegramServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def push_update(self, chat_id: int, text: str) -> Dict[str, Any]:
+        """Queue an incoming message for getUpdates and return the update"""
+        with self._lock:
+            update = {
+                'update_id': self._next_update_id,
+                'message': {'message_id': self._next_update_id, 'chat': {'id': chat_id}, 'text': text},
+            }
+            self._next_update_id += 1
+            self._updates.append(update)
+        return update
+
+    def sent_messages(self, chat_id=None) -> List[Dict[str, Any]]:
+        with self._lock:
+            calls = [call for call in self.calls if call['method'] == 'sendMessage']
+        if chat_id is not None:
+            calls = [call for call in calls if str(call['params'].get('chat_id')) == str(chat_id)]
+        return calls
+
+    def _reply(self, token: str, method: str, params: Dict[str, Any]):
+        with self._lock:
+            self.calls.append({'token': token, 'method': method, 'params': params, 'time': time.monotonic()})
+            if self.fail_next:
+                return self.fail_next.popleft()
+
+            if method == 'sendMessage':
+                message_id = self._next_message_id
+                self._next_message_id += 1
+                return 200, {'ok': True, 'result': {'message_id': message_id,
+                                                    'chat': {'id': params.get('chat_id')},
+                                                    'text': params.get('text')}}
+            if method == 'getUpdates':
+                offset = int(params.get('offset') or 0)
+                # Like Telegram, an offset confirms (and forgets) every earlier update
+                self._updates = [u for u in self._updates if u['update_id'] >= offset]
+                return 200, {'ok': True, 'result': list(self._updates)}
+            if method == 'setWebhook':
+                self.webhook = params
+                return 200, {'ok': True, 'result': True}
+            if method == 'deleteWebhook':
+                self.webhook = None
+                return 200, {'ok': True, 'result': True}
+            return 404, {'ok': False, 'error_code': 404, 'description': 'Not Found'}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _handle(self, params):
+                parts = urlparse(self.path).path.strip('/').split('/')
+                if len(parts) != 2 or not parts[0].startswith('bot'):
+                    status, payload = 404, {'ok': False, 'description': 'Not Found'}
+                else:
+                    if server.latency:
+                        time.sleep(server.latency)
+                    status, payload = server._reply(parts[0][3:], parts[1], params)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                self._handle({key: values[-1] for key, values in query.items()})
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length).decode()
+                if self.headers.get('Content-Type', '').startswith('application/json'):
+                    params = json.loads(raw or '{}')
+                else:
+                    params = {key: values[-1] for key, values in parse_qs(raw).items()}
+                self._handle(params)
+
+        return Handler
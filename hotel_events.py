@@ -0,0 +1,221 @@
+"""
+Per-hotel event stream for front-desk screens (Server-Sent Events).
+
+Booking and check-in/out writes add a row to hotel_events inside their own
+transaction, carrying the booking as the bookings list shows it. Each web
+process runs one tailer thread that reads new rows (woken at once by local
+commits, and every POLL_INTERVAL for writes made by other processes) and
+hands them to the open streams of that hotel, so ten screens cost one
+indexed query instead of ten polling joins.
+
+Browsers reconnect with Last-Event-ID and are replayed what they missed.
+"""
+import os
+import json
+import time
+import queue
+import threading
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, Optional
+import database
+from booking_listing import BOOKING_FIELDS
+
+POLL_INTERVAL = float(os.getenv('HOTEL_EVENTS_POLL', '1.0'))
+HEARTBEAT = 15.0          # seconds between keep-alive comments on an idle stream
+STREAM_DURATION = 300.0   # a stream ends after this long; the browser reconnects
+RETENTION = 24 * 3600.0   # events older than this are pruned
+RECONNECT_DELAY = 3000    # ms, sent to the browser as the SSE retry field
+
+HOTEL_EVENTS_TABLE = '''
+CREATE TABLE IF NOT EXISTS hotel_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    hotel_id INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+)
+'''
+
+
+def publish(cursor, hotel_id: int, kind: str, payload: Dict[str, Any]) -> int:
+    """Add an event as part of the caller's transaction"""
+    cursor.execute('INSERT INTO hotel_events (hotel_id, kind, payload, created_at) VALUES (?, ?, ?, ?)',
+                   (hotel_id, kind, json.dumps(payload), time.time()))
+    return cursor.lastrowid
+
+
+def load_bookings(cursor, booking_ids: Iterable[int]) -> Dict[int, Dict[str, Any]]:
+    """Bookings as the bookings list shows them, plus their check-in/out state"""
+    cursor.execute('''
+        SELECT b.id, b.guest_name, b.guest_email, b.guest_phone, r.room_number,
+               b.check_in_date, b.check_out_date, b.guest_count, b.total_amount,
+               b.payment_status, b.booking_status, b.created_at, b.hotel_id,
+               c.check_in_time, c.check_out_time
+        FROM bookings b
+        JOIN rooms r ON b.room_id = r.id
+        LEFT JOIN check_in_out c ON c.booking_id = b.id
+        WHERE b.id IN (SELECT value FROM json_each(?))
+    ''', (json.dumps(list(booking_ids)),))
+    bookings = {}
+    for row in cursor.fetchall():
+        booking = dict(zip(BOOKING_FIELDS, row))
+        booking['hotel_id'] = row[12]
+        booking['check_in_time'] = row[13]
+        booking['check_out_time'] = row[14]
+        booking['checked_in'] = row[13] is not None
+        booking['checked_out'] = row[14] is not None
+        bookings[row[0]] = booking
+    return bookings
+
+
+def publish_booking(cursor, booking_id: int, action: str) -> Optional[int]:
+    """Publish a booking's current state after a write; call before commit"""
+    booking = load_bookings(cursor, [booking_id]).get(booking_id)
+    if booking is None:
+        return None
+    return publish(cursor, booking['hotel_id'], 'booking', {'action': action, 'booking': booking})
+
+
+def format_event(event_id: int, kind: str, payload: str) -> str:
+    return f'id: {event_id}\nevent: {kind}\ndata: {payload}\n\n'
+
+
+class HotelEventBroker:
+    def __init__(self, db_name: str = 'multi_hotel.db', poll_interval: float = POLL_INTERVAL):
+        self.db_name = db_name
+        self.poll_interval = poll_interval
+        self._wake = threading.Condition()
+        self._subscribers = defaultdict(set)
+        self._cursor = None
+        self._tailer = None
+        self._dirty = False
+        self._last_prune = 0.0
+        self._delivered = 0
+
+    def notify(self):
+        """Wake the tailer after committing events, instead of waiting for the next poll"""
+        with self._wake:
+            self._dirty = True
+            self._wake.notify()
+
+    def latest_id(self) -> int:
+        conn = database.connect(self.db_name)
+        try:
+            return conn.execute('SELECT COALESCE(MAX(id), 0) FROM hotel_events').fetchone()[0]
+        finally:
+            conn.close()
+
+    def replay(self, hotel_id: int, after_id: int):
+        """A hotel's events newer than after_id, oldest first"""
+        conn = database.connect(self.db_name)
+        try:
+            return conn.execute('''
+                SELECT id, kind, payload FROM hotel_events WHERE hotel_id = ? AND id > ? ORDER BY id
+            ''', (hotel_id, after_id)).fetchall()
+        finally:
+            conn.close()
+
+    def subscribe(self, hotel_id: int) -> queue.Queue:
+        inbox = queue.Queue()
+        with self._wake:
+            self._subscribers[hotel_id].add(inbox)
+            if self._tailer is None or not self._tailer.is_alive():
+                self._tailer = threading.Thread(target=self._tail_forever, name='hotel-events-tailer',
+                                                daemon=True)
+                self._tailer.start()
+        return inbox
+
+    def unsubscribe(self, hotel_id: int, inbox: queue.Queue):
+        with self._wake:
+            self._subscribers[hotel_id].discard(inbox)
+            if not self._subscribers[hotel_id]:
+                del self._subscribers[hotel_id]
+            if not self._subscribers:
+                # Nobody listening: stop tailing until the next subscriber
+                self._cursor = None
+
+    def stream(self, hotel_id: int, last_event_id: Optional[int] = None,
+               duration: float = STREAM_DURATION) -> Iterator[str]:
+        """SSE text for one browser: missed events, then live ones, with heartbeats"""
+        inbox = self.subscribe(hotel_id)
+        try:
+            if last_event_id is None:
+                last_event_id = self.latest_id()
+                backlog = []
+            else:
+                backlog = self.replay(hotel_id, last_event_id)
+            with self._wake:
+                if self._cursor is None or self._cursor > last_event_id:
+                    self._cursor = last_event_id
+
+            yield f'retry: {RECONNECT_DELAY}\n\n'
+            for event_id, kind, payload in backlog:
+                last_event_id = event_id
+                yield format_event(event_id, kind, payload)
+
+            deadline = time.monotonic() + duration
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    event_id, kind, payload = inbox.get(timeout=min(HEARTBEAT, remaining))
+                except queue.Empty:
+                    yield ': keep-alive\n\n'
+                    continue
+                # The tailer may hand over events the replay already sent
+                if event_id > last_event_id:
+                    last_event_id = event_id
+                    yield format_event(event_id, kind, payload)
+        finally:
+            self.unsubscribe(hotel_id, inbox)
+
+    def poll_once(self) -> int:
+        """Read events after the cursor and hand them to subscribers; returns how many were read"""
+        with self._wake:
+            cursor = self._cursor
+        if cursor is None:
+            return 0
+        conn = database.connect(self.db_name)
+        try:
+            rows = conn.execute('''
+                SELECT id, hotel_id, kind, payload FROM hotel_events WHERE id > ? ORDER BY id
+            ''', (cursor,)).fetchall()
+            if time.time() - self._last_prune > 600:
+                self._last_prune = time.time()
+                conn.execute('DELETE FROM hotel_events WHERE created_at < ?', (time.time() - RETENTION,))
+                conn.commit()
+        finally:
+            conn.close()
+
+        with self._wake:
+            for event_id, hotel_id, kind, payload in rows:
+                for inbox in self._subscribers.get(hotel_id, ()):
+                    inbox.put((event_id, kind, payload))
+                    self._delivered += 1
+            if rows and self._cursor is not None:
+                self._cursor = max(self._cursor, rows[-1][0])
+        return len(rows)
+
+    def _tail_forever(self):
+        while True:
+            with self._wake:
+                if not self._subscribers:
+                    self._tailer = None
+                    return
+                if not self._dirty:
+                    self._wake.wait(timeout=self.poll_interval)
+                self._dirty = False
+            try:
+                self.poll_once()
+            except Exception:
+                # A locked or briefly unavailable database; the next poll retries
+                time.sleep(self.poll_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._wake:
+            return {
+                'hotels': len(self._subscribers),
+                'streams': sum(len(inboxes) for inboxes in self._subscribers.values()),
+                'delivered': self._delivered,
+            }
@@ -0,0 +1,163 @@
+"""
+Hotel metrics service shared by the owner dashboard and the AI chatbot
+"""
+import os
+import time
+import datetime
+import threading
+from typing import Dict, Any
+import database
+
+# Seconds a hotel's metrics are served from cache; writes to its data invalidate sooner
+METRICS_TTL = float(os.getenv('HOTEL_METRICS_TTL', '30'))
+
+# A counter per hotel, bumped by triggers on every write to the tables the
+# metrics read, so each process's cache notices writes made by other processes
+HOTEL_VERSIONS_TABLE = '''
+CREATE TABLE IF NOT EXISTS hotel_versions (
+    hotel_id INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+)
+'''
+
+# Table -> (events, hotel id of the changed row in terms of the NEW/OLD row)
+_VERSIONED = {
+    'bookings': (('INSERT', 'UPDATE', 'DELETE'), '{row}.hotel_id'),
+    'rooms': (('INSERT', 'UPDATE', 'DELETE'), '{row}.hotel_id'),
+    'hotels': (('UPDATE', 'DELETE'), '{row}.id'),
+}
+
+
+def _trigger(table: str, event: str) -> str:
+    hotel_id = _VERSIONED[table][1].format(row='OLD' if event == 'DELETE' else 'NEW')
+    return f'''
+CREATE TRIGGER IF NOT EXISTS hotel_versions_{table}_{event.lower()} AFTER {event} ON {table}
+BEGIN
+    INSERT INTO hotel_versions (hotel_id, version) VALUES ({hotel_id}, 1)
+    ON CONFLICT (hotel_id) DO UPDATE SET version = version + 1;
+END
+'''
+
+
+HOTEL_VERSION_TRIGGERS = [_trigger(table, event) for table, (events, _) in _VERSIONED.items() for event in events]
+
+
+def hotel_version(conn, hotel_id: int) -> int:
+    """Current data version of a hotel; changes whenever its rows do"""
+    row = conn.execute('SELECT version FROM hotel_versions WHERE hotel_id = ?', (hotel_id,)).fetchone()
+    return row[0] if row else 0
+
+
+class HotelMetrics:
+    def __init__(self, db_name: str = 'multi_hotel.db', ttl: float = METRICS_TTL):
+        self.db_name = db_name
+        self.ttl = ttl
+        self._cache = {}
+        self._lock = threading.Lock()
+
+    def get_metrics(self, hotel_id: int) -> Dict[str, Any]:
+        """Get dashboard/analytics figures for a hotel, cached for `ttl` seconds"""
+        today = datetime.date.today().isoformat()
+        version = self._version(hotel_id)
+        with self._lock:
+            entry = self._cache.get(hotel_id)
+        if entry and entry[0] > time.monotonic() and entry[1] == today and entry[3] == version:
+            return dict(entry[2])
+
+        metrics = self._compute(hotel_id)
+        with self._lock:
+            self._cache[hotel_id] = (time.monotonic() + self.ttl, today, metrics, version)
+        return dict(metrics)
+
+    def _version(self, hotel_id: int) -> int:
+        conn = database.connect(self.db_name)
+        try:
+            return hotel_version(conn, hotel_id)
+        finally:
+            conn.close()
+
+    def invalidate(self, hotel_id: int):
+        """Drop a hotel's cached metrics after a booking write"""
+        with self._lock:
+            self._cache.pop(hotel_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def _compute(self, hotel_id: int) -> Dict[str, Any]:
+        now = datetime.datetime.now()
+        today = now.strftime("%Y-%m-%d")
+        week_start = (now - datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+        next_week = (now + datetime.timedelta(days=7)).strftime("%Y-%m-%d")
+        month_start = now.replace(day=1).strftime("%Y-%m-%d")
+
+        conn = database.connect(self.db_name)
+        cursor = conn.cursor()
+
+        try:
+            # Live booking counts in one pass over the hotel's confirmed bookings
+            cursor.execute('''
+                SELECT (SELECT name FROM hotels WHERE id = :hotel_id),
+                       COUNT(CASE WHEN check_in_date = :today THEN 1 END),
+                       COUNT(CASE WHEN check_out_date = :today THEN 1 END),
+                       COUNT(CASE WHEN payment_status = 'pending' THEN 1 END),
+                       COALESCE(SUM(CASE WHEN payment_status = 'pending' THEN total_amount END), 0),
+                       COUNT(CASE WHEN check_in_date BETWEEN :today AND :next_week THEN 1 END)
+                FROM bookings
+                WHERE hotel_id = :hotel_id AND booking_status = 'confirmed'
+            ''', {'hotel_id': hotel_id, 'today': today, 'next_week': next_week})
+            row = cursor.fetchone()
+
+            # Revenue windows from the daily rollup (cost independent of booking history)
+            cursor.execute('''
+                SELECT COALESCE(SUM(CASE WHEN stat_date = :today THEN arrival_paid_revenue END), 0),
+                       COALESCE(SUM(CASE WHEN stat_date >= :week_start THEN arrival_paid_revenue END), 0),
+                       COALESCE(SUM(CASE WHEN stat_date >= :month_start THEN arrival_paid_revenue END), 0),
+                       COALESCE(SUM(CASE WHEN stat_date >= :month_start THEN paid_revenue END), 0),
+                       COALESCE(SUM(CASE WHEN stat_date >= :month_start AND stat_date <= :today
+                                         THEN occupied_room_nights END), 0)
+                FROM hotel_daily_stats
+                WHERE hotel_id = :hotel_id AND stat_date >= MIN(:week_start, :month_start)
+            ''', {'hotel_id': hotel_id, 'today': today, 'week_start': week_start,
+                  'month_start': month_start})
+            revenue = cursor.fetchone()
+
+            # Rooms and tonight's occupancy per room type, from the occupancy calendar bits
+            cursor.execute('''
+                SELECT r.room_type, COUNT(*), COALESCE(SUM((c.nights >> ?) & 1), 0)
+                FROM rooms r
+                LEFT JOIN room_calendar c ON c.room_id = r.id AND c.month = ?
+                WHERE r.hotel_id = ? AND r.is_active = 1
+                GROUP BY r.room_type
+            ''', (now.day - 1, now.strftime("%Y-%m"), hotel_id))
+            room_breakdown = cursor.fetchall()
+
+            cursor.execute('''
+                SELECT b.id, b.guest_name, r.room_number, b.check_in_date, b.check_out_date, b.total_amount, b.payment_status
+                FROM bookings b
+                JOIN rooms r ON b.room_id = r.id
+                WHERE b.hotel_id = ? AND b.booking_status = 'confirmed'
+                ORDER BY b.created_at DESC LIMIT 5
+            ''', (hotel_id,))
+            recent_bookings = cursor.fetchall()
+        finally:
+            conn.close()
+
+        return {
+            'hotel_name': row[0],
+            'total_rooms': sum(total for _, total, _ in room_breakdown),
+            'occupied_rooms': sum(occupied for _, _, occupied in room_breakdown),
+            'today_checkins': row[1],
+            'today_checkouts': row[2],
+            'today_revenue': revenue[0],
+            'weekly_revenue': revenue[1],
+            'monthly_revenue': revenue[2],
+            'monthly_booked_revenue': revenue[3],
+            'monthly_room_nights': revenue[4],
+            'pending_payments_count': row[3],
+            'pending_payments_amount': row[4],
+            'upcoming_bookings': row[5],
+            'room_breakdown': room_breakdown,
+            'recent_bookings': recent_bookings,
+        }
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Background optimization of uploaded document images.
+
+Uploads are saved as-is and recorded with optimization_status 'pending'; the
+resize/re-encode runs in a process pool so it never holds up a web request.
+The optimized image atomically replaces the original once it is written, so
+downloads serve the original until then. Run this module to optimize any
+images left pending by a restart.
+"""
+import os
+import sys
+import atexit
+import logging
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+from PIL import Image
+import database
+
+DB_NAME = 'multi_hotel.db'
+
+OPTIMIZABLE_EXTENSIONS = {'jpg', 'jpeg', 'png'}
+MAX_IMAGE_SIZE = (1920, 1080)
+OPTIMIZER_WORKERS = int(os.getenv('IMAGE_OPTIMIZER_WORKERS', str(min(4, os.cpu_count() or 1))))
+
+
+def is_optimizable(file_path: str) -> bool:
+    return file_path.rsplit('.', 1)[-1].lower() in OPTIMIZABLE_EXTENSIONS
+
+
+def optimize_image(file_path: str) -> int:
+    """Shrink and re-encode an image in place; returns the new file size.
+
+    Runs in a worker process. The result is written to a temporary file and
+    renamed over the original, so readers never see a half-written image.
+    """
+    directory, name = os.path.split(file_path)
+    fd, temp_path = tempfile.mkstemp(dir=directory or '.', prefix='.optimizing_', suffix=f'_{name}')
+    os.close(fd)
+    try:
+        with Image.open(file_path) as img:
+            # Convert to RGB if necessary
+            if img.mode in ('RGBA', 'LA', 'P'):
+                img = img.convert('RGB')
+
+            # Resize if too large
+            if img.size[0] > MAX_IMAGE_SIZE[0] or img.size[1] > MAX_IMAGE_SIZE[1]:
+                img.thumbnail(MAX_IMAGE_SIZE, Image.Resampling.LANCZOS)
+
+            # Save with optimization
+            img.save(temp_path, optimize=True, quality=85)
+        os.replace(temp_path, file_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return os.path.getsize(file_path)
+
+
+class ImageOptimizer:
+    """Runs optimize_image in a process pool and records the outcome on guest_documents"""
+
+    def __init__(self, max_workers: int = OPTIMIZER_WORKERS):
+        self.max_workers = max_workers
+        self._executor = None
+        self._outstanding = 0
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                atexit.register(self.shutdown)
+            return self._executor
+
+    def submit(self, db_name: str, file_path: str):
+        """Queue a stored image; documents referencing it stay 'pending' until it finishes"""
+        executor = self._get_executor()
+        with self._lock:
+            self._outstanding += 1
+        try:
+            future = executor.submit(optimize_image, file_path)
+        except Exception:
+            with self._lock:
+                self._outstanding -= 1
+            raise
+        future.add_done_callback(lambda f: self._finished(db_name, file_path, f))
+        return future
+
+    def _finished(self, db_name: str, file_path: str, future):
+        error = future.exception()
+        conn = database.connect(db_name)
+        try:
+            # Every document sharing the stored file gets the outcome
+            if error is None:
+                conn.execute('''
+                    UPDATE guest_documents SET optimization_status = 'optimized', file_size = ?
+                    WHERE file_path = ? AND optimization_status = 'pending'
+                ''', (future.result(), file_path))
+            else:
+                # The untouched original keeps being served
+                logging.error(f"Image optimization failed for {file_path}: {error}")
+                conn.execute('''
+                    UPDATE guest_documents SET optimization_status = 'failed'
+                    WHERE file_path = ? AND optimization_status = 'pending'
+                ''', (file_path,))
+            conn.commit()
+        except Exception as e:
+            logging.error(f"Could not record optimization of {file_path}: {e}")
+        finally:
+            conn.close()
+            with self._lock:
+                self._outstanding -= 1
+                self._idle.notify_all()
+
+    def resume_pending(self, db_name: str) -> int:
+        """Re-queue images still marked pending (e.g. after a restart)"""
+        conn = database.connect(db_name)
+        try:
+            pending = conn.execute('''
+                SELECT DISTINCT file_path FROM guest_documents WHERE optimization_status = 'pending'
+            ''').fetchall()
+        finally:
+            conn.close()
+        for (file_path,) in pending:
+            self.submit(db_name, file_path)
+        return len(pending)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued image has been optimized and recorded"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._outstanding, timeout)
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+def main():
+    """Optimize every image left pending in the database"""
+    optimizer = ImageOptimizer()
+    try:
+        count = optimizer.resume_pending(DB_NAME)
+        optimizer.wait_idle()
+        print(f"✅ Processed {count} pending image(s)")
+    finally:
+        optimizer.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""
+Bounded, deadline-aware access to the chatbot's LLM for synchronous Flask workers.
+
+Requests run as coroutines on one background asyncio event loop with a shared
+AsyncOpenAI client. A calling worker holds one of `max_inflight` slots and
+waits at most `deadline` seconds, so a slow model can tie up only a bounded
+number of workers for a bounded time. When no slot frees up within
+`queue_wait`, or the deadline passes, the call fails fast with LLMUnavailable
+and the upstream request is cancelled.
+"""
+import os
+import time
+import queue
+import asyncio
+import threading
+import concurrent.futures
+from typing import Any, Dict, Iterator, List, Optional
+import openai
+
+MAX_INFLIGHT = int(os.getenv('CHATBOT_MAX_INFLIGHT', '8'))
+DEADLINE = float(os.getenv('CHATBOT_DEADLINE', '8'))         # seconds for a whole answer, streamed or not
+QUEUE_WAIT = float(os.getenv('CHATBOT_QUEUE_WAIT', '0.25'))  # seconds to wait for a free slot
+
+
+class LLMUnavailable(Exception):
+    """The model could not answer within the concurrency or time budget"""
+
+
+class LLMBusy(LLMUnavailable):
+    pass
+
+
+class LLMTimeout(LLMUnavailable):
+    pass
+
+
+class LLMGateway:
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None,
+                 max_inflight: int = MAX_INFLIGHT, deadline: float = DEADLINE, queue_wait: float = QUEUE_WAIT):
+        self.api_key = api_key or os.getenv('OPENAI_API_KEY')
+        self.base_url = base_url or os.getenv('OPENAI_BASE_URL', 'https://api.a4f.co/v1')
+        self.max_inflight = max_inflight
+        self.deadline = deadline
+        self.queue_wait = queue_wait
+        self._lock = threading.Lock()
+        self._loop = None
+        self._client = None
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+        self._timed_out = 0
+        self._failed = 0
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                return self._loop
+            # First use, or a forked worker: the parent's loop thread doesn't exist here
+            self._loop = asyncio.new_event_loop()
+            self._client = openai.AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+            self._slots = threading.BoundedSemaphore(self.max_inflight)
+            self._in_flight = 0
+            self._pid = os.getpid()
+            threading.Thread(target=self._loop.run_forever, name='llm-gateway', daemon=True).start()
+            return self._loop
+
+    def _acquire(self):
+        if not self._slots.acquire(timeout=self.queue_wait):
+            with self._lock:
+                self._rejected += 1
+            raise LLMBusy(f'{self.max_inflight} chatbot requests already in flight')
+        with self._lock:
+            self._in_flight += 1
+
+    def _release(self, future: concurrent.futures.Future):
+        with self._lock:
+            self._in_flight -= 1
+            # Cancelled calls were timed out or abandoned by the caller
+            if not future.cancelled():
+                if future.exception() is None:
+                    self._completed += 1
+                else:
+                    self._failed += 1
+        self._slots.release()
+
+    def _submit(self, coroutine_function, *args) -> concurrent.futures.Future:
+        loop = self._ensure_loop()
+        self._acquire()
+        future = asyncio.run_coroutine_threadsafe(coroutine_function(*args), loop)
+        # The slot is held until the upstream request has actually stopped
+        future.add_done_callback(self._release)
+        return future
+
+    def _timed_out_call(self, future: concurrent.futures.Future) -> LLMTimeout:
+        future.cancel()
+        with self._lock:
+            self._timed_out += 1
+        return LLMTimeout(f'No answer within {self.deadline:g}s')
+
+    def complete(self, messages: List[Dict[str, str]], **params) -> str:
+        """Full completion text; raises LLMUnavailable if over budget"""
+        future = self._submit(self._complete, messages, params)
+        try:
+            return future.result(timeout=self.deadline)
+        except concurrent.futures.TimeoutError:
+            raise self._timed_out_call(future) from None
+
+    async def _complete(self, messages, params) -> str:
+        response = await self._client.chat.completions.create(messages=messages, **params)
+        return response.choices[0].message.content
+
+    def stream(self, messages: List[Dict[str, str]], **params) -> Iterator[str]:
+        """Yield text deltas as they arrive; the whole answer must come within `deadline`.
+
+        A model dripping tokens slowly is cut off like a silent one. Closing
+        the iterator early cancels the upstream request.
+        """
+        expires = time.monotonic() + self.deadline
+        pieces = queue.Queue()
+        future = self._submit(self._stream, messages, params, pieces)
+        finished = False
+        try:
+            while True:
+                try:
+                    kind, value = pieces.get(timeout=max(expires - time.monotonic(), 0))
+                except queue.Empty:
+                    raise self._timed_out_call(future) from None
+                if kind != 'delta':
+                    finished = True
+                if kind == 'done':
+                    return
+                if kind == 'error':
+                    raise value
+                yield value
+        finally:
+            if not finished:
+                future.cancel()
+
+    async def _stream(self, messages, params, pieces: queue.Queue):
+        try:
+            stream = await self._client.chat.completions.create(messages=messages, stream=True, **params)
+            try:
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        pieces.put(('delta', delta))
+            finally:
+                await stream.response.aclose()
+        except Exception as e:
+            pieces.put(('error', e))
+            raise
+        pieces.put(('done', None))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'max_inflight': self.max_inflight,
+                'deadline': self.deadline,
+                'in_flight': self._in_flight,
+                'completed': self._completed,
+                'rejected_busy': self._rejected,
+                'timed_out': self._timed_out,
+                'failed': self._failed,
+            }
+
+    def close(self):
+        """Stop the event loop thread (a later call starts a new one)"""
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop = self._client = None
+        if loop is not None:
+            asyncio.run_coroutine_threadsafe(client.close(), loop).result(timeout=5)
+            loop.call_soon_threadsafe(loop.stop)
@@ -1,4 +1,6 @@
+import io
 import os
+import json
 import logging
 import sqlite3
 import datetime
@@ -7,13 +9,31 @@ import secrets
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_file
+from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_file, Response, stream_with_context
 from werkzeug.security import generate_password_hash, check_password_hash
 from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 import telegram_bot
+import database
+import database_migration
+import daily_stats
+import room_calendar
+import room_nights
+import hotel_events
+import notification_outbox
+import telegram_clients
+import booking_export
+from telegram_webhook import telegram_webhook
 from ai_chatbot import HotelAIChatbot
 from document_manager import DocumentManager
+from availability import AvailabilityEngine, overlapping_booking, overlapping_hold
+from booking_listing import BookingListing
+from booking_import import BookingImporter, REQUIRED_COLUMNS, OPTIONAL_COLUMNS
+from hotel_metrics import HotelMetrics
+from room_calendar import RoomCalendar
+from room_holds import RoomHolds
+from hotel_events import HotelEventBroker
+from change_log import ChangeFeed, MAX_CHANGES
 
 # Load environment variables
 load_dotenv()
@@ -22,9 +42,22 @@ app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'your-secret-key-here')
 app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB max file size
 
+# Telegram webhook receiver (active only when TELEGRAM_WEBHOOK_SECRET is set)
+app.register_blueprint(telegram_webhook)
+
 # Initialize services
-ai_chatbot = HotelAIChatbot()
+hotel_metrics = HotelMetrics()
+ai_chatbot = HotelAIChatbot(metrics=hotel_metrics)
 document_manager = DocumentManager()
+availability_engine = AvailabilityEngine()
+booking_listing = BookingListing()
+booking_importer = BookingImporter()
+occupancy_calendar = RoomCalendar()
+held_rooms = RoomHolds()
+event_broker = HotelEventBroker()
+change_feed = ChangeFeed()
+# Live-update pages start polling /api/changes from the change log as rendered
+app.jinja_env.globals['changes_cursor'] = change_feed.cursor
 
 # Configure logging
 logging.basicConfig(
@@ -35,31 +68,17 @@ logging.basicConfig(
 # Database setup
 DB_NAME = 'multi_hotel.db'
 
+@app.teardown_appcontext
+def release_db_connections(exception=None):
+    """Return pooled connections a request left checked out"""
+    database.release_thread_connections()
+
 def check_room_availability(room_id, check_in_date, check_out_date, exclude_booking_id=None):
     """Check if a room is available for the given date range"""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    try:
-        query = '''
-        SELECT COUNT(*) FROM bookings 
-        WHERE room_id = ? AND booking_status = 'confirmed'
-        AND NOT (check_out_date <= ? OR check_in_date >= ?)
-        '''
-        params = [room_id, check_in_date, check_out_date]
-        
-        if exclude_booking_id:
-            query += ' AND id != ?'
-            params.append(exclude_booking_id)
-        
-        cursor.execute(query, params)
-        count = cursor.fetchone()[0]
-        return count == 0
-    finally:
-        conn.close()
+    return availability_engine.is_room_available(room_id, check_in_date, check_out_date, exclude_booking_id)
 
-def setup_database():
-    conn = sqlite3.connect(DB_NAME)
+def setup_database(db_name=None):
+    conn = database.connect(db_name or DB_NAME)
     cursor = conn.cursor()
     
     # Create admin users table
@@ -188,8 +207,25 @@ def setup_database():
         ''', ('admin', 'admin@hotel.com', admin_password, now))
     
     conn.commit()
+    
+    # Guest documents table, indexes and later versioned schema changes
+    database_migration.apply_migrations(conn)
     conn.close()
 
+def warm_up():
+    """Compile templates and prime this process's connection pool and metrics cache"""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+    conn = database.connect(DB_NAME)
+    try:
+        hotel_ids = [row[0] for row in conn.execute('SELECT id FROM hotels WHERE is_active = 1')]
+    finally:
+        conn.close()
+    for hotel_id in hotel_ids:
+        hotel_metrics.get_metrics(hotel_id)
+    return len(hotel_ids)
+
 # Authentication helpers
 def login_required(f):
     def decorated_function(*args, **kwargs):
@@ -234,7 +270,7 @@ def login():
         password = request.form['password']
         user_type = request.form['user_type']
         
-        conn = sqlite3.connect(DB_NAME)
+        conn = database.connect(DB_NAME)
         cursor = conn.cursor()
         
         if user_type == 'admin':
@@ -269,7 +305,7 @@ def logout():
 @login_required
 @admin_required
 def admin_dashboard():
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     # Get total hotels
@@ -280,14 +316,13 @@ def admin_dashboard():
     cursor.execute('SELECT COUNT(*) FROM rooms WHERE is_active = 1')
     total_rooms = cursor.fetchone()[0]
     
-    # Get total bookings this month
+    # Get bookings and paid revenue this month from the daily rollup
     month_start = datetime.datetime.now().replace(day=1).strftime("%Y-%m-%d")
-    cursor.execute('SELECT COUNT(*) FROM bookings WHERE created_at >= ? AND booking_status = "confirmed"', (month_start,))
-    monthly_bookings = cursor.fetchone()[0]
-    
-    # Get total revenue this month
-    cursor.execute('SELECT SUM(total_amount) FROM bookings WHERE created_at >= ? AND booking_status = "confirmed" AND payment_status = "paid"', (month_start,))
-    monthly_revenue = cursor.fetchone()[0] or 0
+    cursor.execute('''
+    SELECT COALESCE(SUM(bookings), 0), COALESCE(SUM(paid_revenue), 0)
+    FROM hotel_daily_stats WHERE stat_date >= ?
+    ''', (month_start,))
+    monthly_bookings, monthly_revenue = cursor.fetchone()
     
     # Get recent hotels
     cursor.execute('SELECT id, name, owner_name, owner_email, created_at FROM hotels WHERE is_active = 1 ORDER BY created_at DESC LIMIT 5')
@@ -302,11 +337,98 @@ def admin_dashboard():
                          monthly_revenue=monthly_revenue,
                          recent_hotels=recent_hotels)
 
+@app.route('/admin/db-pool-stats')
+@login_required
+@admin_required
+def db_pool_stats():
+    """Connection pool statistics (hits, waits, open connections)"""
+    return jsonify(database.pool_stats())
+
+@app.route('/admin/notification-stats')
+@login_required
+@admin_required
+def notification_stats():
+    """Telegram outbox delivery status counts"""
+    return jsonify(notification_outbox.outbox_stats(DB_NAME))
+
+@app.route('/admin/chatbot-cache-stats')
+@login_required
+@admin_required
+def chatbot_cache_stats():
+    """AI chatbot response cache hit rate and upstream time saved"""
+    return jsonify(ai_chatbot.cache.stats())
+
+@app.route('/admin/chatbot-router-stats')
+@login_required
+@admin_required
+def chatbot_router_stats():
+    """How many chatbot questions were answered locally vs. sent to the LLM"""
+    return jsonify(ai_chatbot.router.stats())
+
+@app.route('/admin/chatbot-llm-stats')
+@login_required
+@admin_required
+def chatbot_llm_stats():
+    """Chatbot model calls in flight, and how many were shed as busy or timed out"""
+    return jsonify(ai_chatbot.gateway.stats())
+
+@app.route('/admin/room-hold-stats')
+@login_required
+@admin_required
+def room_hold_stats():
+    """Room holds currently live, and how many were converted, released or expired"""
+    return jsonify(held_rooms.stats())
+
+@app.route('/admin/hotel-event-stats')
+@login_required
+@admin_required
+def hotel_event_stats():
+    """Open front-desk event streams and events delivered by this process"""
+    return jsonify(event_broker.stats())
+
+def export_response(kind, fmt, hotel_id, scope):
+    """Stream a bookings or revenue export as CSV/NDJSON, optionally gzipped"""
+    if kind not in ('bookings', 'revenue') or fmt not in booking_export.FORMATS:
+        return jsonify({'error': 'Unknown export'}), 404
+    
+    date_from = request.args.get('from') or None
+    date_to = request.args.get('to') or None
+    date_field = request.args.get('by', 'created')
+    try:
+        for value in (date_from, date_to):
+            if value:
+                datetime.date.fromisoformat(value)
+    except ValueError:
+        return jsonify({'error': 'Dates must be YYYY-MM-DD'}), 400
+    if date_field not in booking_export.DATE_FIELDS:
+        return jsonify({'error': f"by must be one of {', '.join(booking_export.DATE_FIELDS)}"}), 400
+    
+    if kind == 'bookings':
+        rows = booking_export.iter_bookings(DB_NAME, hotel_id, date_from, date_to, date_field)
+        columns = booking_export.BOOKING_COLUMNS
+    else:
+        rows = booking_export.iter_revenue(DB_NAME, hotel_id, date_from, date_to)
+        columns = booking_export.REVENUE_COLUMNS
+    
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    filename = f"{kind}-{scope}.{fmt}{'.gz' if compress else ''}"
+    return Response(stream_with_context(booking_export.export_chunks(rows, columns, fmt, compress)),
+                    mimetype='application/gzip' if compress else booking_export.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/admin/export/<kind>.<fmt>')
+@login_required
+@admin_required
+def admin_export(kind, fmt):
+    """Platform-wide export, or one hotel's with ?hotel_id="""
+    hotel_id = request.args.get('hotel_id', type=int)
+    return export_response(kind, fmt, hotel_id, f'hotel-{hotel_id}' if hotel_id else 'all-hotels')
+
 @app.route('/admin/hotels')
 @login_required
 @admin_required
 def admin_hotels():
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -343,7 +465,7 @@ def add_hotel():
         owner_username = request.form['owner_username']
         owner_password = request.form['owner_password']
         
-        conn = sqlite3.connect(DB_NAME)
+        conn = database.connect(DB_NAME)
         cursor = conn.cursor()
         
         try:
@@ -385,72 +507,27 @@ def add_hotel():
 @owner_required
 def owner_dashboard():
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    # Get hotel info
-    cursor.execute('SELECT name FROM hotels WHERE id = ?', (hotel_id,))
-    hotel_name = cursor.fetchone()[0]
-    
-    # Get total rooms
-    cursor.execute('SELECT COUNT(*) FROM rooms WHERE hotel_id = ? AND is_active = 1', (hotel_id,))
-    total_rooms = cursor.fetchone()[0]
-    
-    # Get occupied rooms today
-    today = datetime.datetime.now().strftime("%Y-%m-%d")
-    cursor.execute('''
-    SELECT COUNT(DISTINCT r.id)
-    FROM rooms r
-    JOIN bookings b ON r.id = b.room_id
-    WHERE r.hotel_id = ? AND b.booking_status = 'confirmed'
-    AND b.check_in_date <= ? AND b.check_out_date > ?
-    ''', (hotel_id, today, today))
-    occupied_rooms = cursor.fetchone()[0]
-    
-    # Get today's bookings
-    cursor.execute('''
-    SELECT COUNT(*) FROM bookings 
-    WHERE hotel_id = ? AND check_in_date = ? AND booking_status = 'confirmed'
-    ''', (hotel_id, today))
-    today_bookings = cursor.fetchone()[0]
-    
-    # Get monthly revenue
-    month_start = datetime.datetime.now().replace(day=1).strftime("%Y-%m-%d")
-    cursor.execute('''
-    SELECT SUM(total_amount) FROM bookings 
-    WHERE hotel_id = ? AND created_at >= ? AND booking_status = 'confirmed' AND payment_status = 'paid'
-    ''', (hotel_id, month_start))
-    monthly_revenue = cursor.fetchone()[0] or 0
-    
-    # Get recent bookings
-    cursor.execute('''
-    SELECT b.id, b.guest_name, r.room_number, b.check_in_date, b.check_out_date, b.total_amount, b.payment_status
-    FROM bookings b
-    JOIN rooms r ON b.room_id = r.id
-    WHERE b.hotel_id = ? AND b.booking_status = 'confirmed'
-    ORDER BY b.created_at DESC LIMIT 5
-    ''', (hotel_id,))
-    recent_bookings = cursor.fetchall()
-    
-    conn.close()
+    metrics = hotel_metrics.get_metrics(hotel_id)
     
+    total_rooms = metrics['total_rooms']
+    occupied_rooms = metrics['occupied_rooms']
     occupancy_rate = (occupied_rooms / total_rooms * 100) if total_rooms > 0 else 0
     
     return render_template('owner_dashboard.html',
-                         hotel_name=hotel_name,
+                         hotel_name=metrics['hotel_name'],
                          total_rooms=total_rooms,
                          occupied_rooms=occupied_rooms,
                          occupancy_rate=occupancy_rate,
-                         today_bookings=today_bookings,
-                         monthly_revenue=monthly_revenue,
-                         recent_bookings=recent_bookings)
+                         today_bookings=metrics['today_checkins'],
+                         monthly_revenue=metrics['monthly_booked_revenue'],
+                         recent_bookings=metrics['recent_bookings'])
 
 @app.route('/owner/rooms')
 @login_required
 @owner_required
 def owner_rooms():
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -468,35 +545,76 @@ def owner_rooms():
     
     return render_template('owner_rooms.html', rooms=rooms)
 
+def booking_filters(args):
+    """Listing filters from query-string arguments"""
+    return {
+        'status': args.get('status') or None,
+        'payment_status': args.get('payment') or None,
+        'check_in_from': args.get('from') or None,
+        'check_in_to': args.get('to') or None,
+    }
+
 @app.route('/owner/bookings')
 @login_required
 @owner_required
 def owner_bookings():
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
+    filters = booking_filters(request.args)
+    page = booking_listing.page(hotel_id, **filters)
     
+    # Totals cover all of the hotel's bookings, not the rows on this page: counts
+    # per status from the (hotel, status) index, revenue from the daily rollup
+    conn = database.connect(DB_NAME)
+    cursor = conn.cursor()
     cursor.execute('''
-    SELECT b.id, b.guest_name, b.guest_email, b.guest_phone, r.room_number, 
-           b.check_in_date, b.check_out_date, b.guest_count, b.total_amount, 
-           b.payment_status, b.booking_status, b.created_at
-    FROM bookings b
-    JOIN rooms r ON b.room_id = r.id
-    WHERE b.hotel_id = ?
-    ORDER BY b.created_at DESC
+    SELECT booking_status, COUNT(*) FROM bookings WHERE hotel_id = ? GROUP BY booking_status
     ''', (hotel_id,))
-    
-    bookings = cursor.fetchall()
+    status_counts = dict(cursor.fetchall())
+    cursor.execute('''
+    SELECT COALESCE(SUM(paid_revenue), 0) FROM hotel_daily_stats WHERE hotel_id = ?
+    ''', (hotel_id,))
+    total_revenue = cursor.fetchone()[0]
     conn.close()
-    
-    return render_template('owner_bookings.html', bookings=bookings)
+    metrics = hotel_metrics.get_metrics(hotel_id)
+    
+    return render_template('owner_bookings.html',
+                         bookings=page['bookings'],
+                         next_cursor=page['next_cursor'],
+                         filters=filters,
+                         total_bookings=sum(status_counts.values()),
+                         confirmed_bookings=status_counts.get('confirmed', 0),
+                         total_revenue=total_revenue,
+                         pending_payments_count=metrics['pending_payments_count'])
+
+@app.route('/api/owner/bookings')
+@login_required
+@owner_required
+def api_owner_bookings():
+    """One page of the hotel's bookings, newest first; pass next_cursor back as ?cursor="""
+    hotel_id = session['hotel_id']
+    try:
+        page = booking_listing.page(hotel_id, cursor=request.args.get('cursor'),
+                                    limit=request.args.get('limit', 50, type=int),
+                                    **booking_filters(request.args))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'bookings': booking_listing.as_dicts(page['bookings']),
+                    'next_cursor': page['next_cursor']})
+
+@app.route('/owner/export/<kind>.<fmt>')
+@login_required
+@owner_required
+def owner_export(kind, fmt):
+    """Export this hotel's bookings or daily revenue"""
+    hotel_id = session['hotel_id']
+    return export_response(kind, fmt, hotel_id, f'hotel-{hotel_id}')
 
 @app.route('/owner/checkin-checkout')
 @login_required
 @owner_required
 def owner_checkin_checkout():
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     today = datetime.datetime.now().strftime("%Y-%m-%d")
@@ -535,7 +653,7 @@ def owner_checkin_checkout():
 @login_required
 @admin_required
 def toggle_hotel(hotel_id):
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     try:
@@ -566,19 +684,25 @@ def toggle_hotel(hotel_id):
 @login_required
 @admin_required
 def delete_hotel(hotel_id):
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     try:
         # Delete in order due to foreign key constraints
         cursor.execute('DELETE FROM check_in_out WHERE booking_id IN (SELECT id FROM bookings WHERE hotel_id = ?)', (hotel_id,))
+        cursor.execute('DELETE FROM room_nights WHERE booking_id IN (SELECT id FROM bookings WHERE hotel_id = ?)', (hotel_id,))
         cursor.execute('DELETE FROM bookings WHERE hotel_id = ?', (hotel_id,))
+        cursor.execute('DELETE FROM hotel_daily_stats WHERE hotel_id = ?', (hotel_id,))
+        cursor.execute('DELETE FROM room_calendar WHERE hotel_id = ?', (hotel_id,))
+        cursor.execute('DELETE FROM room_holds WHERE hotel_id = ?', (hotel_id,))
+        cursor.execute('DELETE FROM hotel_events WHERE hotel_id = ?', (hotel_id,))
         cursor.execute('DELETE FROM rooms WHERE hotel_id = ?', (hotel_id,))
         cursor.execute('DELETE FROM room_categories WHERE hotel_id = ?', (hotel_id,))
         cursor.execute('DELETE FROM hotel_owners WHERE hotel_id = ?', (hotel_id,))
         cursor.execute('DELETE FROM hotels WHERE id = ?', (hotel_id,))
         
         conn.commit()
+        telegram_clients.invalidate_hotel_target(hotel_id)
         flash('Hotel deleted successfully!', 'success')
     except Exception as e:
         flash(f'Error deleting hotel: {str(e)}', 'error')
@@ -615,7 +739,7 @@ def telegram_setup():
 @login_required
 @admin_required
 def view_hotel(hotel_id):
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     # Get hotel details with proper column order
@@ -647,11 +771,53 @@ def view_hotel(hotel_id):
     return render_template('view_hotel.html', hotel=hotel, owner=owner, 
                          rooms_count=rooms_count, bookings_count=bookings_count)
 
+@app.route('/admin/hotels/<int:hotel_id>/import-bookings', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def import_bookings(hotel_id):
+    """Bulk-import a hotel's bookings from an uploaded CSV file"""
+    conn = database.connect(DB_NAME)
+    cursor = conn.cursor()
+    cursor.execute('SELECT id, name FROM hotels WHERE id = ?', (hotel_id,))
+    hotel = cursor.fetchone()
+    conn.close()
+
+    if not hotel:
+        flash('Hotel not found', 'error')
+        return redirect(url_for('admin_hotels'))
+
+    result = None
+    if request.method == 'POST':
+        upload = request.files.get('bookings_file')
+        if not upload or not upload.filename:
+            flash('Please choose a CSV file to import', 'error')
+            return redirect(url_for('import_bookings', hotel_id=hotel_id))
+
+        dry_run = request.form.get('dry_run') == '1'
+        try:
+            stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+            result = booking_importer.import_csv(hotel_id, stream, dry_run=dry_run,
+                                                 strict=request.form.get('strict') == '1')
+        except (ValueError, UnicodeDecodeError) as e:
+            flash(f'Error importing bookings: {str(e)}', 'error')
+            return redirect(url_for('import_bookings', hotel_id=hotel_id))
+
+        if dry_run:
+            flash(f"Dry run: {result['imported']} of {result['total']} row(s) can be imported", 'info')
+        elif result['imported']:
+            hotel_metrics.invalidate(hotel_id)
+            flash(f"Imported {result['imported']} of {result['total']} booking(s)", 'success')
+        if result['errors']:
+            flash(f"{len(result['errors'])} row(s) were rejected", 'warning')
+
+    return render_template('import_bookings.html', hotel=hotel, result=result,
+                           required_columns=REQUIRED_COLUMNS, optional_columns=OPTIONAL_COLUMNS)
+
 @app.route('/admin/hotels/<int:hotel_id>/edit', methods=['GET', 'POST'])
 @login_required
 @admin_required
 def edit_hotel(hotel_id):
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     if request.method == 'POST':
@@ -677,6 +843,7 @@ def edit_hotel(hotel_id):
                   telegram_bot_token, telegram_chat_id, owner_name, owner_email, owner_phone, hotel_id))
             
             conn.commit()
+            telegram_clients.invalidate_hotel_target(hotel_id)
             flash('Hotel updated successfully!', 'success')
             return redirect(url_for('view_hotel', hotel_id=hotel_id))
         except Exception as e:
@@ -714,6 +881,7 @@ def add_booking():
         check_out_date = request.form['check_out_date']
         guest_count = int(request.form['guest_count'])
         special_requests = request.form.get('special_requests', '')
+        hold_token = request.form.get('hold_token') or None
         
         # Validate dates
         try:
@@ -732,20 +900,24 @@ def add_booking():
             flash('Invalid date format', 'error')
             return redirect(url_for('add_booking'))
         
-        # Check room availability
-        if not check_room_availability(room_id, check_in_date, check_out_date):
-            flash('Room is not available for the selected dates', 'error')
-            return redirect(url_for('add_booking'))
-        
-        conn = sqlite3.connect(DB_NAME)
+        conn = database.connect(DB_NAME)
         cursor = conn.cursor()
         
         try:
+            # Check availability and insert under one write lock, so two clerks
+            # can't both see the room free and book it
+            cursor.execute('BEGIN IMMEDIATE')
+            if overlapping_booking(cursor, room_id, check_in_date, check_out_date):
+                raise room_nights.RoomUnavailable('Room is not available for the selected dates')
+            if overlapping_hold(cursor, room_id, check_in_date, check_out_date, hold_token):
+                raise room_nights.RoomUnavailable('Room is being booked by someone else; try again shortly')
+            
             # Get room details
             cursor.execute('SELECT price_per_night, capacity FROM rooms WHERE id = ? AND hotel_id = ?', (room_id, hotel_id))
             room_data = cursor.fetchone()
             
             if not room_data:
+                conn.rollback()
                 flash('Room not found', 'error')
                 return redirect(url_for('add_booking'))
             
@@ -753,6 +925,7 @@ def add_booking():
             
             # Check guest count against room capacity
             if guest_count > room_capacity:
+                conn.rollback()
                 flash(f'Room capacity is {room_capacity} guests, but {guest_count} guests requested', 'error')
                 return redirect(url_for('add_booking'))
             
@@ -772,16 +945,17 @@ def add_booking():
                   special_requests, now))
             
             booking_id = cursor.lastrowid
+            room_nights.record_booking_change(cursor, booking_id)
+            daily_stats.record_booking_change(cursor, booking_id, None)
+            room_calendar.record_booking_change(cursor, booking_id, None)
+            held_rooms.convert(cursor, hold_token)
             
             # Get room details for notification
             cursor.execute('SELECT room_number FROM rooms WHERE id = ?', (room_id,))
             room_number = cursor.fetchone()[0]
             
-            conn.commit()
-            
-            # Send Telegram notification
-            try:
-                notification_message = f"""
+            # Queue Telegram notification; the outbox worker delivers it
+            notification_message = f"""
 🏨 New Booking Alert!
 
 Guest: {guest_name}
@@ -793,22 +967,29 @@ Total Amount: ${total_amount:.2f}
 Payment Status: Pending
 
 Booking ID: {booking_id}
-                """.strip()
-                
-                telegram_bot.send_notification(hotel_id, notification_message)
-            except Exception as e:
-                logging.error(f"Failed to send booking notification: {e}")
+            """.strip()
+            notification_outbox.enqueue(cursor, hotel_id, notification_message)
+            hotel_events.publish_booking(cursor, booking_id, 'created')
+            
+            conn.commit()
+            hotel_metrics.invalidate(hotel_id)
+            event_broker.notify()
             
             flash('Booking created successfully! Payment status set to pending.', 'success')
             return redirect(url_for('owner_bookings'))
             
+        except room_nights.RoomUnavailable as e:
+            conn.rollback()
+            flash(str(e), 'error')
+            return redirect(url_for('add_booking'))
         except Exception as e:
+            conn.rollback()
             flash(f'Error creating booking: {str(e)}', 'error')
         finally:
             conn.close()
     
     # Get available rooms
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     cursor.execute('SELECT id, room_number, room_type, price_per_night, capacity FROM rooms WHERE hotel_id = ? AND is_active = 1', (hotel_id,))
     rooms = cursor.fetchall()
@@ -830,7 +1011,7 @@ def add_room():
         capacity = int(request.form['capacity'])
         amenities = request.form.get('amenities', '')
         
-        conn = sqlite3.connect(DB_NAME)
+        conn = database.connect(DB_NAME)
         cursor = conn.cursor()
         
         try:
@@ -858,7 +1039,7 @@ def add_room():
 @owner_required
 def edit_room(room_id):
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     if request.method == 'POST':
@@ -903,7 +1084,7 @@ def toggle_room_status(room_id):
     data = request.get_json()
     status = data.get('status', True)
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     try:
@@ -921,7 +1102,7 @@ def toggle_room_status(room_id):
 @owner_required
 def delete_room(room_id):
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     try:
@@ -954,7 +1135,7 @@ def delete_room(room_id):
 @owner_required
 def booking_details(booking_id):
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -1024,16 +1205,23 @@ def booking_details(booking_id):
 @owner_required
 def mark_booking_paid(booking_id):
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     try:
+        before = daily_stats.load_booking(cursor, booking_id)
         cursor.execute('''
         UPDATE bookings SET payment_status = 'paid' 
         WHERE id = ? AND hotel_id = ? AND booking_status = 'confirmed'
         ''', (booking_id, hotel_id))
+        updated = cursor.rowcount
+        daily_stats.record_booking_change(cursor, booking_id, before)
+        if updated:
+            hotel_events.publish_booking(cursor, booking_id, 'paid')
         
         conn.commit()
+        hotel_metrics.invalidate(hotel_id)
+        event_broker.notify()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -1045,17 +1233,27 @@ def mark_booking_paid(booking_id):
 @owner_required
 def cancel_booking(booking_id):
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     try:
         now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        before = daily_stats.load_booking(cursor, booking_id)
+        stay = room_calendar.load_stay(cursor, booking_id)
         cursor.execute('''
         UPDATE bookings SET booking_status = 'cancelled', cancelled_at = ?
         WHERE id = ? AND hotel_id = ?
         ''', (now, booking_id, hotel_id))
+        updated = cursor.rowcount
+        room_nights.record_booking_change(cursor, booking_id)
+        daily_stats.record_booking_change(cursor, booking_id, before)
+        room_calendar.record_booking_change(cursor, booking_id, stay)
+        if updated:
+            hotel_events.publish_booking(cursor, booking_id, 'cancelled')
         
         conn.commit()
+        hotel_metrics.invalidate(hotel_id)
+        event_broker.notify()
         return jsonify({'success': True})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -1077,7 +1275,7 @@ def checkout_guest(booking_id):
     else:
         notes = request.form.get('notes', '')
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     try:
@@ -1108,11 +1306,19 @@ def checkout_guest(booking_id):
             ''', (booking_id, now, notes))
         
         # Update booking status to reflect checkout
+        before = daily_stats.load_booking(cursor, booking_id)
+        stay = room_calendar.load_stay(cursor, booking_id)
         cursor.execute('''
         UPDATE bookings SET booking_status = 'checked_out' WHERE id = ?
         ''', (booking_id,))
+        room_nights.record_booking_change(cursor, booking_id)
+        daily_stats.record_booking_change(cursor, booking_id, before)
+        room_calendar.record_booking_change(cursor, booking_id, stay)
+        hotel_events.publish_booking(cursor, booking_id, 'checked_out')
         
         conn.commit()
+        hotel_metrics.invalidate(hotel_id)
+        event_broker.notify()
         return jsonify({'success': True})
     except Exception as e:
         conn.rollback()
@@ -1148,7 +1354,7 @@ def checkout_guest(booking_id):
 @owner_required
 def current_guests():
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     today = datetime.datetime.now().strftime("%Y-%m-%d")
@@ -1185,7 +1391,7 @@ def current_guests():
 @owner_required
 def edit_booking(booking_id):
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     if request.method == 'POST':
@@ -1199,16 +1405,27 @@ def edit_booking(booking_id):
         special_requests = request.form.get('special_requests', '')
         
         try:
-            # Get room price
-            cursor.execute('SELECT price_per_night FROM rooms WHERE id = ? AND hotel_id = ?', (room_id, hotel_id))
-            room_price = cursor.fetchone()[0]
-            
             # Calculate total amount
             check_in = datetime.datetime.strptime(check_in_date, '%Y-%m-%d')
             check_out = datetime.datetime.strptime(check_out_date, '%Y-%m-%d')
+            if check_in >= check_out:
+                raise ValueError('Check-out date must be after check-in date')
+            
+            # The booking may keep its own nights, but not take another booking's
+            cursor.execute('BEGIN IMMEDIATE')
+            if overlapping_booking(cursor, room_id, check_in_date, check_out_date, exclude_booking_id=booking_id):
+                raise room_nights.RoomUnavailable('Room is not available for the selected dates')
+            if overlapping_hold(cursor, room_id, check_in_date, check_out_date):
+                raise room_nights.RoomUnavailable('Room is being booked by someone else; try again shortly')
+            
+            # Get room price
+            cursor.execute('SELECT price_per_night FROM rooms WHERE id = ? AND hotel_id = ?', (room_id, hotel_id))
+            room_price = cursor.fetchone()[0]
             nights = (check_out - check_in).days
             total_amount = room_price * nights
             
+            before = daily_stats.load_booking(cursor, booking_id)
+            stay = room_calendar.load_stay(cursor, booking_id)
             cursor.execute('''
             UPDATE bookings SET guest_name = ?, guest_email = ?, guest_phone = ?, room_id = ?,
                    check_in_date = ?, check_out_date = ?, guest_count = ?, total_amount = ?,
@@ -1216,12 +1433,22 @@ def edit_booking(booking_id):
             WHERE id = ? AND hotel_id = ?
             ''', (guest_name, guest_email, guest_phone, room_id, check_in_date, check_out_date,
                   guest_count, total_amount, special_requests, booking_id, hotel_id))
+            room_nights.record_booking_change(cursor, booking_id)
+            daily_stats.record_booking_change(cursor, booking_id, before)
+            room_calendar.record_booking_change(cursor, booking_id, stay)
+            hotel_events.publish_booking(cursor, booking_id, 'updated')
             
             conn.commit()
+            hotel_metrics.invalidate(hotel_id)
+            event_broker.notify()
             flash('Booking updated successfully!', 'success')
             return redirect(url_for('owner_bookings'))
             
+        except room_nights.RoomUnavailable as e:
+            conn.rollback()
+            flash(str(e), 'error')
         except Exception as e:
+            conn.rollback()
             flash(f'Error updating booking: {str(e)}', 'error')
     
     # Get booking details
@@ -1249,7 +1476,7 @@ def edit_booking(booking_id):
 @owner_required
 def manage_categories():
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     cursor.execute('SELECT * FROM room_categories WHERE hotel_id = ? ORDER BY category_name', (hotel_id,))
@@ -1276,6 +1503,30 @@ def chatbot_response():
     except Exception as e:
         return jsonify({'error': f'Chatbot error: {str(e)}'}), 500
 
+@app.route('/owner/chatbot/stream', methods=['POST'])
+@login_required
+@owner_required
+def chatbot_stream():
+    """Stream a chatbot answer as Server-Sent Events: one `data` event per text
+    piece, then a `done` event (or an `error` event if the model call fails)"""
+    hotel_id = session['hotel_id']
+    user_message = (request.get_json(silent=True) or {}).get('message', '')
+    
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+    
+    def events():
+        try:
+            for piece in ai_chatbot.stream_response(hotel_id, user_message):
+                yield f"data: {json.dumps({'delta': piece})}\n\n"
+            yield 'event: done\ndata: {}\n\n'
+        except Exception as e:
+            error = f"I'm sorry, I'm having trouble accessing the hotel data right now. Error: {str(e)}"
+            yield f"event: error\ndata: {json.dumps({'error': error})}\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/owner/chatbot/insights')
 @login_required
 @owner_required
@@ -1323,36 +1574,92 @@ def get_available_rooms():
     if not all([check_in_date, check_out_date]):
         return jsonify({'error': 'Missing required parameters'}), 400
     
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
     try:
-        # Get all rooms for the hotel
-        cursor.execute('''
-            SELECT id, room_number, room_type, price_per_night, capacity
-            FROM rooms 
-            WHERE hotel_id = ? AND is_active = 1
-        ''', (hotel_id,))
-        
-        all_rooms = cursor.fetchall()
-        available_rooms = []
-        
-        for room in all_rooms:
-            room_id = room[0]
-            if check_room_availability(room_id, check_in_date, check_out_date):
-                available_rooms.append({
-                    'id': room[0],
-                    'room_number': room[1],
-                    'room_type': room[2],
-                    'price_per_night': room[3],
-                    'capacity': room[4]
-                })
-        
+        available_rooms = availability_engine.available_rooms(hotel_id, check_in_date, check_out_date,
+                                                              hold_token=data.get('hold_token'))
         return jsonify({'available_rooms': available_rooms})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
-    finally:
-        conn.close()
+
+@app.route('/api/room-holds', methods=['POST'])
+@login_required
+@owner_required
+def place_room_hold():
+    """Hold a room for the dates while the booking form is filled in"""
+    hotel_id = session['hotel_id']
+    data = request.json or {}
+    try:
+        room_id = int(data.get('room_id'))
+        check_in = datetime.date.fromisoformat(data.get('check_in_date') or '')
+        check_out = datetime.date.fromisoformat(data.get('check_out_date') or '')
+    except (TypeError, ValueError):
+        return jsonify({'error': 'room_id and dates (YYYY-MM-DD) are required'}), 400
+    
+    try:
+        hold = held_rooms.place(hotel_id, room_id, check_in.isoformat(), check_out.isoformat(),
+                                token=data.get('token'))
+    except room_nights.RoomUnavailable as e:
+        return jsonify({'error': str(e)}), 409
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    held_rooms.start_sweeper()
+    return jsonify(hold)
+
+@app.route('/api/room-holds/<token>', methods=['DELETE'])
+@login_required
+@owner_required
+def release_room_hold(token):
+    """Give up a hold the booking form no longer needs"""
+    return jsonify({'released': held_rooms.release(token)})
+
+@app.route('/api/availability-grid')
+@login_required
+@owner_required
+def get_availability_grid():
+    """Availability of every room over the next `days` nights (30 by default) in one response"""
+    hotel_id = session['hotel_id']
+    try:
+        start = datetime.date.fromisoformat(request.args.get('start') or datetime.date.today().isoformat())
+        days = int(request.args.get('days', 30))
+    except ValueError:
+        return jsonify({'error': 'start must be YYYY-MM-DD and days a number'}), 400
+    if not 1 <= days <= room_calendar.MAX_GRID_DAYS:
+        return jsonify({'error': f'days must be between 1 and {room_calendar.MAX_GRID_DAYS}'}), 400
+    
+    return jsonify(occupancy_calendar.grid(hotel_id, start.isoformat(), days))
+
+@app.route('/api/changes')
+@login_required
+@owner_required
+def get_changes():
+    """Bookings and guest documents changed since a cursor from a previous call"""
+    hotel_id = session['hotel_id']
+    try:
+        since = request.args.get('since')
+        since = int(since) if since else None
+        limit = int(request.args.get('limit', MAX_CHANGES))
+    except ValueError:
+        return jsonify({'error': 'since and limit must be numbers'}), 400
+    if not 1 <= limit <= MAX_CHANGES:
+        return jsonify({'error': f'limit must be between 1 and {MAX_CHANGES}'}), 400
+    
+    return jsonify(change_feed.changes(hotel_id, since, limit))
+
+@app.route('/owner/events')
+@login_required
+@owner_required
+def hotel_event_stream():
+    """Server-Sent Events: booking and check-in/out changes for the owner's hotel"""
+    hotel_id = session['hotel_id']
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    
+    return Response(stream_with_context(event_broker.stream(hotel_id, last_event_id)),
+                    mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 # Document Search API
 @app.route('/api/search-document', methods=['GET', 'POST'])
@@ -1373,7 +1680,7 @@ def search_document_by_id():
     if not document_id:
         return jsonify({'found': False, 'message': 'Please enter a document ID'})
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     try:
@@ -1436,12 +1743,15 @@ def manage_documents():
     """Document management dashboard"""
     hotel_id = session['hotel_id']
     search_term = request.args.get('search', '')
+    page = request.args.get('page', 1, type=int)
+    has_more = False
     
     if search_term:
-        documents = document_manager.search_documents(hotel_id, search_term)
+        results = document_manager.search_documents_page(hotel_id, search_term, page)
+        documents, page, has_more = results['documents'], results['page'], results['has_more']
     else:
         # Get recent documents
-        conn = sqlite3.connect(DB_NAME)
+        conn = database.connect(DB_NAME)
         cursor = conn.cursor()
         
         cursor.execute('''
@@ -1479,7 +1789,9 @@ def manage_documents():
     return render_template('manage_documents.html', 
                          documents=documents, 
                          summary=summary, 
-                         search_term=search_term)
+                         search_term=search_term,
+                         page=page,
+                         has_more=has_more)
 
 @app.route('/owner/bookings/<int:booking_id>/documents', methods=['GET', 'POST'])
 @login_required
@@ -1489,7 +1801,7 @@ def booking_documents(booking_id):
     hotel_id = session['hotel_id']
     
     # Verify booking belongs to this hotel
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     cursor.execute('SELECT guest_name FROM bookings WHERE id = ? AND hotel_id = ?', (booking_id, hotel_id))
     booking = cursor.fetchone()
@@ -1563,7 +1875,7 @@ def delete_document(document_id):
 def download_document(document_id):
     """Download a document file"""
     hotel_id = session['hotel_id']
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     try:
@@ -1603,7 +1915,7 @@ def checkin_guest(booking_id):
     hotel_id = session['hotel_id']
     
     # Get booking details
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     cursor.execute('''
@@ -1672,8 +1984,10 @@ def checkin_guest(booking_id):
         else:
             cursor.execute('INSERT INTO check_in_out (booking_id, check_in_time, notes) VALUES (?, ?, ?)', 
                          (booking_id, now, notes))
+        hotel_events.publish_booking(cursor, booking_id, 'checked_in')
         
         conn.commit()
+        event_broker.notify()
         flash('Guest checked in successfully!', 'success')
         return redirect(url_for('owner_checkin_checkout'))
     
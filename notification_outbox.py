@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Telegram notification outbox.
+
+Web requests only insert a row into notification_outbox inside their own
+transaction; a separate worker process (run this module) drains the table
+through warm, keep-alive Bot API clients, retrying failed deliveries with exponential
+backoff and recording the outcome on each row.
+"""
+import sys
+import time
+import logging
+import datetime
+from typing import Dict, Any, Optional, Callable
+import requests
+import database
+import telegram_clients
+# Fallback bot for hotels that have a chat ID but no bot token of their own
+from simple_telegram_bot import BOT_TOKEN
+
+DB_NAME = 'multi_hotel.db'
+
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 5.0      # seconds before the first retry, doubled per attempt
+BACKOFF_MAX = 15 * 60.0
+CLAIM_LEASE = 120.0     # a 'sending' row is retried if its worker dies mid-send
+POLL_INTERVAL = 1.0
+
+NOTIFICATION_OUTBOX_TABLE = '''
+CREATE TABLE IF NOT EXISTS notification_outbox (
+    id INTEGER PRIMARY KEY,
+    hotel_id INTEGER NOT NULL,
+    message TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    created_at TEXT NOT NULL,
+    sent_at TEXT,
+    FOREIGN KEY (hotel_id) REFERENCES hotels (id)
+)
+'''
+
+
+class DeliveryError(Exception):
+    """A delivery attempt failed; `retry` says whether trying again can help"""
+
+    def __init__(self, message: str, retry: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry = retry
+        self.retry_after = retry_after
+
+
+def enqueue(cursor, hotel_id: int, message: str) -> int:
+    """Queue a notification as part of the caller's transaction"""
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor.execute('''
+        INSERT INTO notification_outbox (hotel_id, message, next_attempt_at, created_at)
+        VALUES (?, ?, ?, ?)
+    ''', (hotel_id, message, time.time(), now))
+    return cursor.lastrowid
+
+
+def backoff_delay(attempts: int) -> float:
+    """Seconds to wait before retry number `attempts` (1-based)"""
+    return min(BACKOFF_BASE * (2 ** (attempts - 1)), BACKOFF_MAX)
+
+
+class TelegramSender:
+    """Sends messages through the warm per-token clients of a TelegramClientRegistry"""
+
+    def __init__(self, registry: Optional[telegram_clients.TelegramClientRegistry] = None):
+        self.registry = registry or telegram_clients.registry
+
+    def send(self, bot_token: str, chat_id: str, text: str):
+        try:
+            response = self.registry.get(bot_token).post('sendMessage', {'chat_id': chat_id, 'text': text})
+        except requests.RequestException as e:
+            raise DeliveryError(f'Network error: {e}')
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+        if response.status_code == 200 and payload.get('ok'):
+            return
+
+        description = payload.get('description') or f'HTTP {response.status_code}'
+        if response.status_code == 429:
+            retry_after = payload.get('parameters', {}).get('retry_after')
+            raise DeliveryError(description, retry_after=retry_after)
+        # Bad chat ID, revoked token, bot blocked: retrying won't help
+        raise DeliveryError(description, retry=response.status_code >= 500)
+
+    def close(self):
+        self.registry.close_all()
+
+
+class OutboxWorker:
+    def __init__(self, db_name: str = DB_NAME, sender: Optional[TelegramSender] = None,
+                 clock: Callable[[], float] = time.time):
+        self.db_name = db_name
+        self.sender = sender or TelegramSender()
+        self.clock = clock
+
+    def claim_batch(self, limit: int = 20):
+        """Lease due notifications to this worker"""
+        now = self.clock()
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                UPDATE notification_outbox
+                SET status = 'sending', next_attempt_at = ?
+                WHERE id IN (
+                    SELECT id FROM notification_outbox
+                    WHERE status IN ('pending', 'sending') AND next_attempt_at <= ?
+                    ORDER BY next_attempt_at, id
+                    LIMIT ?
+                )
+                RETURNING id, hotel_id, message, attempts
+            ''', (now + CLAIM_LEASE, now, limit))
+            batch = sorted(cursor.fetchall())
+            conn.commit()
+            return batch
+        finally:
+            conn.close()
+
+    def _hotel_target(self, hotel_id: int):
+        target = telegram_clients.get_hotel_target(self.db_name, hotel_id)
+        if target is None:
+            return None
+        return target[0], target[1] or BOT_TOKEN
+
+    def deliver(self, notification) -> str:
+        """Attempt one notification and record the outcome; returns the new status"""
+        outbox_id, hotel_id, message, attempts = notification
+        attempts += 1
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.cursor()
+            target = self._hotel_target(hotel_id)
+            error = None
+            try:
+                if target is None:
+                    raise DeliveryError('No chat ID configured', retry=False)
+                self.sender.send(target[1], target[0], message)
+            except DeliveryError as e:
+                error = e
+
+            if error is None:
+                status = 'sent'
+                now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                cursor.execute('''
+                    UPDATE notification_outbox
+                    SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL
+                    WHERE id = ?
+                ''', (attempts, now, outbox_id))
+                logging.info(f"Notification {outbox_id} sent to hotel {hotel_id}")
+            elif error.retry and attempts < MAX_ATTEMPTS:
+                status = 'pending'
+                delay = max(backoff_delay(attempts), error.retry_after or 0)
+                cursor.execute('''
+                    UPDATE notification_outbox
+                    SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ?
+                    WHERE id = ?
+                ''', (attempts, self.clock() + delay, str(error), outbox_id))
+                logging.warning(f"Notification {outbox_id} failed ({error}), retrying in {delay:.0f}s")
+            else:
+                status = 'failed'
+                cursor.execute('''
+                    UPDATE notification_outbox
+                    SET status = 'failed', attempts = ?, last_error = ?
+                    WHERE id = ?
+                ''', (attempts, str(error), outbox_id))
+                logging.error(f"Notification {outbox_id} to hotel {hotel_id} failed permanently: {error}")
+            conn.commit()
+            return status
+        finally:
+            conn.close()
+
+    def run_once(self, limit: int = 20) -> int:
+        """Deliver every notification that is currently due; returns how many were tried"""
+        batch = self.claim_batch(limit)
+        for notification in batch:
+            self.deliver(notification)
+        return len(batch)
+
+    def run_forever(self, poll_interval: float = POLL_INTERVAL):
+        while True:
+            if not self.run_once():
+                time.sleep(poll_interval)
+
+
+def outbox_stats(db_name: str = DB_NAME, hotel_id: Optional[int] = None) -> Dict[str, Any]:
+    """Count notifications per delivery status"""
+    conn = database.connect(db_name)
+    try:
+        cursor = conn.cursor()
+        if hotel_id is None:
+            cursor.execute('SELECT status, COUNT(*) FROM notification_outbox GROUP BY status')
+        else:
+            cursor.execute('SELECT status, COUNT(*) FROM notification_outbox WHERE hotel_id = ? GROUP BY status',
+                           (hotel_id,))
+        counts = dict(cursor.fetchall())
+    finally:
+        conn.close()
+    return {status: counts.get(status, 0) for status in ('pending', 'sending', 'sent', 'failed')}
+
+
+def main():
+    """Run the delivery worker until interrupted"""
+    print("📨 Starting notification outbox worker...")
+    print("Press Ctrl+C to stop")
+    worker = OutboxWorker()
+    try:
+        worker.run_forever()
+    except KeyboardInterrupt:
+        print("\nWorker stopped by user")
+    finally:
+        worker.sender.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+TTL + LRU cache for AI chatbot answers, with request coalescing.
+
+Identical questions asked while an answer is already being generated wait
+for that single upstream call instead of starting their own. Failed calls
+are never cached; their waiters see the same exception, and a call that
+is interrupted raises RuntimeError in its waiters.
+"""
+import os
+import re
+import time
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+CACHE_TTL = float(os.getenv('CHATBOT_CACHE_TTL', '120'))
+CACHE_SIZE = int(os.getenv('CHATBOT_CACHE_SIZE', '1024'))
+
+
+def normalize_question(message: str) -> str:
+    """Case, whitespace, curly quotes and trailing punctuation don't change the answer"""
+    message = message.lower().replace('’', "'").replace('‘', "'")
+    message = re.sub(r'\s+', ' ', message).strip()
+    return message.rstrip(' ?!.')
+
+
+def snapshot_hash(data: Dict[str, Any]) -> str:
+    """Stable digest of the analytics an answer was generated from"""
+    encoded = json.dumps(data, sort_keys=True, default=str).encode()
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+
+class _Call:
+    """An upstream call in progress that other requests can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        self.duration = 0.0
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = CACHE_SIZE, ttl: float = CACHE_TTL,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()   # key -> (expires_at, value, upstream seconds)
+        self._calls: Dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._coalesced = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._errors = 0
+        self._upstream_seconds = 0.0
+        self._saved_seconds = 0.0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Tuple[Any, str]:
+        """Cached value for key, computing it at most once at a time.
+
+        Returns (value, source) where source is 'hit', 'coalesced' or 'miss'.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > self.clock():
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    self._saved_seconds += entry[2]
+                    return entry[1], 'hit'
+                del self._entries[key]
+                self._expirations += 1
+
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._misses += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            with self._lock:
+                self._coalesced += 1
+                self._saved_seconds += call.duration
+            return call.value, 'coalesced'
+
+        start = time.perf_counter()
+        try:
+            call.value = compute()
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            # Interrupted (KeyboardInterrupt, GeneratorExit...): waiters
+            # still need an answer, not an unset value
+            call.error = RuntimeError('upstream call was interrupted')
+            raise
+        finally:
+            call.duration = time.perf_counter() - start
+            # Always drop the call, or later callers would wait on it forever
+            with self._lock:
+                del self._calls[key]
+                if call.error is None:
+                    self._store(key, call.value, call.duration)
+                else:
+                    self._errors += 1
+            call.done.set()
+        return call.value, 'miss'
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Cached value for key, or None (counted as a miss) if the caller must produce it"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(key)
+                self._hits += 1
+                self._saved_seconds += entry[2]
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            return None
+
+    def put(self, key: Hashable, value: Any, duration: float = 0.0):
+        """Store a value produced outside get_or_compute, e.g. a fully streamed answer"""
+        with self._lock:
+            self._store(key, value, duration)
+
+    def _store(self, key: Hashable, value: Any, duration: float):
+        self._upstream_seconds += duration
+        self._entries[key] = (self.clock() + self.ttl, value, duration)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]):
+        """Drop every cached entry whose key matches"""
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and the upstream time that cache hits and coalesced waits avoided"""
+        with self._lock:
+            served = self._hits + self._coalesced
+            lookups = served + self._misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self._hits,
+                'coalesced': self._coalesced,
+                'misses': self._misses,
+                'errors': self._errors,
+                'evictions': self._evictions,
+                'expirations': self._expirations,
+                'in_flight': len(self._calls),
+                'hit_rate': round(served / lookups, 4) if lookups else 0.0,
+                'upstream_seconds': round(self._upstream_seconds, 3),
+                'saved_seconds': round(self._saved_seconds, 3),
+            }
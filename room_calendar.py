@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""
+Per-room occupancy calendar: one bitmask of booked nights per room and month.
+
+Bit d-1 of a (room, month) row is set when a confirmed booking holds the room
+on night d of that month, i.e. the night falls in [check_in_date,
+check_out_date). Booking writes refresh the months they touch in the same
+transaction, so availability and occupancy questions are bit tests on a
+handful of rows instead of date-range scans over the booking history.
+
+The calendar covers the multi-hotel platform (multi_hotel.db) only. The
+legacy single-hotel app.py keeps its own hotel.db, which has no migrations or
+calendar table and whose bot handlers write bookings directly, so its room
+status queries still compare dates.
+
+Run this module to check the calendar against the bookings table:
+python room_calendar.py [hotel_id] [--repair]
+"""
+import sys
+import datetime
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import database
+
+DB_NAME = 'multi_hotel.db'
+
+# Longest window one availability grid request may cover
+MAX_GRID_DAYS = 366
+
+ROOM_CALENDAR_TABLE = '''
+CREATE TABLE IF NOT EXISTS room_calendar (
+    room_id INTEGER NOT NULL,
+    month TEXT NOT NULL,
+    hotel_id INTEGER NOT NULL,
+    nights INTEGER NOT NULL,
+    PRIMARY KEY (room_id, month)
+) WITHOUT ROWID
+'''
+
+# A stay as the calendar sees it: (hotel_id, room_id, check_in_date, check_out_date)
+STAY_COLUMNS = 'hotel_id, room_id, check_in_date, check_out_date'
+
+
+def _next_month(day: datetime.date) -> datetime.date:
+    return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+
+def month_masks(check_in_date: str, check_out_date: str) -> Dict[str, int]:
+    """Bitmask of the nights in [check_in_date, check_out_date), keyed by 'YYYY-MM'"""
+    masks = {}
+    night = datetime.date.fromisoformat(check_in_date)
+    check_out = datetime.date.fromisoformat(check_out_date)
+    while night < check_out:
+        month = night.strftime('%Y-%m')
+        # Whole runs of nights within one month at a time
+        end = min(check_out, _next_month(night))
+        run = (1 << (end - night).days) - 1
+        masks[month] = masks.get(month, 0) | (run << (night.day - 1))
+        night = end
+    return masks
+
+
+def busy_condition(check_in_date: str, check_out_date: str, alias: str = 'c') -> Tuple[str, List]:
+    """SQL condition (and its parameters) matching calendar rows with a booked night in the range"""
+    masks = month_masks(check_in_date, check_out_date)
+    if not masks:
+        return '0', []
+    months = ', '.join('?' * len(masks))
+    cases = ' '.join('WHEN ? THEN ?' for _ in masks)
+    params = list(masks)
+    for month, mask in masks.items():
+        params += [month, mask]
+    return f'{alias}.month IN ({months}) AND {alias}.nights & (CASE {alias}.month {cases} END) != 0', params
+
+
+def load_stay(cursor, booking_id: int) -> Optional[Tuple]:
+    """The room and nights a booking covers, whatever its status (None if it doesn't exist)"""
+    cursor.execute(f'SELECT {STAY_COLUMNS} FROM bookings WHERE id = ?', (booking_id,))
+    return cursor.fetchone()
+
+
+def refresh(cursor, stays: Iterable[Tuple]):
+    """Recompute the calendar rows covering these stays from the bookings table.
+
+    Rows are rebuilt rather than patched bit by bit, so removing a stay can't
+    clear a night that another booking of the same room still holds.
+    """
+    months = defaultdict(set)
+    hotels = {}
+    for hotel_id, room_id, check_in_date, check_out_date in stays:
+        months[room_id].update(month_masks(check_in_date, check_out_date))
+        hotels[room_id] = hotel_id
+
+    for room_id, room_months in months.items():
+        if not room_months:
+            continue
+        first, last = min(room_months), max(room_months)
+        span_end = _next_month(datetime.date.fromisoformat(f'{last}-01'))
+        cursor.execute('''
+            SELECT check_in_date, check_out_date FROM bookings
+            WHERE room_id = ? AND booking_status = 'confirmed'
+            AND check_in_date < ? AND check_out_date > ?
+        ''', (room_id, span_end.isoformat(), f'{first}-01'))
+        nights = dict.fromkeys(room_months, 0)
+        for check_in_date, check_out_date in cursor.fetchall():
+            for month, mask in month_masks(check_in_date, check_out_date).items():
+                if month in nights:
+                    nights[month] |= mask
+
+        cursor.executemany('DELETE FROM room_calendar WHERE room_id = ? AND month = ?',
+                           [(room_id, month) for month, mask in nights.items() if not mask])
+        cursor.executemany('''
+            INSERT INTO room_calendar (room_id, month, hotel_id, nights) VALUES (?, ?, ?, ?)
+            ON CONFLICT (room_id, month) DO UPDATE SET nights = excluded.nights
+        ''', [(room_id, month, hotels[room_id], mask) for month, mask in nights.items() if mask])
+
+
+def record_booking_change(cursor, booking_id: int, before: Optional[Tuple]):
+    """Apply a booking write to the calendar; call after the write, before commit.
+
+    `before` is the load_stay() result from before the write (None for a new booking).
+    """
+    refresh(cursor, [stay for stay in (before, load_stay(cursor, booking_id)) if stay])
+
+
+def compute_calendar(cursor, hotel_id: Optional[int] = None) -> Dict[Tuple[int, str], Tuple[int, int]]:
+    """Recompute the calendar from scratch: (room_id, month) -> (hotel_id, nights)"""
+    query = f"SELECT {STAY_COLUMNS} FROM bookings WHERE booking_status = 'confirmed'"
+    params = ()
+    if hotel_id is not None:
+        query += ' AND hotel_id = ?'
+        params = (hotel_id,)
+
+    calendar = {}
+    cursor.execute(query, params)
+    for h_id, room_id, check_in_date, check_out_date in cursor.fetchall():
+        for month, mask in month_masks(check_in_date, check_out_date).items():
+            _, nights = calendar.get((room_id, month), (h_id, 0))
+            calendar[(room_id, month)] = (h_id, nights | mask)
+    return calendar
+
+
+def check(cursor, hotel_id: Optional[int] = None) -> List[Tuple[int, str, int, int]]:
+    """Calendar rows that disagree with the bookings table: (room_id, month, stored, expected)"""
+    expected = compute_calendar(cursor, hotel_id)
+    query = 'SELECT room_id, month, nights FROM room_calendar'
+    params = ()
+    if hotel_id is not None:
+        query += ' WHERE hotel_id = ?'
+        params = (hotel_id,)
+    cursor.execute(query, params)
+    stored = {(room_id, month): nights for room_id, month, nights in cursor.fetchall()}
+
+    mismatches = []
+    for key in sorted(set(stored) | set(expected)):
+        want = expected.get(key, (None, 0))[1]
+        if stored.get(key, 0) != want:
+            mismatches.append((key[0], key[1], stored.get(key, 0), want))
+    return mismatches
+
+
+def rebuild(conn, hotel_id: Optional[int] = None) -> int:
+    """Rebuild room_calendar for one hotel or all of them.
+
+    Runs inside the caller's transaction; returns the number of calendar rows written.
+    """
+    cursor = conn.cursor()
+    calendar = compute_calendar(cursor, hotel_id)
+    if hotel_id is None:
+        cursor.execute('DELETE FROM room_calendar')
+    else:
+        cursor.execute('DELETE FROM room_calendar WHERE hotel_id = ?', (hotel_id,))
+    cursor.executemany('INSERT INTO room_calendar (room_id, month, hotel_id, nights) VALUES (?, ?, ?, ?)',
+                       [(room_id, month, h_id, nights) for (room_id, month), (h_id, nights) in calendar.items()])
+    return len(calendar)
+
+
+class RoomCalendar:
+    def __init__(self, db_name: str = DB_NAME):
+        self.db_name = db_name
+
+    def booked_nights(self, hotel_id: int, start_date: str, days: int) -> Dict[int, int]:
+        """Booked nights of each active room over `days` nights from start_date.
+
+        Returns room_id -> bitmask where bit i is night start_date + i; rooms
+        with no booked night in the window map to 0.
+        """
+        start = datetime.date.fromisoformat(start_date)
+        end = start + datetime.timedelta(days=days)
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT id FROM rooms WHERE hotel_id = ? AND is_active = 1', (hotel_id,))
+            window = {room_id: 0 for room_id, in cursor.fetchall()}
+            cursor.execute('''
+                SELECT c.room_id, c.month, c.nights FROM room_calendar c
+                WHERE c.hotel_id = ? AND c.month BETWEEN ? AND ?
+            ''', (hotel_id, start.strftime('%Y-%m'), end.strftime('%Y-%m')))
+            rows = cursor.fetchall()
+        finally:
+            conn.close()
+
+        for room_id, month, nights in rows:
+            if room_id not in window:
+                continue
+            # Shift the month's bits so bit 0 is start_date, then clip to the window
+            offset = (datetime.date.fromisoformat(f'{month}-01') - start).days
+            bits = nights << offset if offset >= 0 else nights >> -offset
+            window[room_id] |= bits & ((1 << days) - 1)
+        return window
+
+    def occupancy_by_night(self, hotel_id: int, start_date: str, days: int) -> List[int]:
+        """Number of active rooms booked on each of `days` nights from start_date"""
+        masks = self.booked_nights(hotel_id, start_date, days).values()
+        return _count_by_night(_night_strings(masks, days), days)
+
+    def grid(self, hotel_id: int, start_date: str, days: int) -> Dict[str, Any]:
+        """Availability of every active room over `days` nights from start_date.
+
+        Each room's `booked` is a string of '0' (free) and '1' (booked) where
+        character i is night start_date + i; `free_rooms` counts free rooms per night.
+        """
+        booked = self.booked_nights(hotel_id, start_date, days)
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT id, room_number, room_type, price_per_night, capacity FROM rooms
+                WHERE hotel_id = ? AND is_active = 1
+                ORDER BY room_number
+            ''', (hotel_id,))
+            rooms = cursor.fetchall()
+        finally:
+            conn.close()
+
+        nights = _night_strings([booked.get(room[0], 0) for room in rooms], days)
+        occupied = _count_by_night(nights, days)
+        return {
+            'start': start_date,
+            'days': days,
+            'rooms': [{
+                'id': room[0],
+                'room_number': room[1],
+                'room_type': room[2],
+                'price_per_night': room[3],
+                'capacity': room[4],
+                'booked': booked_nights,
+            } for room, booked_nights in zip(rooms, nights)],
+            'free_rooms': [len(rooms) - count for count in occupied],
+        }
+
+
+def _night_strings(masks: Iterable[int], days: int) -> List[str]:
+    """'0'/'1' strings where character i is bit i of each mask"""
+    return [format(bits, f'0{days}b')[::-1] for bits in masks]
+
+
+def _count_by_night(nights: List[str], days: int) -> List[int]:
+    """Booked rooms per night, counted down the columns of the night strings"""
+    if not nights:
+        return [0] * days
+    return [column.count('1') for column in map(''.join, zip(*nights))]
+
+
+def main(argv):
+    """Check (or with --repair, rebuild) the calendar: python room_calendar.py [hotel_id] [--repair]"""
+    args = [arg for arg in argv if not arg.startswith('--')]
+    hotel_id = int(args[0]) if args else None
+    scope = f"hotel {hotel_id}" if hotel_id is not None else "all hotels"
+    conn = database.connect(DB_NAME)
+    try:
+        conn.execute(ROOM_CALENDAR_TABLE)
+        mismatches = check(conn.cursor(), hotel_id)
+        for room_id, month, stored, expected in mismatches[:20]:
+            print(f"⚠️  Room {room_id}, {month}: calendar {stored:031b}, bookings {expected:031b}")
+        if not mismatches:
+            print(f"✅ Room calendar matches the bookings table for {scope}")
+            return 0
+        if '--repair' not in argv:
+            print(f"❌ {len(mismatches)} calendar row(s) out of date; rerun with --repair to rebuild")
+            return 1
+        rows = rebuild(conn, hotel_id)
+        conn.commit()
+        print(f"✅ Rebuilt room_calendar for {scope}: {rows} room-month(s)")
+    except Exception as e:
+        print(f"❌ Calendar check failed: {e}")
+        return 1
+    finally:
+        conn.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
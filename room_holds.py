@@ -0,0 +1,174 @@
+"""
+Short-lived room holds between the availability search and the booking form.
+
+When a clerk picks a room, the add-booking page places a hold on it for the
+chosen nights. Until the hold expires, availability searches by other clerks
+see the room as busy, and their bookings of those nights are refused; the
+clerk's own booking converts the hold inside its transaction.
+
+room_holds is the source of truth, so holds are shared by every worker
+process; expired rows are ignored by all queries. Each process keeps an
+in-memory heap of the expiry times of the holds it placed, and a sweeper
+thread sleeps until the earliest one to delete expired rows.
+"""
+import os
+import time
+import heapq
+import secrets
+import threading
+from typing import Any, Callable, Dict, Optional
+import database
+from availability import overlapping_booking, overlapping_hold
+from room_nights import RoomUnavailable
+
+HOLD_TTL = float(os.getenv('ROOM_HOLD_TTL', '300'))   # seconds a room stays held
+SWEEP_INTERVAL = 60.0   # longest the sweeper sleeps when it knows of no holds
+
+ROOM_HOLDS_TABLE = '''
+CREATE TABLE IF NOT EXISTS room_holds (
+    token TEXT PRIMARY KEY,
+    hotel_id INTEGER NOT NULL,
+    room_id INTEGER NOT NULL,
+    check_in_date TEXT NOT NULL,
+    check_out_date TEXT NOT NULL,
+    expires_at REAL NOT NULL
+)
+'''
+
+class RoomHolds:
+    def __init__(self, db_name: str = 'multi_hotel.db', ttl: float = HOLD_TTL,
+                 clock: Callable[[], float] = time.time):
+        self.db_name = db_name
+        self.ttl = ttl
+        self.clock = clock
+        self._expiries = []
+        self._wake = threading.Condition()
+        self._sweeper = None
+        self._placed = 0
+        self._converted = 0
+        self._released = 0
+        self._swept = 0
+
+    def place(self, hotel_id: int, room_id: int, check_in_date: str, check_out_date: str,
+              token: Optional[str] = None) -> Dict[str, Any]:
+        """Hold a room for the nights, replacing the token's previous hold.
+
+        Raises RoomUnavailable if the room is booked or held by someone else.
+        """
+        if check_in_date >= check_out_date:
+            raise ValueError('Check-out date must be after check-in date')
+        token = token or secrets.token_urlsafe(16)
+        now = self.clock()
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('SELECT 1 FROM rooms WHERE id = ? AND hotel_id = ? AND is_active = 1',
+                           (room_id, hotel_id))
+            if cursor.fetchone() is None:
+                raise ValueError('Room not found')
+            if overlapping_booking(cursor, room_id, check_in_date, check_out_date):
+                raise RoomUnavailable('Room is not available for the selected dates')
+            if overlapping_hold(cursor, room_id, check_in_date, check_out_date, token, now):
+                raise RoomUnavailable('Room is being booked by someone else; try again shortly')
+            cursor.execute('''
+                INSERT INTO room_holds (token, hotel_id, room_id, check_in_date, check_out_date, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (token) DO UPDATE SET
+                    hotel_id = excluded.hotel_id, room_id = excluded.room_id,
+                    check_in_date = excluded.check_in_date, check_out_date = excluded.check_out_date,
+                    expires_at = excluded.expires_at
+            ''', (token, hotel_id, room_id, check_in_date, check_out_date, now + self.ttl))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+        with self._wake:
+            heapq.heappush(self._expiries, now + self.ttl)
+            self._placed += 1
+            self._wake.notify()
+        return {'token': token, 'room_id': room_id, 'expires_at': now + self.ttl, 'expires_in': self.ttl}
+
+    def convert(self, cursor, token: Optional[str]) -> bool:
+        """Turn a hold into the booking being written on `cursor`: drop it in the same transaction"""
+        if not token:
+            return False
+        cursor.execute('DELETE FROM room_holds WHERE token = ?', (token,))
+        converted = cursor.rowcount > 0
+        if converted:
+            with self._wake:
+                self._converted += 1
+        return converted
+
+    def release(self, token: str) -> bool:
+        """Drop a hold the clerk no longer needs"""
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.execute('DELETE FROM room_holds WHERE token = ?', (token,))
+            conn.commit()
+            released = cursor.rowcount > 0
+        finally:
+            conn.close()
+        if released:
+            with self._wake:
+                self._released += 1
+        return released
+
+    def sweep(self) -> int:
+        """Delete expired holds; returns how many were removed"""
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.execute('DELETE FROM room_holds WHERE expires_at <= ?', (self.clock(),))
+            conn.commit()
+            swept = cursor.rowcount
+        finally:
+            conn.close()
+        with self._wake:
+            self._swept += swept
+        return swept
+
+    def start_sweeper(self):
+        """Run sweep() in a daemon thread whenever a hold this process placed expires"""
+        with self._wake:
+            if self._sweeper is None or not self._sweeper.is_alive():
+                self._sweeper = threading.Thread(target=self._sweep_forever, name='room-hold-sweeper',
+                                                 daemon=True)
+                self._sweeper.start()
+
+    def _sweep_forever(self):
+        while True:
+            with self._wake:
+                now = self.clock()
+                due = False
+                while self._expiries and self._expiries[0] <= now:
+                    heapq.heappop(self._expiries)
+                    due = True
+                if not due:
+                    delay = self._expiries[0] - now if self._expiries else SWEEP_INTERVAL
+                    self._wake.wait(timeout=min(delay, SWEEP_INTERVAL))
+                    continue
+            try:
+                self.sweep()
+            except Exception:
+                # Expired holds are ignored by every query; the next wake-up retries
+                time.sleep(1)
+
+    def stats(self) -> Dict[str, Any]:
+        conn = database.connect(self.db_name)
+        try:
+            active = conn.execute('SELECT COUNT(*) FROM room_holds WHERE expires_at > ?',
+                                  (self.clock(),)).fetchone()[0]
+        finally:
+            conn.close()
+        with self._wake:
+            return {
+                'ttl': self.ttl,
+                'active': active,
+                'placed': self._placed,
+                'converted': self._converted,
+                'released': self._released,
+                'swept': self._swept,
+            }
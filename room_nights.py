@@ -0,0 +1,84 @@
+"""
+Double-booking guard: one row per room and night held by a confirmed booking.
+
+The (room_id, night) primary key makes SQLite itself refuse a second booking
+of the same room for the same night, whatever code path writes it. Booking
+writes call record_booking_change inside their transaction, after the
+availability check; a conflict raises RoomUnavailable and the caller rolls
+back.
+"""
+import sqlite3
+import datetime
+from typing import Iterable, Optional, Tuple
+
+ROOM_NIGHTS_TABLE = '''
+CREATE TABLE IF NOT EXISTS room_nights (
+    room_id INTEGER NOT NULL,
+    night TEXT NOT NULL,
+    booking_id INTEGER NOT NULL,
+    PRIMARY KEY (room_id, night)
+) WITHOUT ROWID
+'''
+
+
+class RoomUnavailable(Exception):
+    """The room is already held by another booking for one of the nights"""
+
+
+def nights(check_in_date: str, check_out_date: str) -> Iterable[str]:
+    """Every night in [check_in_date, check_out_date)"""
+    night = datetime.date.fromisoformat(check_in_date)
+    check_out = datetime.date.fromisoformat(check_out_date)
+    while night < check_out:
+        yield night.isoformat()
+        night += datetime.timedelta(days=1)
+
+
+def claim(cursor, stays: Iterable[Tuple[int, int, str, str]]):
+    """Hold the nights of (booking_id, room_id, check_in_date, check_out_date) stays"""
+    rows = [(room_id, night, booking_id)
+            for booking_id, room_id, check_in_date, check_out_date in stays
+            for night in nights(check_in_date, check_out_date)]
+    try:
+        cursor.executemany('INSERT INTO room_nights (room_id, night, booking_id) VALUES (?, ?, ?)', rows)
+    except sqlite3.IntegrityError:
+        raise RoomUnavailable('Room is not available for the selected dates') from None
+
+
+def record_booking_change(cursor, booking_id: int):
+    """Make the guard match a booking after a write; call before commit.
+
+    Raises RoomUnavailable if the booking now claims a night another booking holds.
+    """
+    cursor.execute('DELETE FROM room_nights WHERE booking_id = ?', (booking_id,))
+    cursor.execute('''
+        SELECT id, room_id, check_in_date, check_out_date FROM bookings
+        WHERE id = ? AND booking_status = 'confirmed'
+    ''', (booking_id,))
+    stay = cursor.fetchone()
+    if stay:
+        claim(cursor, [stay])
+
+
+def rebuild(conn, hotel_id: Optional[int] = None) -> int:
+    """Rebuild room_nights from confirmed bookings, inside the caller's transaction.
+
+    Nights that older double bookings share go to the earliest booking.
+    Returns the number of nights held.
+    """
+    cursor = conn.cursor()
+    query = "SELECT id, room_id, check_in_date, check_out_date FROM bookings WHERE booking_status = 'confirmed'"
+    params = ()
+    if hotel_id is None:
+        cursor.execute('DELETE FROM room_nights')
+    else:
+        cursor.execute('DELETE FROM room_nights WHERE booking_id IN (SELECT id FROM bookings WHERE hotel_id = ?)',
+                       (hotel_id,))
+        query += ' AND hotel_id = ?'
+        params = (hotel_id,)
+    cursor.execute(query + ' ORDER BY id', params)
+    rows = [(room_id, night, booking_id)
+            for booking_id, room_id, check_in_date, check_out_date in cursor.fetchall()
+            for night in nights(check_in_date, check_out_date)]
+    cursor.executemany('INSERT OR IGNORE INTO room_nights (room_id, night, booking_id) VALUES (?, ?, ?)', rows)
+    return cursor.rowcount
@@ -2,35 +2,227 @@
 """
 Hotel Management System - Multi-Hotel Platform
 Run this script to start the application
+
+python run.py                  development server with the reloader
+python run.py --production     multi-process server for real traffic
+
+Production mode sets the database up once, then serves with gunicorn when it
+is installed, otherwise with its own pre-forked workers sharing one listening
+socket (waitress, or a threaded single process, where fork() is unavailable).
+Every worker warms its templates, connection pool and metrics cache before it
+takes traffic, and SIGTERM/SIGINT let in-flight requests finish first. The
+built-in workers start a thread per request; gunicorn and waitress get
+HOTEL_WORKER_THREADS threads, sized for long-lived event streams.
 """
 
 import os
 import sys
-from multi_hotel_app import app, setup_database
+import time
+import signal
+import socket
+import argparse
+import threading
+import traceback
+import importlib.util
+import database
+from multi_hotel_app import app, setup_database, warm_up
+
+WORKERS = int(os.getenv('HOTEL_WORKERS', str(os.cpu_count() or 1)))
+# gunicorn/waitress threads per worker. Each open owner page holding the
+# /owner/events stream keeps one busy for up to STREAM_DURATION, so leave
+# plenty beyond the few needed for ordinary requests
+WORKER_THREADS = int(os.getenv('HOTEL_WORKER_THREADS', '64'))
+GRACEFUL_TIMEOUT = float(os.getenv('HOTEL_GRACEFUL_TIMEOUT', '30'))
+LISTEN_BACKLOG = 128
+RESPAWN_DELAY = 1.0  # seconds between restarts of a worker that keeps dying
 
-def main():
+
+def print_banner(port):
     print("🏨 Hotel Management System - Multi-Hotel Platform")
     print("=" * 50)
-    
+
     # Setup database
     print("Setting up database...")
     setup_database()
     print("✅ Database setup complete!")
-    
+
     # Check if .env file exists
     if not os.path.exists('.env'):
         print("\n⚠️  Warning: .env file not found!")
         print("Copy .env.example to .env and configure your settings.")
         print("The application will run with default settings for now.")
-    
+
     print("\n🚀 Starting the application...")
     print("📍 Admin Login: admin / admin123")
-    print("📍 Access the application at: http://localhost:5000")
+    print(f"📍 Access the application at: http://localhost:{port}")
     print("\n" + "=" * 50)
-    
+
+
+class PreforkServer:
+    """Serve the app from `workers` forked processes accepting on one shared socket.
+
+    The parent only supervises: it restarts workers that die and, on
+    SIGTERM/SIGINT, asks each to finish its in-flight requests, killing any
+    still busy after `graceful_timeout` seconds.
+    """
+
+    def __init__(self, host, port, workers=WORKERS, graceful_timeout=GRACEFUL_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.graceful_timeout = graceful_timeout
+        self.socket = None
+        self._children = {}  # pid -> start time
+        self._stopping = False
+
+    def bind(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind((self.host, self.port))
+        self.socket.listen(LISTEN_BACKLOG)
+        self.port = self.socket.getsockname()[1]
+
+    def serve_forever(self):
+        if self.socket is None:
+            self.bind()
+        # No database handle may cross the fork
+        database.close_all_pools()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        try:
+            while not self._stopping:
+                while len(self._children) < self.workers and not self._stopping:
+                    self._spawn()
+                self._reap()
+                time.sleep(0.2)
+        finally:
+            self._shutdown()
+            self.socket.close()
+
+    def _stop(self, signum, frame):
+        self._stopping = True
+
+    def _spawn(self):
+        pid = os.fork()
+        if pid == 0:
+            try:
+                self._run_worker()
+            except BaseException:
+                traceback.print_exc()
+                os._exit(1)
+            os._exit(0)
+        self._children[pid] = time.monotonic()
+
+    def _reap(self):
+        for pid, started in list(self._children.items()):
+            done, status = os.waitpid(pid, os.WNOHANG)
+            if done:
+                del self._children[pid]
+                if not self._stopping:
+                    print(f"⚠️  Worker {pid} exited ({status}), restarting")
+                    # Don't spin when a worker dies right after starting
+                    if time.monotonic() - started < RESPAWN_DELAY:
+                        time.sleep(RESPAWN_DELAY)
+
+    def _shutdown(self):
+        for pid in self._children:
+            self._signal(pid, signal.SIGTERM)
+        deadline = time.monotonic() + self.graceful_timeout
+        while self._children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+        for pid in self._children:
+            self._signal(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+        self._children.clear()
+
+    @staticmethod
+    def _signal(pid, signum):
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+
+    def _run_worker(self):
+        from werkzeug.serving import make_server
+        server = make_server(self.host, self.port, app, threaded=True, fd=self.socket.fileno())
+        # Let server_close() wait for in-flight requests
+        server.daemon_threads = False
+
+        def stop(signum, frame):
+            # shutdown() waits for serve_forever(), which runs in this thread
+            threading.Thread(target=server.shutdown, daemon=True).start()
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        warm_up()
+        # Closes the server (joining request threads) once shutdown() returns
+        server.serve_forever()
+
+
+def serve_gunicorn(host, port, workers):
+    from gunicorn.app.base import BaseApplication
+
+    class HotelApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set('bind', f'{host}:{port}')
+            self.cfg.set('workers', workers)
+            self.cfg.set('worker_class', 'gthread')
+            self.cfg.set('threads', WORKER_THREADS)
+            self.cfg.set('graceful_timeout', GRACEFUL_TIMEOUT)
+            # The app is imported and the database set up in the master only
+            self.cfg.set('preload_app', True)
+            self.cfg.set('post_fork', lambda server, worker: warm_up())
+
+        def load(self):
+            return app
+
+    database.close_all_pools()
+    HotelApplication().run()
+
+
+def serve_production(host, port, workers):
+    if importlib.util.find_spec('gunicorn') is not None:
+        print(f"🦄 Serving with gunicorn, {workers} workers")
+        serve_gunicorn(host, port, workers)
+        return
+
+    # Compile templates once so forked workers share them
+    warm_up()
+    if hasattr(os, 'fork'):
+        print(f"🍴 Serving with {workers} pre-forked workers")
+        PreforkServer(host, port, workers).serve_forever()
+        return
+
+    try:
+        from waitress import serve
+    except ImportError:
+        print("🧵 Serving with a threaded single process (install gunicorn or waitress for more)")
+        app.run(host=host, port=port, threaded=True, debug=False, use_reloader=False)
+        return
+    print(f"🍵 Serving with waitress, {WORKER_THREADS} threads")
+    serve(app, host=host, port=port, threads=WORKER_THREADS)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Start the hotel management application')
+    parser.add_argument('--production', action='store_true',
+                        help='multi-process server without debugger or reloader')
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f'worker processes in production mode (default {WORKERS})')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.getenv('PORT', '5000')))
+    args = parser.parse_args(argv)
+
+    print_banner(args.port)
+
     # Run the application
     try:
-        app.run(debug=True, host='0.0.0.0', port=5000)
+        if args.production:
+            serve_production(args.host, args.port, args.workers)
+            print("\n\n👋 Application stopped")
+        else:
+            app.run(debug=True, host=args.host, port=args.port)
     except KeyboardInterrupt:
         print("\n\n👋 Application stopped by user")
     except Exception as e:
@@ -38,4 +230,4 @@ def main():
         sys.exit(1)
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
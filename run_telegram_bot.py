@@ -2,8 +2,14 @@
 """
 Telegram Bot Runner for Hotel Management System
 Run this script separately to start the Telegram bot
+
+Usage:
+    python run_telegram_bot.py                         # long polling
+    python run_telegram_bot.py --webhook https://host  # webhook receiver (needs TELEGRAM_WEBHOOK_SECRET)
 """
 
+import os
+import sys
 import simple_telegram_bot as telegram_bot
 
 if __name__ == '__main__':
@@ -12,8 +18,12 @@ if __name__ == '__main__':
     print("Press Ctrl+C to stop the bot")
     
     try:
+        if len(sys.argv) > 2 and sys.argv[1] == '--webhook':
+            import telegram_webhook
+            port = int(os.getenv('TELEGRAM_WEBHOOK_PORT', '8443'))
+            sys.exit(telegram_webhook.run_webhook_server(sys.argv[2], port=port))
         telegram_bot.main()
     except KeyboardInterrupt:
         print("\nBot stopped by user")
     except Exception as e:
-        print(f"Error running bot: {e}")
\ No newline at end of file
+        print(f"Error running bot: {e}")
@@ -6,9 +6,10 @@ Uses direct HTTP requests to avoid library compatibility issues
 
 import os
 import json
-import sqlite3
+import database
+import telegram_clients
+from telegram_updates import UpdateDispatcher, UPDATE_WORKERS
 import logging
-import requests
 import time
 from dotenv import load_dotenv
 
@@ -26,32 +27,20 @@ DB_NAME = 'multi_hotel.db'
 
 # Get bot token from environment variable
 BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '8065221659:AAE_nWRSZWtKU09tRacOPvU3xNd80FgXGXE')
-BASE_URL = f'https://api.telegram.org/bot{BOT_TOKEN}'
 
-def send_message(chat_id, text):
+def send_message(chat_id, text, bot_token=None):
     """Send a message to a Telegram chat."""
-    url = f'{BASE_URL}/sendMessage'
-    data = {
-        'chat_id': chat_id,
-        'text': text,
-        'parse_mode': 'HTML'
-    }
-    try:
-        response = requests.post(url, data=data, timeout=10)
-        return response.json()
-    except Exception as e:
-        logging.error(f"Error sending message: {e}")
-        return None
+    # Reuses the bot's keep-alive session instead of a new TCP+TLS handshake per call
+    return telegram_clients.registry.send_message(bot_token or BOT_TOKEN, chat_id, text, parse_mode='HTML')
 
 def get_updates(offset=None):
     """Get updates from Telegram."""
-    url = f'{BASE_URL}/getUpdates'
     params = {'timeout': 30}
     if offset:
         params['offset'] = offset
     
     try:
-        response = requests.get(url, params=params, timeout=35)
+        response = telegram_clients.registry.get(BOT_TOKEN).get('getUpdates', params=params, timeout=35)
         return response.json()
     except Exception as e:
         logging.error(f"Error getting updates: {e}")
@@ -89,7 +78,7 @@ def handle_help_command(chat_id):
 
 def handle_status_command(chat_id):
     """Handle /status command."""
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     cursor.execute('SELECT id, name FROM hotels WHERE telegram_chat_id = ?', (str(chat_id),))
@@ -157,18 +146,12 @@ def process_update(update):
 
 def send_notification(hotel_id, message):
     """Send notification to a specific hotel's Telegram chat."""
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT telegram_chat_id, telegram_bot_token FROM hotels WHERE id = ? AND telegram_chat_id IS NOT NULL', (hotel_id,))
-    result = cursor.fetchone()
-    conn.close()
+    result = telegram_clients.get_hotel_target(DB_NAME, hotel_id)
     
-    if result and result[0]:
+    if result:
         chat_id = result[0]
-        # For now, use the global bot token (can be enhanced later for per-hotel tokens)
         try:
-            response = send_message(chat_id, message)
+            response = send_message(chat_id, message, bot_token=result[1])
             if response and response.get('ok'):
                 logging.info(f"Notification sent to hotel {hotel_id}, chat {chat_id}")
                 return True
@@ -182,13 +165,28 @@ def send_notification(hotel_id, message):
         logging.warning(f"No chat ID configured for hotel {hotel_id}")
         return False
 
-def main():
+def handle_updates(updates, dispatcher, offset=None):
+    """Process a getUpdates batch and return the next offset.
+
+    Chats are handled concurrently, but the offset only moves past the batch
+    once every update in it has been processed, so nothing is confirmed to
+    Telegram before it is handled.
+    """
+    for update in updates:
+        dispatcher.submit(update)
+    dispatcher.wait_idle()
+    if updates:
+        offset = max(update['update_id'] for update in updates) + 1
+    return offset
+
+def main(workers=UPDATE_WORKERS):
     """Start the bot."""
     print(f"Starting Simple Telegram Bot...")
     print(f"Bot Token: {BOT_TOKEN[:10]}...")
     print("Bot is running. Press Ctrl+C to stop.")
     
     offset = None
+    dispatcher = UpdateDispatcher(process_update, max_workers=workers)
     
     try:
         while True:
@@ -199,10 +197,7 @@ def main():
                 continue
             
             updates = updates_response.get('result', [])
-            
-            for update in updates:
-                process_update(update)
-                offset = update['update_id'] + 1
+            offset = handle_updates(updates, dispatcher, offset)
             
             if not updates:
                 time.sleep(1)
@@ -212,6 +207,8 @@ def main():
     except Exception as e:
         logging.error(f"Error running bot: {e}")
         print(f"Error running bot: {e}")
+    finally:
+        dispatcher.shutdown()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -1,5 +1,75 @@
 // Main JavaScript for Hotel Management System
 
+// Live booking changes for the owner's hotel over Server-Sent Events; pages
+// subscribe with HotelEvents.on(). While the stream is down (or EventSource
+// is unsupported) the same events are replayed from /api/changes polling,
+// starting from the change log cursor the page was rendered at.
+window.HotelEvents = (function() {
+    const streamUrl = document.body.dataset.hotelEvents;
+    const changesUrl = document.body.dataset.hotelChanges;
+    const SYNC_INTERVAL = 30000;
+    const listeners = {};
+    let cursor = document.body.dataset.hotelChangesCursor || null;
+    let syncTimer = null;
+
+    function dispatch(kind, data) {
+        (listeners[kind] || []).forEach(listener => listener(data));
+    }
+
+    // Fetch only what changed since the last cursor
+    function syncChanges() {
+        fetch(cursor === null ? changesUrl : `${changesUrl}?since=${cursor}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.reset && cursor !== null) {
+                    dispatch('refresh', {reason: 'resync'});
+                }
+                cursor = data.cursor;
+                data.bookings.upserted.forEach(booking => dispatch('booking', {action: 'synced', booking: booking}));
+                data.bookings.deleted.forEach(id => dispatch('booking', {action: 'deleted', booking_id: id}));
+                if (data.has_more) {
+                    syncChanges();
+                }
+            })
+            .catch(error => console.error('Error syncing changes:', error));
+    }
+
+    function poll(active) {
+        if (active && !syncTimer) {
+            syncTimer = setInterval(syncChanges, SYNC_INTERVAL);
+            if (cursor === null) {
+                syncChanges();
+            }
+        } else if (!active && syncTimer) {
+            clearInterval(syncTimer);
+            syncTimer = null;
+        }
+    }
+
+    if (streamUrl && window.EventSource) {
+        const source = new EventSource(streamUrl);
+        source.addEventListener('open', function() {
+            poll(false);
+        });
+        source.addEventListener('error', function() {
+            // EventSource reconnects by itself and is replayed what it missed;
+            // poll until it does
+            poll(true);
+        });
+        ['booking', 'refresh'].forEach(function(kind) {
+            source.addEventListener(kind, event => dispatch(kind, JSON.parse(event.data)));
+        });
+    } else if (changesUrl) {
+        poll(true);
+    }
+
+    return {
+        on: function(kind, listener) {
+            (listeners[kind] = listeners[kind] || []).push(listener);
+        }
+    };
+})();
+
 document.addEventListener('DOMContentLoaded', function() {
     // Initialize tooltips
     var tooltipTriggerList = [].slice.call(document.querySelectorAll('[data-bs-toggle="tooltip"]'));
@@ -79,14 +149,23 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     });
 
-    // Auto-refresh for dashboard (every 5 minutes)
+    // Refresh the dashboard when the hotel's bookings change
     if (document.body.classList.contains('dashboard-page')) {
-        setInterval(function() {
+        let reloadTimer = null;
+        function reloadDashboard() {
             // Only refresh if user is active (not idle)
             if (document.hasFocus()) {
                 location.reload();
             }
-        }, 300000); // 5 minutes
+        }
+        HotelEvents.on('booking', function() {
+            // One reload for a burst of changes
+            reloadTimer = reloadTimer || setTimeout(function() {
+                reloadTimer = null;
+                reloadDashboard();
+            }, 10000);
+        });
+        HotelEvents.on('refresh', reloadDashboard);
     }
 
     // Real-time clock
@@ -1,6 +1,7 @@
 import os
 import logging
-import sqlite3
+import database
+import telegram_clients
 import datetime
 from dotenv import load_dotenv
 from telegram import Update
@@ -43,7 +44,7 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Check if the chat ID is registered with any hotel."""
     chat_id = str(update.effective_chat.id)
     
-    conn = sqlite3.connect(DB_NAME)
+    conn = database.connect(DB_NAME)
     cursor = conn.cursor()
     
     cursor.execute('SELECT id, name FROM hotels WHERE telegram_chat_id = ?', (chat_id,))
@@ -64,24 +65,19 @@ async def echo(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 def send_notification(hotel_id, message):
     """Send notification to a specific hotel's Telegram chat."""
-    import asyncio
+    result = telegram_clients.get_hotel_target(DB_NAME, hotel_id)
     
-    conn = sqlite3.connect(DB_NAME)
-    cursor = conn.cursor()
-    
-    cursor.execute('SELECT telegram_chat_id, telegram_bot_token FROM hotels WHERE id = ? AND telegram_chat_id IS NOT NULL', (hotel_id,))
-    result = cursor.fetchone()
-    conn.close()
-    
-    if result and result[0]:
+    if result:
         chat_id = result[0]
         bot_token = result[1] if result[1] else BOT_TOKEN
         try:
-            from telegram.ext import Application
-            application = Application.builder().token(bot_token).build()
-            asyncio.run(application.bot.send_message(chat_id=chat_id, text=message))
-            logging.info(f"Notification sent to hotel {hotel_id}, chat {chat_id}")
-            return True
+            # Warm per-token client: no Application/event loop built per message
+            response = telegram_clients.registry.send_message(bot_token, chat_id, message)
+            if response and response.get('ok'):
+                logging.info(f"Notification sent to hotel {hotel_id}, chat {chat_id}")
+                return True
+            logging.error(f"Failed to send Telegram notification to hotel {hotel_id}: {response}")
+            return False
         except Exception as e:
             logging.error(f"Failed to send Telegram notification to hotel {hotel_id}: {e}")
             return False
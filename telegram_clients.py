@@ -0,0 +1,159 @@
+"""
+Registry of warm Telegram Bot API clients, one keep-alive HTTP session per bot token
+"""
+import os
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional, Callable, Tuple
+import requests
+from requests.adapters import HTTPAdapter
+import database
+from hotel_metrics import hotel_version
+
+TELEGRAM_API_URL = os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org')
+
+CLIENT_IDLE_TIMEOUT = 10 * 60.0  # close a bot's connections after this long unused
+POOL_MAXSIZE = 10                # concurrent keep-alive connections per bot
+HOTEL_TARGET_TTL = 60.0          # upper bound on reusing a hotel's chat ID / bot token lookup
+
+
+class TelegramClient:
+    """Bot API client bound to one bot token, reusing TCP+TLS connections"""
+
+    def __init__(self, bot_token: str, api_url: str = TELEGRAM_API_URL, timeout: float = 10):
+        self.base_url = f"{api_url.rstrip('/')}/bot{bot_token}"
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.last_used = time.monotonic()
+
+    def post(self, method: str, data: Optional[Dict[str, Any]] = None,
+             timeout: Optional[float] = None) -> requests.Response:
+        """Call a Bot API method and return the raw HTTP response"""
+        return self.session.post(f'{self.base_url}/{method}', data=data,
+                                 timeout=timeout or self.timeout)
+
+    def get(self, method: str, params: Optional[Dict[str, Any]] = None,
+            timeout: Optional[float] = None) -> requests.Response:
+        return self.session.get(f'{self.base_url}/{method}', params=params,
+                                timeout=timeout or self.timeout)
+
+    def send_message(self, chat_id, text: str, **extra) -> Optional[Dict]:
+        """sendMessage; returns the API's JSON reply, or None on a network error"""
+        data = {'chat_id': chat_id, 'text': text, **extra}
+        try:
+            return self.post('sendMessage', data).json()
+        except (requests.RequestException, ValueError) as e:
+            logging.error(f"Error sending message: {e}")
+            return None
+
+    def close(self):
+        self.session.close()
+
+
+class TelegramClientRegistry:
+    """Hands out one TelegramClient per bot token and closes idle ones"""
+
+    def __init__(self, api_url: str = TELEGRAM_API_URL, idle_timeout: float = CLIENT_IDLE_TIMEOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.api_url = api_url
+        self.idle_timeout = idle_timeout
+        self.clock = clock
+        self._clients: Dict[str, TelegramClient] = {}
+        self._lock = threading.Lock()
+        self._created = 0
+        self._reused = 0
+        self._evicted = 0
+
+    def get(self, bot_token: str) -> TelegramClient:
+        """Get the warm client for a bot token, creating it on first use"""
+        now = self.clock()
+        with self._lock:
+            self._evict_idle(now)
+            client = self._clients.get(bot_token)
+            if client is None:
+                client = self._clients[bot_token] = TelegramClient(bot_token, self.api_url)
+                self._created += 1
+            else:
+                self._reused += 1
+            client.last_used = now
+            return client
+
+    def send_message(self, bot_token: str, chat_id, text: str, **extra) -> Optional[Dict]:
+        return self.get(bot_token).send_message(chat_id, text, **extra)
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_idle(self.clock())
+
+    def _evict_idle(self, now: float):
+        for token, client in list(self._clients.items()):
+            if now - client.last_used > self.idle_timeout:
+                del self._clients[token]
+                client.close()
+                self._evicted += 1
+
+    def close_all(self):
+        with self._lock:
+            clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            client.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'clients': len(self._clients),
+                'created': self._created,
+                'reused': self._reused,
+                'evicted': self._evicted,
+            }
+
+
+# Process-wide registry shared by the bots and the outbox worker
+registry = TelegramClientRegistry()
+
+# (db, hotel id) -> (expires, hotel data version, target)
+_hotel_targets: Dict[Tuple[str, int], Tuple[float, int, Optional[Tuple]]] = {}
+_hotel_targets_lock = threading.Lock()
+
+
+def get_hotel_target(db_name: str, hotel_id: int) -> Optional[Tuple[str, Optional[str]]]:
+    """(telegram_chat_id, telegram_bot_token) for a hotel, or None without a chat ID.
+
+    A lookup is reused while the hotel's data version is unchanged, so edits
+    and deletions made by any process (e.g. the web app while the outbox
+    worker runs) take effect on the next notification.
+    """
+    key = (db_name, hotel_id)
+    now = time.monotonic()
+    conn = database.connect(db_name)
+    try:
+        version = hotel_version(conn, hotel_id)
+        with _hotel_targets_lock:
+            cached = _hotel_targets.get(key)
+        if cached and cached[0] > now and cached[1] == version:
+            return cached[2]
+
+        cursor = conn.cursor()
+        cursor.execute('SELECT telegram_chat_id, telegram_bot_token FROM hotels WHERE id = ?', (hotel_id,))
+        result = cursor.fetchone()
+    finally:
+        conn.close()
+
+    target = (result[0], result[1] or None) if result and result[0] else None
+    with _hotel_targets_lock:
+        _hotel_targets[key] = (now + HOTEL_TARGET_TTL, version, target)
+    return target
+
+
+def invalidate_hotel_target(hotel_id: Optional[int] = None):
+    """Forget cached Telegram settings for one hotel (or all) after an edit"""
+    with _hotel_targets_lock:
+        if hotel_id is None:
+            _hotel_targets.clear()
+        else:
+            for key in [key for key in _hotel_targets if key[1] == hotel_id]:
+                del _hotel_targets[key]
@@ -0,0 +1,227 @@
+"""
+Durable inbox for Telegram webhook updates.
+
+The webhook stores each update in telegram_inbox before acknowledging it, so
+an update Telegram considers delivered survives a crash or restart. Drainer
+threads in any process claim stored updates with a lease: only the oldest
+unhandled update of a chat can be claimed, so a chat's updates are handled
+one at a time in update_id order even when several web workers share the
+inbox, and the update_id primary key drops redeliveries. An update whose
+worker dies mid-handling is claimed again once its lease runs out.
+"""
+import os
+import json
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List
+import database
+from telegram_updates import chat_key, UPDATE_WORKERS
+
+DB_NAME = 'multi_hotel.db'
+
+CLAIM_LEASE = 120.0     # a 'handling' update is retried if its worker dies mid-handling
+POLL_INTERVAL = 1.0     # how often a drainer looks for updates stored by other processes
+RETENTION = 24 * 3600.0  # handled updates are remembered this long to drop redeliveries
+PRUNE_INTERVAL = 3600.0
+
+TELEGRAM_INBOX_TABLE = '''
+CREATE TABLE IF NOT EXISTS telegram_inbox (
+    update_id INTEGER PRIMARY KEY,
+    chat_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    lease_until REAL,
+    received_at REAL NOT NULL,
+    handled_at REAL
+)
+'''
+
+
+def prune(conn, older_than: float = RETENTION, now: float = None) -> int:
+    """Forget handled updates older than `older_than` seconds"""
+    cursor = conn.execute("DELETE FROM telegram_inbox WHERE status = 'done' AND handled_at < ?",
+                          ((now or time.time()) - older_than,))
+    return cursor.rowcount
+
+
+class UpdateInbox:
+    def __init__(self, handler: Callable[[Dict[str, Any]], Any], db_name: str = DB_NAME,
+                 max_workers: int = UPDATE_WORKERS, clock: Callable[[], float] = time.time):
+        self.handler = handler
+        self.db_name = db_name
+        self.max_workers = max_workers
+        self.clock = clock
+        self._wake = threading.Condition()
+        self._dirty = True
+        self._in_flight = 0
+        self._executor = None
+        self._drainer = None
+        self._pid = None
+        self._last_prune = 0.0
+        self._stored = 0
+        self._duplicates = 0
+        self._processed = 0
+        self._failed = 0
+
+    def store(self, update: Dict[str, Any]) -> bool:
+        """Durably record an update; False if it was already stored (a redelivery)"""
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.execute('''
+                INSERT OR IGNORE INTO telegram_inbox (update_id, chat_key, payload, received_at)
+                VALUES (?, ?, ?, ?)
+            ''', (update['update_id'], str(chat_key(update)), json.dumps(update), self.clock()))
+            stored = cursor.rowcount == 1
+            conn.commit()
+        finally:
+            conn.close()
+        with self._wake:
+            if stored:
+                self._stored += 1
+                self._dirty = True
+                self._wake.notify_all()
+            else:
+                self._duplicates += 1
+        return stored
+
+    def claim(self, limit: int) -> List[Dict[str, Any]]:
+        """Lease the oldest unhandled update of up to `limit` chats no worker is handling"""
+        now = self.clock()
+        conn = database.connect(self.db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            cursor.execute('''
+                UPDATE telegram_inbox
+                SET status = 'handling', lease_until = ?
+                WHERE update_id IN (
+                    SELECT t.update_id FROM telegram_inbox t
+                    WHERE t.status != 'done' AND (t.status = 'pending' OR t.lease_until <= ?)
+                    AND t.update_id = (
+                        SELECT MIN(update_id) FROM telegram_inbox
+                        WHERE chat_key = t.chat_key AND status != 'done'
+                    )
+                    ORDER BY t.update_id
+                    LIMIT ?
+                )
+                RETURNING update_id, payload
+            ''', (now + CLAIM_LEASE, now, limit))
+            batch = sorted(cursor.fetchall())
+            conn.commit()
+        finally:
+            conn.close()
+        return [json.loads(payload) for _, payload in batch]
+
+    def complete(self, update_id: int):
+        """Mark an update handled, letting its chat's next update be claimed"""
+        conn = database.connect(self.db_name)
+        try:
+            conn.execute('''
+                UPDATE telegram_inbox
+                SET status = 'done', handled_at = ?, lease_until = NULL
+                WHERE update_id = ?
+            ''', (self.clock(), update_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def start(self):
+        """Drain the inbox in background threads of this process"""
+        with self._wake:
+            # Threads don't survive a fork; a forked worker starts its own
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='telegram-update')
+                self._drainer = None
+                self._in_flight = 0
+            if self._drainer is None or not self._drainer.is_alive():
+                self._drainer = threading.Thread(target=self._drain_forever, name='telegram-inbox',
+                                                 daemon=True)
+                self._drainer.start()
+
+    def _drain_forever(self):
+        while True:
+            with self._wake:
+                self._wake.wait_for(lambda: self._dirty and self._in_flight < self.max_workers,
+                                    timeout=POLL_INTERVAL)
+                self._dirty = False
+                free = self.max_workers - self._in_flight
+            if free <= 0:
+                continue
+            try:
+                batch = self.claim(free)
+                if self.clock() - self._last_prune > PRUNE_INTERVAL:
+                    self._last_prune = self.clock()
+                    conn = database.connect(self.db_name)
+                    try:
+                        prune(conn, now=self._last_prune)
+                        conn.commit()
+                    finally:
+                        conn.close()
+            except Exception as e:
+                logging.error(f"Error claiming Telegram updates: {e}")
+                time.sleep(POLL_INTERVAL)
+                continue
+            with self._wake:
+                self._in_flight += len(batch)
+            for update in batch:
+                self._executor.submit(self._handle, update)
+
+    def _handle(self, update: Dict[str, Any]):
+        failed = False
+        try:
+            self.handler(update)
+        except Exception as e:
+            failed = True
+            logging.error(f"Error processing update {update.get('update_id')}: {e}")
+        # Like the polling loop's offset, a failed update is not retried;
+        # one left unmarked here is retried when its lease runs out
+        try:
+            self.complete(update['update_id'])
+        except Exception as e:
+            logging.error(f"Error completing update {update.get('update_id')}: {e}")
+        with self._wake:
+            self._in_flight -= 1
+            self._processed += 1
+            self._failed += failed
+            self._dirty = True
+            self._wake.notify_all()
+
+    def pending(self) -> int:
+        """Stored updates not yet handled, across all processes"""
+        conn = database.connect(self.db_name)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM telegram_inbox WHERE status != 'done'").fetchone()[0]
+        finally:
+            conn.close()
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until every stored update has been handled"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.pending():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            with self._wake:
+                self._dirty = True
+                self._wake.notify_all()
+                self._wake.wait(0.05)
+        return True
+
+    def shutdown(self, wait: bool = True):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, int]:
+        pending = self.pending()
+        with self._wake:
+            return {
+                'pending': pending,
+                'in_flight': self._in_flight,
+                'stored': self._stored,
+                'processed': self._processed,
+                'failed': self._failed,
+                'duplicates': self._duplicates,
+            }
@@ -0,0 +1,121 @@
+"""
+Concurrent processing of incoming Telegram updates.
+
+Updates from different chats are handled in parallel on a bounded thread pool;
+updates from the same chat are handled one at a time, in the order received,
+so a chat never sees its replies reordered.
+"""
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any
+
+UPDATE_WORKERS = 8      # updates handled at once
+MAX_PENDING = 256       # queued + running updates before submit() pushes back
+DEDUPE_WINDOW = 1024    # recent update IDs remembered to drop redeliveries
+
+
+def chat_key(update: Dict[str, Any]):
+    """The chat an update belongs to; updates without one are unordered"""
+    for field in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        if field in update:
+            return update[field].get('chat', {}).get('id')
+    if 'callback_query' in update:
+        return update['callback_query'].get('message', {}).get('chat', {}).get('id')
+    return ('update', update.get('update_id'))
+
+
+class UpdateDispatcher:
+    def __init__(self, handler: Callable[[Dict[str, Any]], Any], max_workers: int = UPDATE_WORKERS,
+                 max_pending: int = MAX_PENDING, dedupe_window: int = DEDUPE_WINDOW):
+        self.handler = handler
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='telegram-update')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._chats = {}  # chat -> deque of its waiting updates, present while a worker owns the chat
+        self._pending = 0
+        self._seen = set()
+        self._seen_order = deque()
+        self._dedupe_window = dedupe_window
+        self._processed = 0
+        self._failed = 0
+        self._duplicates = 0
+        self._rejected = 0
+
+    def submit(self, update: Dict[str, Any], block: bool = True, timeout: float = None) -> bool:
+        """Queue an update. Returns False if the backlog is full and block is False
+        (or timeout expires); an update ID seen recently is accepted and dropped."""
+        if block:
+            acquired = self._slots.acquire(timeout=timeout)
+        else:
+            acquired = self._slots.acquire(blocking=False)
+        if not acquired:
+            with self._lock:
+                self._rejected += 1
+            return False
+
+        key = chat_key(update)
+        with self._lock:
+            update_id = update.get('update_id')
+            if update_id is not None:
+                if update_id in self._seen:
+                    self._duplicates += 1
+                    self._slots.release()
+                    return True
+                self._seen.add(update_id)
+                self._seen_order.append(update_id)
+                if len(self._seen_order) > self._dedupe_window:
+                    self._seen.discard(self._seen_order.popleft())
+
+            self._pending += 1
+            queue = self._chats.get(key)
+            if queue is not None:
+                queue.append(update)
+                return True
+            self._chats[key] = deque([update])
+        self._executor.submit(self._run_chat, key)
+        return True
+
+    def _run_chat(self, key):
+        """Drain one chat's queue in order, then give the worker back"""
+        while True:
+            with self._lock:
+                update = self._chats[key].popleft()
+            failed = False
+            try:
+                self.handler(update)
+            except Exception as e:
+                failed = True
+                logging.error(f"Error processing update {update.get('update_id')}: {e}")
+            finally:
+                self._slots.release()
+
+            with self._lock:
+                self._pending -= 1
+                self._processed += 1
+                self._failed += failed
+                if not self._pending:
+                    self._idle.notify_all()
+                if not self._chats[key]:
+                    del self._chats[key]
+                    return
+
+    def wait_idle(self, timeout: float = None) -> bool:
+        """Block until every submitted update has been handled"""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'processed': self._processed,
+                'failed': self._failed,
+                'duplicates': self._duplicates,
+                'rejected': self._rejected,
+            }
@@ -0,0 +1,106 @@
+"""
+Webhook receiver for the Telegram bot.
+
+Telegram POSTs each update to /telegram/webhook; the blueprint checks the
+secret token header, stores the update in the durable telegram_inbox and only
+then acknowledges it, so a crash or restart never loses an update Telegram
+considers delivered. The inbox's drainer threads handle chats concurrently
+and each chat in update_id order, across every process serving the webhook
+(the webhook is registered with max_connections=1 so updates arrive in
+order). Mount the blueprint in the web app, or run a standalone receiver with
+`python run_telegram_bot.py --webhook https://your.domain`.
+"""
+import os
+import hmac
+import json
+import atexit
+import logging
+import threading
+from flask import Blueprint, Flask, request, jsonify, abort, current_app
+import telegram_clients
+import simple_telegram_bot
+from telegram_inbox import UpdateInbox
+from telegram_updates import UPDATE_WORKERS
+
+WEBHOOK_PATH = '/telegram/webhook'
+WEBHOOK_SECRET = os.getenv('TELEGRAM_WEBHOOK_SECRET')
+WEBHOOK_WORKERS = int(os.getenv('TELEGRAM_WEBHOOK_WORKERS', str(UPDATE_WORKERS)))
+
+telegram_webhook = Blueprint('telegram_webhook', __name__)
+
+_inbox = None
+_inbox_lock = threading.Lock()
+
+
+def get_inbox() -> UpdateInbox:
+    """The process-wide inbox; its drainer starts on the first update"""
+    global _inbox
+    with _inbox_lock:
+        if _inbox is None:
+            _inbox = UpdateInbox(simple_telegram_bot.process_update, db_name=simple_telegram_bot.DB_NAME,
+                                 max_workers=WEBHOOK_WORKERS)
+            # Finish updates already being handled before exiting; the rest stay stored
+            atexit.register(_inbox.shutdown)
+        return _inbox
+
+
+@telegram_webhook.route(WEBHOOK_PATH, methods=['POST'])
+def receive_update():
+    secret = current_app.config.get('TELEGRAM_WEBHOOK_SECRET') or WEBHOOK_SECRET
+    if not secret:
+        abort(404)
+    if not hmac.compare_digest(request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), secret):
+        abort(403)
+
+    update = request.get_json(silent=True)
+    if not isinstance(update, dict) or 'update_id' not in update:
+        return jsonify({'ok': False, 'error': 'Invalid update'}), 400
+
+    # Acknowledge only once stored; a storage error answers 500 and Telegram redelivers
+    inbox = get_inbox()
+    inbox.store(update)
+    inbox.start()
+    return jsonify({'ok': True})
+
+
+def set_webhook(public_url: str, secret: str, bot_token: str = None):
+    """Point the bot's updates at public_url + WEBHOOK_PATH"""
+    response = telegram_clients.registry.get(bot_token or simple_telegram_bot.BOT_TOKEN).post('setWebhook', {
+        'url': public_url.rstrip('/') + WEBHOOK_PATH,
+        'secret_token': secret,
+        'max_connections': 1,
+        'allowed_updates': json.dumps(['message']),
+    })
+    return response.json()
+
+
+def delete_webhook(bot_token: str = None):
+    """Switch the bot back to getUpdates long polling"""
+    response = telegram_clients.registry.get(bot_token or simple_telegram_bot.BOT_TOKEN).post('deleteWebhook')
+    return response.json()
+
+
+def create_app(secret: str) -> Flask:
+    """A minimal app serving only the webhook"""
+    app = Flask(__name__)
+    app.config['TELEGRAM_WEBHOOK_SECRET'] = secret
+    app.register_blueprint(telegram_webhook)
+    return app
+
+
+def run_webhook_server(public_url: str, host: str = '0.0.0.0', port: int = 8443, secret: str = None):
+    """Register the webhook with Telegram and serve it until interrupted"""
+    secret = secret or WEBHOOK_SECRET
+    if not secret:
+        print("❌ Set TELEGRAM_WEBHOOK_SECRET to run in webhook mode")
+        return 1
+    result = set_webhook(public_url, secret)
+    if not result.get('ok'):
+        print(f"❌ setWebhook failed: {result.get('description')}")
+        return 1
+    print(f"✅ Webhook registered at {public_url.rstrip('/')}{WEBHOOK_PATH}")
+    # Handle updates stored but left unhandled by a previous run
+    get_inbox().start()
+    logging.info(f"Serving Telegram webhook on {host}:{port} with {WEBHOOK_WORKERS} workers")
+    create_app(secret).run(host=host, port=port, threaded=True)
+    return 0
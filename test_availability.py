@@ -0,0 +1,49 @@
+"""
+Tests for the set-based room availability engine
+"""
+from availability import AvailabilityEngine
+from conftest import add_room, add_booking
+
+
+def test_available_rooms_excludes_overlapping_bookings(hotel_db):
+    engine = AvailabilityEngine(hotel_db)
+    free = add_room(hotel_db, '101')
+    busy = add_room(hotel_db, '102')
+    back_to_back = add_room(hotel_db, '103')
+    cancelled = add_room(hotel_db, '104')
+
+    add_booking(hotel_db, busy, '2030-05-02', '2030-05-04')
+    add_booking(hotel_db, back_to_back, '2030-05-05', '2030-05-07')
+    add_booking(hotel_db, cancelled, '2030-05-01', '2030-05-10', booking_status='cancelled')
+
+    rooms = engine.available_rooms(1, '2030-05-03', '2030-05-05')
+    assert sorted(room['id'] for room in rooms) == [free, back_to_back, cancelled]
+
+
+def test_is_room_available_with_exclusion(hotel_db):
+    engine = AvailabilityEngine(hotel_db)
+    room_id = add_room(hotel_db, '201')
+    booking_id = add_booking(hotel_db, room_id, '2030-06-01', '2030-06-05')
+
+    assert not engine.is_room_available(room_id, '2030-06-04', '2030-06-06')
+    assert engine.is_room_available(room_id, '2030-06-05', '2030-06-06')
+    assert engine.is_room_available(room_id, '2030-06-04', '2030-06-06', exclude_booking_id=booking_id)
+
+
+def test_available_rooms_endpoint(hotel_db):
+    import multi_hotel_app
+    add_room(hotel_db, '301')
+    taken = add_room(hotel_db, '302')
+    add_booking(hotel_db, taken, '2030-07-01', '2030-07-03')
+
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+
+    response = client.post('/api/available-rooms',
+                           json={'check_in_date': '2030-07-02', 'check_out_date': '2030-07-04'})
+    assert [room['room_number'] for room in response.json['available_rooms']] == ['301']
+
+    response = client.post('/api/check-room-availability',
+                           json={'room_id': taken, 'check_in_date': '2030-07-02', 'check_out_date': '2030-07-04'})
+    assert response.json == {'available': False}
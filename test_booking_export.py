@@ -0,0 +1,116 @@
+"""
+Tests for streaming booking and revenue exports
+"""
+import csv
+import gzip
+import io
+import json
+import database
+import booking_export
+from conftest import add_room, add_booking
+
+
+def client_for(user_type, hotel_id=1):
+    import multi_hotel_app
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type=user_type, hotel_id=hotel_id)
+    return client
+
+
+def read_csv(data):
+    return list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+
+
+def add_second_hotel(db_path):
+    conn = database.connect(db_path)
+    conn.execute('''
+        INSERT INTO hotels (id, name, address, owner_name, owner_email, created_at)
+        VALUES (2, 'Other Hotel', '2 Test Street', 'Owner', 'other@test.com', '2024-01-01 00:00:00')
+    ''')
+    conn.commit()
+    conn.close()
+    return add_booking(db_path, add_room(db_path, '201', hotel_id=2), '2024-05-01', '2024-05-02', hotel_id=2,
+                       created_at='2024-04-01 09:00:00')
+
+
+def test_owner_csv_export_joins_rooms_and_check_in_out(hotel_db):
+    room_id = add_room(hotel_db, '101', room_type='Deluxe')
+    booking_id = add_booking(hotel_db, room_id, '2024-05-01', '2024-05-03', guest_name='Asha, "Ash" Rao',
+                             payment_status='paid', total_amount=250.0, created_at='2024-04-01 10:00:00')
+    add_second_hotel(hotel_db)
+    conn = database.connect(hotel_db)
+    conn.execute("INSERT INTO check_in_out (booking_id, check_in_time) VALUES (?, '2024-05-01 14:00:00')",
+                 (booking_id,))
+    conn.commit()
+    conn.close()
+
+    response = client_for('owner').get('/owner/export/bookings.csv')
+    assert response.status_code == 200 and response.is_streamed
+    assert response.headers['Content-Disposition'] == 'attachment; filename=bookings-hotel-1.csv'
+    rows = read_csv(response.get_data())
+    assert len(rows) == 1
+    assert rows[0]['guest_name'] == 'Asha, "Ash" Rao'
+    assert rows[0]['room_type'] == 'Deluxe'
+    assert rows[0]['checked_in_at'] == '2024-05-01 14:00:00'
+    assert rows[0]['total_amount'] == '250.0'
+
+
+def test_date_range_filters(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    add_booking(hotel_db, room_id, '2024-05-01', '2024-05-02', guest_name='April', created_at='2024-04-30 23:59:59')
+    add_booking(hotel_db, room_id, '2024-06-01', '2024-06-02', guest_name='May', created_at='2024-05-01 00:00:00')
+    client = client_for('owner')
+
+    rows = read_csv(client.get('/owner/export/bookings.csv?from=2024-04-01&to=2024-04-30').get_data())
+    assert [row['guest_name'] for row in rows] == ['April']
+    rows = read_csv(client.get('/owner/export/bookings.csv?by=check_in&from=2024-06-01').get_data())
+    assert [row['guest_name'] for row in rows] == ['May']
+
+    assert client.get('/owner/export/bookings.csv?from=01/04/2024').status_code == 400
+    assert client.get('/owner/export/bookings.csv?by=checkout').status_code == 400
+    assert client.get('/owner/export/bookings.xlsx').status_code == 404
+
+
+def test_ndjson_and_gzip(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    for n in range(3):
+        add_booking(hotel_db, room_id, '2024-05-01', '2024-05-02', guest_name=f'Guest {n}', payment_status='paid')
+    client = client_for('owner')
+
+    plain = client.get('/owner/export/bookings.ndjson').get_data()
+    records = [json.loads(line) for line in plain.decode().splitlines()]
+    assert [r['guest_name'] for r in records] == ['Guest 0', 'Guest 1', 'Guest 2']
+
+    compressed = client.get('/owner/export/bookings.ndjson?gzip=1')
+    assert compressed.mimetype == 'application/gzip'
+    assert gzip.decompress(compressed.get_data()) == plain
+
+    revenue = read_csv(client.get('/owner/export/revenue.csv?to=2024-01-31').get_data())
+    assert [(r['date'], r['bookings'], r['paid_revenue']) for r in revenue] == [('2024-01-01', '3', '300.0')]
+
+
+def test_admin_exports_all_hotels_or_one(hotel_db):
+    add_booking(hotel_db, add_room(hotel_db, '101'), '2024-05-01', '2024-05-02')
+    add_second_hotel(hotel_db)
+    client = client_for('admin')
+
+    rows = read_csv(client.get('/admin/export/bookings.csv').get_data())
+    assert [row['hotel_name'] for row in rows] == ['Test Hotel', 'Other Hotel']
+    rows = read_csv(client.get('/admin/export/bookings.csv?hotel_id=2').get_data())
+    assert [row['hotel_id'] for row in rows] == ['2']
+    assert client_for('owner').get('/admin/export/bookings.csv').status_code == 302
+
+
+def test_export_is_produced_incrementally(hotel_db, monkeypatch):
+    monkeypatch.setattr(booking_export, 'BATCH_SIZE', 7)
+    monkeypatch.setattr(booking_export, 'CHUNK_SIZE', 256)
+    room_id = add_room(hotel_db, '101')
+    for n in range(100):
+        add_booking(hotel_db, room_id, '2024-05-01', '2024-05-02', guest_name=f'Guest {n}')
+
+    chunks = list(booking_export.export_chunks(booking_export.iter_bookings(hotel_db, 1),
+                                               booking_export.BOOKING_COLUMNS, 'csv'))
+    assert len(chunks) > 10
+    assert max(len(chunk) for chunk in chunks) < 512
+    assert len(read_csv(b''.join(chunks))) == 100
@@ -0,0 +1,112 @@
+"""
+Tests for race-free booking writes and the room-night guard
+"""
+import datetime
+import threading
+import pytest
+import database
+import room_nights
+from conftest import add_room, add_booking
+
+START = datetime.date.today() + datetime.timedelta(days=20)
+
+
+def day(offset):
+    return (START + datetime.timedelta(days=offset)).isoformat()
+
+
+def owner_client():
+    import multi_hotel_app
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+    return client
+
+
+def booking_form(room_id, check_in, check_out, guest='Guest'):
+    return {'guest_name': guest, 'guest_email': '', 'guest_phone': '', 'room_id': room_id,
+            'check_in_date': day(check_in), 'check_out_date': day(check_out), 'guest_count': 1}
+
+
+def held_nights(db_path):
+    conn = database.connect(db_path)
+    try:
+        return conn.execute('SELECT room_id, night, booking_id FROM room_nights ORDER BY room_id, night').fetchall()
+    finally:
+        conn.close()
+
+
+def confirmed_bookings(db_path):
+    conn = database.connect(db_path)
+    try:
+        return conn.execute("SELECT id FROM bookings WHERE booking_status = 'confirmed'").fetchall()
+    finally:
+        conn.close()
+
+
+def test_parallel_bookings_of_one_room(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    barrier = threading.Barrier(12)
+
+    def book(n):
+        client = owner_client()
+        barrier.wait()
+        # Overlapping stays: every pair shares at least one night
+        client.post('/owner/add-booking', data=booking_form(room_id, n % 3, 4, guest=f'Guest {n}'))
+
+    threads = [threading.Thread(target=book, args=(n,)) for n in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(confirmed_bookings(hotel_db)) == 1
+    booking_id = confirmed_bookings(hotel_db)[0][0]
+    assert {row[2] for row in held_nights(hotel_db)} == {booking_id}
+
+
+def test_edit_cannot_take_another_bookings_nights(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    client = owner_client()
+    client.post('/owner/add-booking', data=booking_form(room_id, 0, 3, guest='A'))
+    client.post('/owner/add-booking', data=booking_form(room_id, 5, 7, guest='B'))
+
+    response = client.post('/owner/bookings/2/edit', data=booking_form(room_id, 2, 6, guest='B'))
+    assert b'Room is not available' in response.data
+    # Moving within its own nights and into free ones is fine
+    client.post('/owner/bookings/2/edit', data=booking_form(room_id, 4, 8, guest='B'))
+    assert [night for _, night, booking in held_nights(hotel_db) if booking == 2] == \
+        [day(4), day(5), day(6), day(7)]
+
+    client.post('/owner/bookings/1/cancel')
+    client.post('/owner/add-booking', data=booking_form(room_id, 1, 3, guest='C'))
+    assert len(held_nights(hotel_db)) == 6
+    assert len(confirmed_bookings(hotel_db)) == 2
+
+
+def test_guard_rejects_writers_that_skip_the_check(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    add_booking(hotel_db, room_id, '2030-01-01', '2030-01-05')
+    conn = database.connect(hotel_db)
+    try:
+        room_nights.rebuild(conn)
+        cursor = conn.cursor()
+        with pytest.raises(room_nights.RoomUnavailable):
+            room_nights.claim(cursor, [(99, room_id, '2030-01-04', '2030-01-06')])
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+def test_rebuild_keeps_earliest_of_legacy_double_bookings(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    first = add_booking(hotel_db, room_id, '2030-01-01', '2030-01-03')
+    add_booking(hotel_db, room_id, '2030-01-02', '2030-01-04')
+    conn = database.connect(hotel_db)
+    try:
+        assert room_nights.rebuild(conn) == 3
+        conn.commit()
+    finally:
+        conn.close()
+    assert [(night, booking) for _, night, booking in held_nights(hotel_db)] == \
+        [('2030-01-01', first), ('2030-01-02', first), ('2030-01-03', first + 1)]
@@ -0,0 +1,150 @@
+"""
+Tests for bulk booking import
+"""
+import io
+import random
+import datetime
+import database
+import daily_stats
+from booking_import import BookingImporter, find_conflicts
+from conftest import add_room, add_booking
+
+HEADER = 'room_number,guest_name,check_in_date,check_out_date,guest_count,payment_status,booking_status\n'
+
+
+def import_text(db_path, text, **kwargs):
+    return BookingImporter(db_path).import_csv(1, io.StringIO(HEADER + text), **kwargs)
+
+
+def booking_count(db_path):
+    conn = database.connect(db_path)
+    count = conn.execute('SELECT COUNT(*) FROM bookings').fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_find_conflicts_sweep():
+    existing = [(1, '2024-06-10', '2024-06-12', 7)]
+    candidates = [
+        (1, '2024-06-08', '2024-06-10', 'back-to-back before'),
+        (1, '2024-06-12', '2024-06-14', 'back-to-back after'),
+        (1, '2024-06-11', '2024-06-13', 'starts inside existing'),
+        (1, '2024-06-05', '2024-06-11', 'existing starts inside'),
+        (1, '2024-06-13', '2024-06-15', 'overlaps other candidate'),
+        (2, '2024-06-10', '2024-06-12', 'other room'),
+    ]
+    # 'back-to-back before' only overlaps 'existing starts inside', which isn't imported
+    assert find_conflicts(existing, candidates) == {
+        'starts inside existing': 'overlaps existing booking #7',
+        'existing starts inside': 'overlaps existing booking #7',
+        'overlaps other candidate': 'overlaps line back-to-back after',
+    }
+
+
+def test_find_conflicts_rechecks_stays_behind_a_rejected_candidate():
+    # A is rejected for E; B, which only overlaps A, is imported
+    existing = [(1, '2024-06-05', '2024-06-06', 'E')]
+    candidates = [(1, '2024-06-01', '2024-06-10', 'A'), (1, '2024-06-02', '2024-06-04', 'B')]
+    assert find_conflicts(existing, candidates) == {'A': 'overlaps existing booking #E'}
+
+
+def test_find_conflicts_accepts_only_disjoint_stays():
+    rng = random.Random(7)
+    day = lambda n: (datetime.date(2024, 1, 1) + datetime.timedelta(days=n)).isoformat()
+
+    def stay(key):
+        start = rng.randint(0, 60)
+        return (rng.randint(1, 3), day(start), day(start + rng.randint(1, 6)), key)
+
+    existing = [stay(f'e{n}') for n in range(15)]
+    candidates = [stay(n) for n in range(200)]
+    overlap = lambda a, b: a[0] == b[0] and a[1] < b[2] and b[1] < a[2]
+
+    conflicts = find_conflicts(existing, candidates)
+    accepted = [c for c in candidates if c[3] not in conflicts]
+    assert accepted
+    for n, a in enumerate(accepted):
+        assert not any(overlap(a, e) for e in existing)
+        assert not any(overlap(a, b) for b in accepted[n + 1:])
+    for c in candidates:
+        if c[3] in conflicts:
+            # Rejected only for an existing booking or a stay that is imported
+            assert any(overlap(c, other) for other in existing + accepted if other is not c)
+
+
+def test_import_inserts_valid_rows_and_reports_the_rest(hotel_db):
+    add_room(hotel_db, '101', price=80.0)
+    room_id = add_room(hotel_db, '102', capacity=1)
+    existing = add_booking(hotel_db, room_id, '2030-01-10', '2030-01-12')
+
+    result = import_text(hotel_db,
+        '101,Past Guest,2023-03-01,2023-03-04,2,paid,checked_out\n'
+        '101,Future Guest,2030-01-01,2030-01-03,1,pending,confirmed\n'
+        '999,Nobody,2030-01-01,2030-01-02,1,,\n'
+        '101,Backwards,2030-02-05,2030-02-01,1,,\n'
+        '102,Crowd,2030-03-01,2030-03-02,3,,\n'
+        '102,Clash,2030-01-11,2030-01-13,1,,\n'
+        '101,Same Room Again,2030-01-02,2030-01-04,1,,\n'
+        '102,Cancelled Clash,2030-01-11,2030-01-13,1,,cancelled\n')
+
+    assert result['imported'] == 3 and result['total'] == 8
+    assert result['errors'] == [
+        (4, "unknown room '999'"),
+        (5, 'check_out_date must be after check_in_date'),
+        (6, 'guest_count must be between 1 and the room capacity of 1'),
+        (7, f'room 102 is already booked: overlaps existing booking #{existing}'),
+        (8, 'room 101 is already booked: overlaps line 3'),
+    ]
+
+    conn = database.connect(hotel_db)
+    rows = conn.execute('''
+        SELECT id, guest_name, total_amount, payment_status, booking_status FROM bookings
+        WHERE id != ? ORDER BY id
+    ''', (existing,)).fetchall()
+    stored = conn.execute('SELECT * FROM hotel_daily_stats ORDER BY stat_date').fetchall()
+    messages = conn.execute('SELECT message FROM notification_outbox').fetchall()
+    conn.close()
+
+    assert [row[0] for row in rows] == result['booking_ids']
+    assert [row[1:] for row in rows] == [('Past Guest', 240.0, 'paid', 'checked_out'),
+                                         ('Future Guest', 160.0, 'pending', 'confirmed'),
+                                         ('Cancelled Clash', 200.0, 'pending', 'cancelled')]
+    conn = database.connect(hotel_db)
+    expected = daily_stats.compute_daily_stats(conn.cursor())
+    conn.close()
+    assert {(r[0], r[1]): list(r[2:]) for r in stored if any(r[2:])} == \
+        {key: [v[0], round(v[1], 2), round(v[2], 2), round(v[3], 2), v[4]] for key, v in expected.items()}
+    assert len(messages) == 1
+    assert 'Bookings imported: 3' in messages[0][0] and 'Rows rejected: 5' in messages[0][0]
+
+
+def test_dry_run_and_strict_write_nothing(hotel_db):
+    add_room(hotel_db, '101')
+    rows = '101,A,2030-01-01,2030-01-03,1,,\n101,B,2030-01-02,2030-01-04,1,,\n'
+
+    result = import_text(hotel_db, rows, dry_run=True)
+    assert result['imported'] == 1 and len(result['errors']) == 1
+    result = import_text(hotel_db, rows, strict=True)
+    assert result['imported'] == 0 and len(result['errors']) == 1
+    assert booking_count(hotel_db) == 0
+
+    result = BookingImporter(hotel_db).import_csv(1, io.StringIO('guest_name,check_in_date\nA,2030-01-01\n'))
+    assert result['errors'] == [(1, 'Missing column(s): room_number, check_out_date')]
+
+
+def test_admin_upload(hotel_db):
+    import multi_hotel_app
+    add_room(hotel_db, '101')
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='admin')
+
+    data = (HEADER + '101,Guest,2030-01-01,2030-01-03,1,,\n101,Clash,2030-01-02,2030-01-03,1,,\n').encode()
+    response = client.post('/admin/hotels/1/import-bookings',
+                           data={'bookings_file': (io.BytesIO(data), 'bookings.csv')},
+                           content_type='multipart/form-data')
+    assert response.status_code == 200
+    page = response.get_data(as_text=True)
+    assert 'Imported 1 of 2 booking(s)' in page
+    assert 'room 101 is already booked: overlaps line 2' in page
+    assert booking_count(hotel_db) == 1
@@ -0,0 +1,91 @@
+"""
+Tests for keyset-paginated owner booking listings
+"""
+import re
+import pytest
+from conftest import add_room, add_booking
+from booking_listing import BookingListing, encode_cursor
+
+
+@pytest.fixture
+def listing(hotel_db):
+    return BookingListing(hotel_db)
+
+
+def owner_client():
+    import multi_hotel_app
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+    return client
+
+
+def all_pages(listing, limit, **filters):
+    ids, cursor = [], None
+    while True:
+        page = listing.page(1, cursor=cursor, limit=limit, **filters)
+        ids.extend(row[0] for row in page['bookings'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids
+
+
+def test_pages_cover_every_booking_once_newest_first(listing, hotel_db):
+    room_id = add_room(hotel_db, '101')
+    # Several bookings share a created_at second; the id breaks the tie
+    created = ['2024-01-01 10:00:00'] * 4 + ['2024-01-02 09:00:00'] * 3 + ['2023-12-31 23:59:59']
+    ids = [add_booking(hotel_db, room_id, '2024-02-01', '2024-02-02', created_at=c) for c in created]
+
+    expected = sorted(ids, key=lambda i: (created[ids.index(i)], i), reverse=True)
+    for limit in (1, 3, 8, 50):
+        assert all_pages(listing, limit) == expected
+
+
+def test_filters(listing, hotel_db):
+    room_id = add_room(hotel_db, '101')
+    paid = add_booking(hotel_db, room_id, '2024-03-01', '2024-03-02', payment_status='paid')
+    cancelled = add_booking(hotel_db, room_id, '2024-03-05', '2024-03-06', booking_status='cancelled')
+    later = add_booking(hotel_db, room_id, '2024-04-01', '2024-04-02')
+
+    assert all_pages(listing, 2, status='cancelled') == [cancelled]
+    assert all_pages(listing, 2, payment_status='paid') == [paid]
+    assert sorted(all_pages(listing, 2, check_in_from='2024-03-02', check_in_to='2024-04-01')) == [cancelled, later]
+
+
+def test_json_endpoint_pages_and_rejects_bad_cursor(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    ids = [add_booking(hotel_db, room_id, '2024-02-01', '2024-02-02', guest_name=f'Guest {n}') for n in range(3)]
+    client = owner_client()
+
+    first = client.get('/api/owner/bookings?limit=2').json
+    assert [b['id'] for b in first['bookings']] == ids[:0:-1]
+    assert first['bookings'][0]['room_number'] == '101'
+    second = client.get(f"/api/owner/bookings?limit=2&cursor={first['next_cursor']}").json
+    assert [b['id'] for b in second['bookings']] == [ids[0]] and second['next_cursor'] is None
+
+    assert client.get('/api/owner/bookings?cursor=not-a-cursor').status_code == 400
+    assert client.get(f"/api/owner/bookings?status=cancelled&cursor={encode_cursor('9999', 0)}").json == \
+        {'bookings': [], 'next_cursor': None}
+
+
+def test_owner_bookings_page_renders_first_page(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    for n in range(60):
+        add_booking(hotel_db, room_id, '2024-02-01', '2024-02-02', guest_name=f'Guest {n}')
+
+    html = owner_client().get('/owner/bookings').get_data(as_text=True)
+    assert len(re.findall(r'onclick="viewBooking\(\d+\)"', html)) == 50
+    assert 'id="loadMore"' in html and 'data-cursor=""' not in html
+
+
+def test_owner_bookings_stats_cover_every_booking(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    add_booking(hotel_db, room_id, '2030-02-01', '2030-02-02', payment_status='paid', total_amount=250.0)
+    add_booking(hotel_db, room_id, '2030-02-03', '2030-02-04')
+    add_booking(hotel_db, room_id, '2030-02-05', '2030-02-06', booking_status='cancelled')
+
+    html = owner_client().get('/owner/bookings').get_data(as_text=True)
+    cards = dict((label, value) for value, label in
+                 re.findall(r'<h4>([^<]+)</h4>\s*<p class="mb-0">([^<]+)</p>', html))
+    assert cards == {'Total Bookings': '3', 'Confirmed': '2', 'Pending Payment': '1',
+                     'Total Revenue': '₹250'}
@@ -0,0 +1,129 @@
+"""
+Tests for the trigger-maintained change log and /api/changes
+"""
+import re
+import datetime
+import database
+import change_log
+from change_log import ChangeFeed
+from conftest import add_room, add_booking
+
+
+def execute(db_path, sql, params=()):
+    conn = database.connect(db_path)
+    try:
+        cursor = conn.execute(sql, params)
+        conn.commit()
+        return cursor.lastrowid
+    finally:
+        conn.close()
+
+
+def add_document(db_path, booking_id, document_id):
+    return execute(db_path, '''
+        INSERT INTO guest_documents (booking_id, guest_name, document_type, document_id,
+                                     file_path, file_name, uploaded_at)
+        VALUES (?, 'Ann', 'passport', ?, 'x.jpg', 'x.jpg', '2030-01-01 10:00:00')
+    ''', (booking_id, document_id))
+
+
+def test_writes_from_any_path_are_logged(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    feed = ChangeFeed(hotel_db)
+    start = feed.changes(1)
+    assert start['reset'] and start['bookings']['upserted'] == []
+
+    first = add_booking(hotel_db, room_id, '2030-01-01', '2030-01-03')
+    second = add_booking(hotel_db, room_id, '2030-01-05', '2030-01-06')
+    execute(hotel_db, "UPDATE bookings SET payment_status = 'paid' WHERE id = ?", (first,))
+    execute(hotel_db, "INSERT INTO check_in_out (booking_id, check_in_time) VALUES (?, '2030-01-01 14:00:00')",
+            (first,))
+    document = add_document(hotel_db, first, 'P1')
+
+    changes = feed.changes(1, start['cursor'])
+    assert not changes['reset'] and not changes['has_more']
+    bookings = {booking['id']: booking for booking in changes['bookings']['upserted']}
+    assert sorted(bookings) == [first, second]
+    assert bookings[first]['payment_status'] == 'paid'
+    assert bookings[first]['checked_in'] and not bookings[first]['checked_out']
+    assert [doc['document_id'] for doc in changes['guest_documents']['upserted']] == ['P1']
+
+    # Nothing new since the returned cursor; then a delete
+    assert feed.changes(1, changes['cursor'])['bookings']['upserted'] == []
+    execute(hotel_db, 'DELETE FROM guest_documents WHERE id = ?', (document,))
+    later = feed.changes(1, changes['cursor'])
+    assert later['guest_documents'] == {'upserted': [], 'deleted': [document]}
+
+
+def test_pages_hotels_and_stale_cursors(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    feed = ChangeFeed(hotel_db)
+    since = feed.changes(1)['cursor']
+    ids = [add_booking(hotel_db, room_id, f'2030-02-{day:02d}', f'2030-02-{day + 1:02d}') for day in (1, 3, 5)]
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    execute(hotel_db, '''
+        INSERT INTO hotels (id, name, address, owner_name, owner_email, created_at)
+        VALUES (2, 'Other', 'Street', 'Owner', 'o@example.com', ?)
+    ''', (now,))
+    other_room = add_room(hotel_db, '201', hotel_id=2)
+    add_booking(hotel_db, other_room, '2030-02-01', '2030-02-02', hotel_id=2)
+
+    seen, cursor = [], since
+    while True:
+        page = feed.changes(1, cursor, limit=2)
+        seen += [booking['id'] for booking in page['bookings']['upserted']]
+        cursor = page['cursor']
+        if not page['has_more']:
+            break
+    assert seen == ids
+
+    execute(hotel_db, 'UPDATE change_log SET changed_at = 0 WHERE id <= ?', (since + 2,))
+    conn = database.connect(hotel_db)
+    assert change_log.prune(conn) == 2
+    conn.commit()
+    conn.close()
+    assert feed.changes(1, since)['reset']
+    assert not feed.changes(1, since + 2)['reset']
+    assert feed.changes(1, 10 ** 6)['reset']
+
+
+def test_changes_endpoint(hotel_db):
+    import multi_hotel_app
+    room_id = add_room(hotel_db, '101')
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+
+    cursor = client.get('/api/changes').get_json()['cursor']
+    booking_id = add_booking(hotel_db, room_id, '2030-03-01', '2030-03-02')
+    client.post(f'/owner/bookings/{booking_id}/cancel')
+    changes = client.get(f'/api/changes?since={cursor}').get_json()
+    assert [(booking['id'], booking['booking_status']) for booking in changes['bookings']['upserted']] == \
+        [(booking_id, 'cancelled')]
+
+    assert client.get('/api/changes?since=latest').status_code == 400
+    assert client.get('/api/changes?limit=0').status_code == 400
+
+
+def test_live_pages_render_the_change_cursor(hotel_db):
+    import multi_hotel_app
+    room_id = add_room(hotel_db, '101')
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+
+    page = client.get('/owner/bookings').get_data(as_text=True)
+    cursor = re.search(r'data-hotel-changes-cursor="(\d+)"', page).group(1)
+    assert int(cursor) == client.get('/api/changes').get_json()['cursor']
+
+    # Changes made after the page rendered are replayed, deletions included
+    kept = add_booking(hotel_db, room_id, '2030-03-01', '2030-03-02')
+    removed = add_booking(hotel_db, room_id, '2030-04-01', '2030-04-02')
+    conn = database.connect(hotel_db)
+    conn.execute('DELETE FROM bookings WHERE id = ?', (removed,))
+    conn.commit()
+    conn.close()
+    changes = client.get(f'/api/changes?since={cursor}').get_json()
+    assert not changes['reset']
+    assert [booking['id'] for booking in changes['bookings']['upserted']] == [kept]
+    assert changes['bookings']['deleted'] == [removed]
@@ -0,0 +1,81 @@
+"""
+Tests for streaming chatbot answers over Server-Sent Events
+"""
+import json
+import time
+import pytest
+from fake_openai import FakeOpenAIServer
+from llm_gateway import LLMGateway
+from response_cache import ResponseCache
+from conftest import add_room
+
+
+@pytest.fixture
+def owner_client(hotel_db, monkeypatch):
+    import multi_hotel_app
+    monkeypatch.setattr(multi_hotel_app.ai_chatbot, 'cache', ResponseCache())
+    add_room(hotel_db, '101')
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+    return client
+
+
+def use_server(monkeypatch, base_url):
+    import multi_hotel_app
+    monkeypatch.setattr(multi_hotel_app.ai_chatbot, 'gateway', LLMGateway(api_key='test', base_url=base_url))
+
+
+def read_events(response):
+    """(seconds since start, event type, data) for each event as it arrives"""
+    start = time.perf_counter()
+    events, buffer = [], ''
+    for chunk in response.response:
+        buffer += chunk.decode() if isinstance(chunk, bytes) else chunk
+        while '\n\n' in buffer:
+            raw, buffer = buffer.split('\n\n', 1)
+            fields = dict(line.split(': ', 1) for line in raw.splitlines())
+            events.append((time.perf_counter() - start, fields.get('event', 'message'), json.loads(fields['data'])))
+    return events
+
+
+def test_answer_is_streamed_token_by_token(owner_client, monkeypatch):
+    reply = '🏨 Occupancy is 0% today, with no check-ins.'
+    with FakeOpenAIServer(reply=reply, token_delay=0.1) as server:
+        use_server(monkeypatch, server.url)
+        response = owner_client.post('/owner/chatbot/stream', json={'message': 'Any tips for this week?'}, buffered=False)
+        assert response.mimetype == 'text/event-stream'
+        events = read_events(response)
+
+    deltas = [data['delta'] for _, kind, data in events if kind == 'message']
+    assert ''.join(deltas) == reply
+    assert len(deltas) == len(reply.split())
+    assert events[-1][1] == 'done'
+    # The first token arrives long before the last one
+    assert events[-1][0] - events[0][0] > 0.5
+    assert server.calls[0]['stream'] is True
+
+
+def test_repeated_question_is_served_from_cache(owner_client, monkeypatch):
+    import multi_hotel_app
+    with FakeOpenAIServer(reply='Revenue is $0.00 today.') as server:
+        use_server(monkeypatch, server.url)
+        read_events(owner_client.post('/owner/chatbot/stream', json={'message': 'Ideas for the weekend?'}))
+        events = read_events(owner_client.post('/owner/chatbot/stream', json={'message': 'ideas for the weekend'}))
+        # The non-streaming endpoint shares the cache
+        answer = owner_client.post('/owner/chatbot', json={'message': 'Ideas for the weekend'}).get_json()
+
+    assert [(kind, data) for _, kind, data in events] == [
+        ('message', {'delta': 'Revenue is $0.00 today.'}), ('done', {})]
+    assert answer == {'response': 'Revenue is $0.00 today.'}
+    assert len(server.calls) == 1
+    assert multi_hotel_app.ai_chatbot.cache.stats()['hits'] == 2
+
+
+def test_upstream_failure_becomes_error_event(owner_client, monkeypatch):
+    use_server(monkeypatch, 'http://127.0.0.1:9/v1')
+    events = read_events(owner_client.post('/owner/chatbot/stream', json={'message': 'Any tips for this week?'}))
+    assert [kind for _, kind, _ in events] == ['error']
+    assert 'Error' in events[0][2]['error']
+
+    assert owner_client.post('/owner/chatbot/stream', json={}).status_code == 400
@@ -0,0 +1,94 @@
+"""
+Tests for the incrementally maintained hotel_daily_stats rollup
+"""
+import datetime
+import database
+import daily_stats
+from conftest import add_room, add_booking
+
+
+def rollup_rows(db_path):
+    conn = database.connect(db_path)
+    try:
+        rows = conn.execute('''
+            SELECT hotel_id, stat_date, bookings, revenue, paid_revenue, arrival_paid_revenue, occupied_room_nights
+            FROM hotel_daily_stats
+            WHERE bookings != 0 OR revenue != 0 OR paid_revenue != 0
+               OR arrival_paid_revenue != 0 OR occupied_room_nights != 0
+            ORDER BY hotel_id, stat_date
+        ''').fetchall()
+    finally:
+        conn.close()
+    return rows
+
+
+def rebuilt_rows(db_path):
+    conn = database.connect(db_path)
+    try:
+        daily_stats.backfill(conn)
+        conn.commit()
+    finally:
+        conn.close()
+    return rollup_rows(db_path)
+
+
+def test_contributions_of_one_booking():
+    booking = (1, '2030-03-01 10:00:00', '2030-03-05', '2030-03-08', 300.0, 'paid', 'confirmed')
+    contributions = daily_stats.booking_contributions(booking)
+    assert contributions[(1, '2030-03-01')] == [1, 300.0, 300.0, 0.0, 0]
+    assert contributions[(1, '2030-03-05')] == [0, 0.0, 0.0, 300.0, 1]
+    assert contributions[(1, '2030-03-07')][4] == 1
+    assert (1, '2030-03-08') not in contributions
+
+    cancelled = booking[:-1] + ('cancelled',)
+    assert not daily_stats.booking_contributions(cancelled)
+
+
+def test_route_writes_keep_rollup_in_sync(hotel_db):
+    import multi_hotel_app
+    room_id = add_room(hotel_db, '101', price=100.0)
+    other_room = add_room(hotel_db, '102', price=150.0)
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+
+    start = datetime.date.today() + datetime.timedelta(days=10)
+    def day(offset):
+        return (start + datetime.timedelta(days=offset)).isoformat()
+
+    for guest, check_in, check_out in (('A', 0, 3), ('B', 3, 5), ('C', 6, 7)):
+        client.post('/owner/add-booking', data={
+            'guest_name': guest, 'guest_email': '', 'guest_phone': '', 'room_id': room_id,
+            'check_in_date': day(check_in), 'check_out_date': day(check_out), 'guest_count': 1,
+        })
+    incremental = rollup_rows(hotel_db)
+    assert sum(row[6] for row in incremental) == 6
+    assert sum(row[3] for row in incremental) == 600.0
+
+    client.post('/owner/bookings/1/mark-paid')
+    client.post('/owner/bookings/2/cancel')
+    client.post('/owner/bookings/3/edit', data={
+        'guest_name': 'C', 'guest_email': '', 'guest_phone': '', 'room_id': other_room,
+        'check_in_date': day(6), 'check_out_date': day(9), 'guest_count': 1,
+    })
+    client.post('/owner/bookings/1/checkout', json={'notes': ''})
+
+    incremental = rollup_rows(hotel_db)
+    assert incremental == rebuilt_rows(hotel_db)
+    assert sum(row[4] for row in incremental) == 300.0
+    assert sum(row[6] for row in incremental) == 6
+
+
+def test_admin_dashboard_reads_rollup(hotel_db):
+    import multi_hotel_app
+    room_id = add_room(hotel_db, '101')
+    month_start = datetime.date.today().replace(day=1).isoformat()
+    add_booking(hotel_db, room_id, '2030-01-01', '2030-01-02', payment_status='paid',
+                total_amount=75.0, created_at=f'{month_start} 08:00:00')
+
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='admin')
+    response = client.get('/admin/dashboard')
+    assert response.status_code == 200
+    assert b'75' in response.data
@@ -0,0 +1,92 @@
+"""
+Tests for the pooled SQLite connection layer
+"""
+import threading
+import database
+
+
+def test_pragmas_applied(tmp_path):
+    pool = database.ConnectionPool(str(tmp_path / 'pool.db'))
+    conn = pool.connect()
+    try:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+        assert conn.execute('PRAGMA cache_size').fetchone()[0] == -16000
+    finally:
+        conn.close()
+
+
+def test_connection_reused_across_checkouts(tmp_path):
+    pool = database.ConnectionPool(str(tmp_path / 'pool.db'))
+    first = pool.connect()
+    raw = first._raw()
+    first.close()
+    second = pool.connect()
+    assert second._raw() is raw
+    second.close()
+
+    stats = pool.stats()
+    assert stats['misses'] == 1
+    assert stats['hits'] == 1
+    assert stats['open_connections'] == 1
+    assert stats['idle_connections'] == 1
+
+
+def test_nested_checkouts_share_transaction(tmp_path):
+    pool = database.ConnectionPool(str(tmp_path / 'pool.db'))
+    outer = pool.connect()
+    outer.execute('CREATE TABLE t (x INTEGER)')
+    outer.execute('INSERT INTO t VALUES (1)')
+
+    inner = pool.connect()
+    assert inner.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 1
+    inner.close()
+
+    # Inner close must not return the connection while outer still holds it
+    assert outer.in_transaction
+    outer.commit()
+    outer.close()
+    assert pool.stats()['open_connections'] == 1
+
+
+def test_uncommitted_work_rolled_back_on_release(tmp_path):
+    pool = database.ConnectionPool(str(tmp_path / 'pool.db'))
+    conn = pool.connect()
+    conn.execute('CREATE TABLE t (x INTEGER)')
+    conn.commit()
+    conn.execute('INSERT INTO t VALUES (1)')
+    conn.close()
+
+    conn = pool.connect()
+    assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+    conn.close()
+
+
+def test_waits_counted_when_pool_exhausted(tmp_path):
+    pool = database.ConnectionPool(str(tmp_path / 'pool.db'), max_connections=1)
+    held = pool.connect()
+    acquired = threading.Event()
+
+    def worker():
+        conn = pool.connect()
+        acquired.set()
+        conn.close()
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    assert not acquired.wait(0.2)
+    held.close()
+    thread.join(5)
+
+    assert acquired.is_set()
+    stats = pool.stats()
+    assert stats['waits'] == 1
+    assert stats['open_connections'] == 1
+
+
+def test_release_thread_returns_leaked_connection(tmp_path):
+    pool = database.ConnectionPool(str(tmp_path / 'pool.db'))
+    pool.connect()
+    pool.connect()
+    pool.release_thread()
+    assert pool.stats()['idle_connections'] == 1
@@ -0,0 +1,139 @@
+"""
+Tests for content-addressed document storage
+"""
+import io
+import os
+from werkzeug.datastructures import FileStorage
+import database
+from conftest import add_room, add_booking
+
+
+def upload(content, filename='scan.pdf'):
+    return FileStorage(stream=io.BytesIO(content), filename=filename)
+
+
+def test_uploads_are_stored_by_content_hash(doc_manager, booking_id):
+    content = b'%PDF-1.4 passport scan'
+    result = doc_manager.save_document(upload(content), booking_id, 'Guest', 'passport', 'P1')
+
+    content_hash = doc_manager.generate_file_hash(content)
+    assert result['file_path'] == os.path.join(doc_manager.upload_folder, content_hash[:2], content_hash[2:4],
+                                               f'{content_hash}.pdf')
+    with open(result['file_path'], 'rb') as f:
+        assert f.read() == content
+    assert not result['deduplicated']
+
+
+def test_duplicate_upload_shares_file_and_skips_optimization(doc_manager, booking_id, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(doc_manager.optimizer, 'submit', lambda db_name, file_path: submitted.append(file_path))
+
+    first = doc_manager.save_document(upload(b'same scan', 'a.jpg'), booking_id, 'Guest A', 'passport', 'P1')
+    second = doc_manager.save_document(upload(b'same scan', 'b.jpg'), booking_id, 'Guest B', 'passport', 'P2')
+
+    assert second['deduplicated']
+    assert second['file_path'] == first['file_path']
+    assert submitted == [first['file_path']]
+    assert second['optimization_status'] == 'pending'
+
+
+def test_file_removed_with_last_reference(doc_manager, booking_id, hotel_db):
+    first = doc_manager.save_document(upload(b'shared'), booking_id, 'Guest A', 'passport', 'P1')
+    second = doc_manager.save_document(upload(b'shared'), booking_id, 'Guest B', 'passport', 'P2')
+    file_path = first['file_path']
+
+    assert doc_manager.delete_document(first['document_id'])
+    assert os.path.exists(file_path)
+    assert doc_manager.delete_document(second['document_id'])
+    assert not os.path.exists(file_path)
+    assert not doc_manager.delete_document(second['document_id'])
+
+
+def test_legacy_documents_without_hash_are_deleted(doc_manager, booking_id, hotel_db, tmp_path):
+    file_path = str(tmp_path / '1_passport_20240101_120000.pdf')
+    with open(file_path, 'wb') as f:
+        f.write(b'old upload')
+    conn = database.connect(hotel_db)
+    cursor = conn.execute('''
+        INSERT INTO guest_documents (booking_id, guest_name, document_type, document_id, file_path,
+                                     file_name, file_size, uploaded_at)
+        VALUES (?, 'Guest', 'passport', 'OLD', ?, 'old.pdf', 10, '2024-01-01 12:00:00')
+    ''', (booking_id, file_path))
+    conn.commit()
+    conn.close()
+
+    assert doc_manager.delete_document(cursor.lastrowid)
+    assert not os.path.exists(file_path)
+
+
+def add_document(db_path, booking_id, guest_name, document_type, document_id):
+    conn = database.connect(db_path)
+    cursor = conn.execute('''
+        INSERT INTO guest_documents (booking_id, guest_name, document_type, document_id, file_path,
+                                     file_name, file_size, uploaded_at)
+        VALUES (?, ?, ?, ?, 'unused', 'scan.pdf', 1, '2024-06-01 10:00:00')
+    ''', (booking_id, guest_name, document_type, document_id))
+    conn.commit()
+    conn.close()
+    return cursor.lastrowid
+
+
+def found(doc_manager, term, hotel_id=1):
+    return [doc['document_id'] for doc in doc_manager.search_documents(hotel_id, term)]
+
+
+def test_search_matches_token_prefixes(doc_manager, booking_id, hotel_db):
+    add_document(hotel_db, booking_id, 'Priya Sharma', 'aadhar', '1234 5678 9012')
+    add_document(hotel_db, booking_id, 'John Smith', 'passport', 'AB-1234567')
+    add_document(hotel_db, booking_id, 'Johnny Sharp', 'license', 'DL-99')
+
+    assert sorted(found(doc_manager, 'shar')) == ['1234 5678 9012', 'DL-99']
+    assert found(doc_manager, 'john smi') == ['AB-1234567']
+    assert found(doc_manager, 'AB-123') == ['AB-1234567']
+    assert found(doc_manager, 'pass') == ['AB-1234567']
+    add_document(hotel_db, booking_id, 'Asha Rao', 'voter_id', 'V-1')
+    assert found(doc_manager, 'voter_id') == ['V-1']
+    assert found(doc_manager, 'mith') == []
+    assert found(doc_manager, '"*') == []
+
+
+def test_search_ranks_document_id_first_and_stays_in_hotel(doc_manager, booking_id, hotel_db):
+    conn = database.connect(hotel_db)
+    conn.execute('''
+        INSERT INTO hotels (id, name, address, owner_name, owner_email, created_at)
+        VALUES (2, 'Other Hotel', '2 Test Street', 'Owner', 'other@test.com', '2024-01-01 00:00:00')
+    ''')
+    conn.commit()
+    conn.close()
+    other_booking = add_booking(hotel_db, add_room(hotel_db, '201', hotel_id=2), '2024-06-01', '2024-06-02',
+                                hotel_id=2)
+
+    add_document(hotel_db, booking_id, 'Kiran Rao', 'passport', 'X1')
+    add_document(hotel_db, booking_id, 'Asha Patel', 'passport', 'KIRAN-7')
+    add_document(hotel_db, other_booking, 'Kiran Other', 'passport', 'KIRAN-8')
+
+    assert found(doc_manager, 'kiran') == ['KIRAN-7', 'X1']
+    assert found(doc_manager, 'kiran', hotel_id=2) == ['KIRAN-8']
+
+
+def test_search_index_follows_updates_and_deletes(doc_manager, booking_id, hotel_db):
+    document = add_document(hotel_db, booking_id, 'Old Name', 'passport', 'P-1')
+    conn = database.connect(hotel_db)
+    conn.execute("UPDATE guest_documents SET guest_name = 'New Name' WHERE id = ?", (document,))
+    conn.commit()
+    conn.close()
+    assert found(doc_manager, 'old') == []
+    assert found(doc_manager, 'new') == ['P-1']
+
+    assert doc_manager.delete_document(document)
+    assert found(doc_manager, 'new') == []
+
+
+def test_search_is_paginated(doc_manager, booking_id, hotel_db):
+    for n in range(5):
+        add_document(hotel_db, booking_id, f'Guest {n}', 'passport', f'ID-{n}')
+
+    first = doc_manager.search_documents_page(1, 'guest', page=1, per_page=2)
+    last = doc_manager.search_documents_page(1, 'guest', page=3, per_page=2)
+    assert len(first['documents']) == 2 and first['has_more']
+    assert len(last['documents']) == 1 and not last['has_more']
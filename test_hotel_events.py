@@ -0,0 +1,115 @@
+"""
+Tests for the per-hotel Server-Sent Events stream
+"""
+import json
+import datetime
+import threading
+import database
+import hotel_events
+from hotel_events import HotelEventBroker
+from conftest import add_room
+
+START = datetime.date.today() + datetime.timedelta(days=40)
+
+
+def day(offset):
+    return (START + datetime.timedelta(days=offset)).isoformat()
+
+
+def owner_client():
+    import multi_hotel_app
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+    return client
+
+
+def book(client, room_id, guest):
+    client.post('/owner/add-booking', data={
+        'guest_name': guest, 'guest_email': '', 'guest_phone': '', 'room_id': room_id,
+        'check_in_date': day(0), 'check_out_date': day(2), 'guest_count': 1,
+    })
+
+
+def parse(chunks):
+    """(id, event, data) for every event in SSE text"""
+    events = []
+    for block in ''.join(chunks).split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in fields:
+            events.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return events
+
+
+def test_stream_delivers_booking_changes(hotel_db):
+    import multi_hotel_app
+    room_id = add_room(hotel_db, '101')
+    client = owner_client()
+    broker = multi_hotel_app.event_broker
+    chunks = []
+    stream = broker.stream(1, duration=1.5)
+    ready = threading.Event()
+
+    def listen():
+        # The stream has picked its starting point once it sends retry:
+        chunks.append(next(stream))
+        ready.set()
+        chunks.extend(stream)
+    listener = threading.Thread(target=listen)
+    listener.start()
+    assert ready.wait(5)
+
+    book(client, room_id, 'Ann')
+    client.post('/owner/bookings/1/mark-paid')
+    client.post('/owner/bookings/1/cancel')
+    listener.join()
+
+    events = parse(chunks)
+    assert [(kind, data['action']) for _, kind, data in events] == \
+        [('booking', 'created'), ('booking', 'paid'), ('booking', 'cancelled')]
+    assert events[-1][2]['booking']['booking_status'] == 'cancelled'
+    assert events[1][2]['booking']['payment_status'] == 'paid'
+    assert broker.stats()['streams'] == 0
+
+
+def test_reconnect_replays_missed_events_for_the_hotel(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    book(owner_client(), room_id, 'Ann')
+    conn = database.connect(hotel_db)
+    try:
+        hotel_events.publish(conn.cursor(), 2, 'refresh', {'reason': 'import', 'count': 1})
+        conn.commit()
+    finally:
+        conn.close()
+
+    broker = HotelEventBroker(hotel_db)
+    events = parse(broker.stream(1, last_event_id=0, duration=0.1))
+    assert [(event_id, data['booking']['guest_name']) for event_id, _, data in events] == [(1, 'Ann')]
+    assert parse(broker.stream(1, last_event_id=1, duration=0.1)) == []
+    assert [data['count'] for _, _, data in parse(broker.stream(2, last_event_id=0, duration=0.1))] == [1]
+
+
+def test_event_stream_route(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    client = owner_client()
+    book(client, room_id, 'Ann')
+
+    response = client.get('/owner/events', headers={'Last-Event-ID': '0'}, buffered=False)
+    assert response.mimetype == 'text/event-stream'
+    body = iter(response.response)
+    assert next(body).decode() == 'retry: 3000\n\n'
+    (event_id, kind, data), = parse([next(body).decode()])
+    assert (event_id, kind, data['action']) == (1, 'booking', 'created')
+    response.close()
+
+    response = client.get('/owner/events?last_event_id=x', buffered=False)
+    assert response.status_code == 200
+    response.close()
+
+
+def test_only_live_pages_open_the_stream(hotel_db):
+    client = owner_client()
+    for page in ('/owner/dashboard', '/owner/bookings'):
+        assert b'data-hotel-events=' in client.get(page).data
+    # A stream holds a server thread; pages that don't follow changes leave it closed
+    assert b'data-hotel-events=' not in client.get('/owner/rooms').data
@@ -0,0 +1,70 @@
+"""
+Tests for the shared hotel metrics service and its cache
+"""
+import datetime
+from hotel_metrics import HotelMetrics
+from conftest import add_room, add_booking
+
+
+def test_metrics_aggregate_bookings(hotel_db):
+    today = datetime.date.today()
+    tomorrow = (today + datetime.timedelta(days=1)).isoformat()
+    month_start = today.replace(day=1).isoformat()
+    room_a = add_room(hotel_db, '101', room_type='Standard')
+    room_b = add_room(hotel_db, '102', room_type='Deluxe')
+    add_room(hotel_db, '103', room_type='Deluxe')
+
+    add_booking(hotel_db, room_a, today.isoformat(), tomorrow, payment_status='paid',
+                total_amount=120.0, created_at=f'{month_start} 09:00:00')
+    add_booking(hotel_db, room_b, tomorrow, (today + datetime.timedelta(days=3)).isoformat(),
+                total_amount=80.0)
+    add_booking(hotel_db, room_b, today.isoformat(), tomorrow, booking_status='cancelled')
+
+    metrics = HotelMetrics(hotel_db).get_metrics(1)
+    assert metrics['hotel_name'] == 'Test Hotel'
+    assert metrics['total_rooms'] == 3
+    assert metrics['occupied_rooms'] == 1
+    assert metrics['today_checkins'] == 1
+    assert metrics['today_revenue'] == 120.0
+    assert metrics['monthly_booked_revenue'] == 120.0
+    assert metrics['pending_payments_count'] == 1
+    assert metrics['pending_payments_amount'] == 80.0
+    assert metrics['upcoming_bookings'] == 2
+    assert sorted(metrics['room_breakdown']) == [('Deluxe', 2, 0), ('Standard', 1, 1)]
+    assert len(metrics['recent_bookings']) == 2
+
+
+def test_metrics_cached_until_the_hotel_changes(hotel_db, monkeypatch):
+    metrics = HotelMetrics(hotel_db, ttl=60)
+    computed = []
+    compute = metrics._compute
+    monkeypatch.setattr(metrics, '_compute', lambda hotel_id: computed.append(hotel_id) or compute(hotel_id))
+    room_id = add_room(hotel_db, '101')
+    assert metrics.get_metrics(1)['total_rooms'] == 1
+    assert metrics.get_metrics(1)['total_rooms'] == 1
+    assert computed == [1]
+
+    # Writes by any process (here: straight to the database) are picked up
+    add_room(hotel_db, '102')
+    assert metrics.get_metrics(1)['total_rooms'] == 2
+    add_booking(hotel_db, room_id, '2030-01-01', '2030-01-02')
+    assert metrics.get_metrics(1)['pending_payments_count'] == 1
+    assert computed == [1, 1, 1]
+
+    metrics.invalidate(1)
+    metrics.get_metrics(1)
+    assert computed == [1, 1, 1, 1]
+
+
+def test_booking_write_invalidates_dashboard_metrics(hotel_db):
+    import multi_hotel_app
+    room_id = add_room(hotel_db, '101')
+    booking_id = add_booking(hotel_db, room_id, '2030-01-01', '2030-01-02', total_amount=50.0)
+    assert multi_hotel_app.hotel_metrics.get_metrics(1)['pending_payments_count'] == 1
+
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+    assert client.post(f'/owner/bookings/{booking_id}/mark-paid').json == {'success': True}
+
+    assert multi_hotel_app.hotel_metrics.get_metrics(1)['pending_payments_count'] == 0
@@ -0,0 +1,79 @@
+"""
+Tests for background image optimization of uploaded documents
+"""
+import io
+import os
+from PIL import Image
+from werkzeug.datastructures import FileStorage
+import database
+
+
+def upload(content, filename):
+    return FileStorage(stream=io.BytesIO(content), filename=filename)
+
+
+def jpeg_bytes(size=(3000, 2000)):
+    buffer = io.BytesIO()
+    Image.linear_gradient('L').resize(size).convert('RGB').save(buffer, 'JPEG', quality=100)
+    return buffer.getvalue()
+
+
+def document_row(db_path, document_id):
+    conn = database.connect(db_path)
+    row = conn.execute('SELECT optimization_status, file_size, file_path FROM guest_documents WHERE id = ?',
+                       (document_id,)).fetchone()
+    conn.close()
+    return row
+
+
+def test_upload_returns_before_optimization_and_records_result(doc_manager, booking_id, hotel_db):
+    content = jpeg_bytes()
+    result = doc_manager.save_document(upload(content, 'passport.jpg'), booking_id, 'Guest', 'passport', 'P1')
+    assert result['success'] and result['optimization_status'] == 'pending'
+
+    assert doc_manager.optimizer.wait_idle(timeout=30)
+    status, file_size, file_path = document_row(hotel_db, result['document_id'])
+    assert status == 'optimized'
+    assert file_size == os.path.getsize(file_path) < len(content)
+    with Image.open(file_path) as img:
+        assert img.size[0] <= 1920 and img.size[1] <= 1080
+    assert doc_manager.get_booking_documents(booking_id)[0]['optimization_status'] == 'optimized'
+
+
+def test_failed_optimization_keeps_original(doc_manager, booking_id, hotel_db):
+    content = b'not really a jpeg'
+    result = doc_manager.save_document(upload(content, 'id.jpg'), booking_id, 'Guest', 'aadhar', 'A1')
+    assert doc_manager.optimizer.wait_idle(timeout=30)
+
+    status, _, file_path = document_row(hotel_db, result['document_id'])
+    assert status == 'failed'
+    with open(file_path, 'rb') as f:
+        assert f.read() == content
+
+
+def test_non_images_skip_optimization(doc_manager, booking_id, hotel_db):
+    result = doc_manager.save_document(upload(b'%PDF-1.4', 'licence.pdf'), booking_id, 'Guest', 'license', 'L1')
+    assert result['optimization_status'] is None
+    assert document_row(hotel_db, result['document_id'])[0] is None
+
+
+def test_resume_pending_after_restart(doc_manager, booking_id, hotel_db, tmp_path):
+    file_path = str(tmp_path / 'left_over.png')
+    Image.new('RGBA', (2500, 2500), (10, 20, 30, 255)).save(file_path)
+    conn = database.connect(hotel_db)
+    conn.execute('''
+        INSERT INTO guest_documents (booking_id, guest_name, document_type, document_id, file_path,
+                                     file_name, file_size, uploaded_at, optimization_status)
+        VALUES (?, 'Guest', 'passport', 'P2', ?, 'left_over.png', 0, '2024-06-01 10:00:00', 'pending')
+    ''', (booking_id, file_path))
+    conn.commit()
+    conn.close()
+
+    assert doc_manager.optimizer.resume_pending(hotel_db) == 1
+    assert doc_manager.optimizer.wait_idle(timeout=30)
+    conn = database.connect(hotel_db)
+    status = conn.execute("SELECT optimization_status FROM guest_documents WHERE document_id = 'P2'").fetchone()[0]
+    conn.close()
+    assert status == 'optimized'
+    with Image.open(file_path) as img:
+        assert img.size == (1080, 1080)
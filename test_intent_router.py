@@ -0,0 +1,58 @@
+"""
+Tests for the chatbot's local intent router
+"""
+from ai_chatbot import HotelAIChatbot, INTENT_EXAMPLES, answer_intents, classify_intent, evaluate_router
+from hotel_metrics import HotelMetrics
+from llm_gateway import LLMGateway
+from conftest import add_room, add_booking
+
+ANALYTICS = {
+    'hotel_name': 'Test Hotel', 'total_rooms': 8, 'occupied_rooms': 2, 'today_checkins': 3,
+    'today_checkouts': 1, 'today_revenue': 120.0, 'weekly_revenue': 900.5, 'monthly_revenue': 4000.0,
+    'pending_payments_count': 2, 'pending_payments_amount': 250.0, 'upcoming_bookings': 5,
+    'room_breakdown': [('Deluxe', 3, 1), ('Standard', 5, 1)],
+}
+
+
+def test_labelled_questions():
+    results = evaluate_router(INTENT_EXAMPLES)
+    assert results['missed_routes'] == 0
+    assert results['misclassification_rate'] <= 0.05
+    assert results['routing_rate'] >= 0.5
+
+
+def test_other_dates_and_periods_go_to_the_llm():
+    for question in ("How many rooms are booked next month?", "How many check-ins on Friday?",
+                     "What was occupancy on 2024-05-01?", "How many arrivals this week?"):
+        assert classify_intent(question) == []
+    assert classify_intent("How much revenue did I make this month?") == ['revenue']
+    assert classify_intent("How busy is next week?") == ['upcoming']
+
+
+def test_answers_come_from_analytics():
+    assert answer_intents(['occupancy'], 'occupancy?', ANALYTICS) == \
+        '🏨 Current occupancy: 2/8 rooms (25.0%), 6 available'
+    assert answer_intents(['revenue'], 'Revenue this week?', ANALYTICS) == '💰 Revenue - Last 7 days: $900.50'
+    assert answer_intents(['revenue'], 'Revenue?', ANALYTICS) == \
+        '💰 Revenue - Today: $120.00, Last 7 days: $900.50, This month: $4000.00'
+    assert answer_intents(classify_intent('Check-ins and check-outs today?'), '', ANALYTICS) == \
+        "🛎️ Today's check-ins: 3\n🧳 Today's check-outs: 1"
+    assert answer_intents(['room_types'], '', ANALYTICS).splitlines()[1:] == \
+        ['- Deluxe: 1/3 occupied', '- Standard: 1/5 occupied']
+
+
+def test_figure_questions_skip_the_llm(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    add_booking(hotel_db, room_id, '2030-01-01', '2030-01-03', total_amount=300.0)
+    # Nothing listens here: any API call would fail
+    gateway = LLMGateway(api_key='test', base_url='http://127.0.0.1:9/v1')
+    chatbot = HotelAIChatbot(metrics=HotelMetrics(hotel_db), gateway=gateway)
+
+    assert chatbot.generate_response(1, 'Any pending payments?') == '⏳ 1 pending payments ($300.00)'
+    assert list(chatbot.stream_response(1, 'How many upcoming bookings?')) == \
+        ['📅 Upcoming bookings (next 7 days): 0']
+    assert 'Error' in chatbot.generate_response(1, 'How can I increase occupancy?')
+
+    stats = chatbot.router.stats()
+    assert (stats['answered_locally'], stats['sent_to_llm']) == (2, 1)
+    assert stats['intents'] == {'pending_payments': 1, 'upcoming': 1}
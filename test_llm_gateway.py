@@ -0,0 +1,94 @@
+"""
+Tests for the chatbot's bounded, deadline-aware LLM gateway
+"""
+import time
+import threading
+import pytest
+from fake_openai import FakeOpenAIServer
+from llm_gateway import LLMGateway, LLMBusy, LLMTimeout
+from ai_chatbot import HotelAIChatbot
+from hotel_metrics import HotelMetrics
+from response_cache import ResponseCache
+from conftest import add_room
+
+QUESTION = 'How can I fill more rooms?'
+
+
+def test_slow_model_times_out_and_slot_is_freed():
+    with FakeOpenAIServer(latency=0.5, reply='Late answer') as server:
+        gateway = LLMGateway(api_key='test', base_url=server.url, max_inflight=1, deadline=0.1)
+        start = time.perf_counter()
+        with pytest.raises(LLMTimeout):
+            gateway.complete([{'role': 'user', 'content': 'hi'}], model='fake')
+        assert time.perf_counter() - start < 0.4
+
+        # The cancelled call gave its slot back
+        gateway.deadline = 2
+        assert gateway.complete([{'role': 'user', 'content': 'hi'}], model='fake') == 'Late answer'
+        gateway.close()
+
+    stats = gateway.stats()
+    assert (stats['timed_out'], stats['completed'], stats['in_flight']) == (1, 1, 0)
+
+
+def test_calls_over_the_limit_fail_fast():
+    with FakeOpenAIServer(latency=0.5) as server:
+        gateway = LLMGateway(api_key='test', base_url=server.url, max_inflight=1, queue_wait=0.05)
+        first = threading.Thread(target=gateway.complete, args=([{'role': 'user', 'content': 'hi'}],),
+                                 kwargs={'model': 'fake'})
+        first.start()
+        time.sleep(0.1)
+        start = time.perf_counter()
+        with pytest.raises(LLMBusy):
+            gateway.complete([{'role': 'user', 'content': 'hi'}], model='fake')
+        assert time.perf_counter() - start < 0.3
+        first.join()
+        gateway.close()
+
+    assert gateway.stats()['rejected_busy'] == 1
+    assert len(server.calls) == 1
+
+
+def test_chatbot_falls_back_to_quick_insights(hotel_db):
+    add_room(hotel_db, '101')
+    with FakeOpenAIServer(latency=0.5, reply='Late answer') as server:
+        gateway = LLMGateway(api_key='test', base_url=server.url, deadline=0.1)
+        chatbot = HotelAIChatbot(metrics=HotelMetrics(hotel_db), cache=ResponseCache(), gateway=gateway)
+
+        answer = chatbot.generate_response(1, QUESTION)
+        assert answer.startswith('⚡ The assistant is busy')
+        assert '🏨 Current occupancy: 0/1 rooms' in answer
+        # Stalled streams fall back the same way, before any token was sent
+        pieces = list(chatbot.stream_response(1, 'Any tips for this week?'))
+        assert len(pieces) == 1 and pieces[0].startswith('⚡')
+
+        # Fallbacks are not cached: the next try reaches the model again
+        gateway.deadline = 2
+        assert chatbot.generate_response(1, QUESTION) == 'Late answer'
+        gateway.close()
+
+    assert gateway.stats()['timed_out'] == 2
+
+
+def test_slow_dripping_stream_is_cut_off_at_the_deadline(hotel_db):
+    add_room(hotel_db, '101')
+    reply = ' '.join(f'word{n}' for n in range(40))
+    with FakeOpenAIServer(reply=reply, token_delay=0.05) as server:
+        # Every token arrives well within the deadline, the whole answer doesn't
+        gateway = LLMGateway(api_key='test', base_url=server.url, deadline=0.5)
+        start = time.perf_counter()
+        received = []
+        with pytest.raises(LLMTimeout):
+            for delta in gateway.stream([{'role': 'user', 'content': 'hi'}], model='fake'):
+                received.append(delta)
+        assert time.perf_counter() - start < 1.0
+        assert 0 < len(received) < 40
+
+        chatbot = HotelAIChatbot(metrics=HotelMetrics(hotel_db), cache=ResponseCache(), gateway=gateway)
+        pieces = list(chatbot.stream_response(1, 'Any tips for this week?'))
+        assert pieces[0].startswith('word0') and pieces[-1].startswith('\n\n⚡')
+        gateway.close()
+
+    assert gateway.stats()['timed_out'] == 2
+    # The partial answer was not cached
+    assert chatbot.cache.stats()['entries'] == 0
@@ -0,0 +1,131 @@
+"""
+Tests for the Telegram notification outbox and its delivery worker
+"""
+import database
+import notification_outbox
+from notification_outbox import OutboxWorker, DeliveryError
+from conftest import add_room
+
+
+class FakeSender:
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.sent = []
+
+    def send(self, bot_token, chat_id, text):
+        if self.failures:
+            raise self.failures.pop(0)
+        self.sent.append((bot_token, chat_id, text))
+
+    def close(self):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def configure_chat(db_path, chat_id='555', bot_token='hotel-token'):
+    conn = database.connect(db_path)
+    conn.execute('UPDATE hotels SET telegram_chat_id = ?, telegram_bot_token = ? WHERE id = 1',
+                 (chat_id, bot_token))
+    conn.commit()
+    conn.close()
+
+
+def queue(db_path, message, clock):
+    conn = database.connect(db_path)
+    outbox_id = notification_outbox.enqueue(conn.cursor(), 1, message)
+    conn.execute('UPDATE notification_outbox SET next_attempt_at = ? WHERE id = ?', (clock(), outbox_id))
+    conn.commit()
+    conn.close()
+    return outbox_id
+
+
+def outbox_row(db_path, outbox_id):
+    conn = database.connect(db_path)
+    try:
+        return conn.execute('SELECT status, attempts, last_error FROM notification_outbox WHERE id = ?',
+                            (outbox_id,)).fetchone()
+    finally:
+        conn.close()
+
+
+def test_add_booking_only_queues_notification(hotel_db):
+    import multi_hotel_app
+    room_id = add_room(hotel_db, '101')
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+
+    client.post('/owner/add-booking', data={
+        'guest_name': 'Alice', 'guest_email': '', 'guest_phone': '', 'room_id': room_id,
+        'check_in_date': '2030-01-01', 'check_out_date': '2030-01-03', 'guest_count': 1,
+    })
+
+    assert notification_outbox.outbox_stats(hotel_db)['pending'] == 1
+    conn = database.connect(hotel_db)
+    message = conn.execute('SELECT message FROM notification_outbox').fetchone()[0]
+    conn.close()
+    assert 'Guest: Alice' in message
+
+
+def test_worker_delivers_with_hotel_token(hotel_db):
+    configure_chat(hotel_db)
+    clock = FakeClock()
+    sender = FakeSender()
+    outbox_id = queue(hotel_db, 'hello', clock)
+
+    worker = OutboxWorker(hotel_db, sender=sender, clock=clock)
+    assert worker.run_once() == 1
+    assert sender.sent == [('hotel-token', '555', 'hello')]
+    assert outbox_row(hotel_db, outbox_id) == ('sent', 1, None)
+    assert worker.run_once() == 0
+
+
+def test_worker_retries_with_backoff(hotel_db):
+    configure_chat(hotel_db)
+    clock = FakeClock()
+    sender = FakeSender(failures=[DeliveryError('timeout'), DeliveryError('rate limited', retry_after=60)])
+    outbox_id = queue(hotel_db, 'hello', clock)
+    worker = OutboxWorker(hotel_db, sender=sender, clock=clock)
+
+    worker.run_once()
+    assert outbox_row(hotel_db, outbox_id) == ('pending', 1, 'timeout')
+    assert worker.run_once() == 0  # not due yet
+
+    clock.now += notification_outbox.backoff_delay(1)
+    worker.run_once()
+    assert outbox_row(hotel_db, outbox_id) == ('pending', 2, 'rate limited')
+
+    clock.now += 30
+    assert worker.run_once() == 0  # retry_after beats the 10s backoff
+    clock.now += 30
+    worker.run_once()
+    assert outbox_row(hotel_db, outbox_id)[:2] == ('sent', 3)
+
+
+def test_permanent_failures_are_not_retried(hotel_db):
+    clock = FakeClock()
+    outbox_id = queue(hotel_db, 'no chat configured', clock)
+    worker = OutboxWorker(hotel_db, sender=FakeSender(), clock=clock)
+
+    worker.run_once()
+    assert outbox_row(hotel_db, outbox_id) == ('failed', 1, 'No chat ID configured')
+
+
+def test_abandoned_claims_are_retried(hotel_db):
+    configure_chat(hotel_db)
+    clock = FakeClock()
+    outbox_id = queue(hotel_db, 'hello', clock)
+    worker = OutboxWorker(hotel_db, sender=FakeSender(), clock=clock)
+
+    assert len(worker.claim_batch()) == 1  # worker "dies" before delivering
+    assert worker.run_once() == 0
+    clock.now += notification_outbox.CLAIM_LEASE
+    assert worker.run_once() == 1
+    assert outbox_row(hotel_db, outbox_id)[0] == 'sent'
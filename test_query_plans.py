@@ -0,0 +1,170 @@
+"""
+Query-plan regression suite: every SQL statement in the web app and its
+services must prepare cleanly, and queries against the booking tables must
+be served by an index rather than a full table SCAN
+"""
+import ast
+import re
+import importlib
+import sqlite3
+import pytest
+
+SOURCE_FILES = ['multi_hotel_app.py', 'ai_chatbot.py', 'document_manager.py', 'hotel_metrics.py',
+                'image_optimizer.py', 'booking_import.py', 'room_calendar.py',
+                'room_holds.py', 'hotel_events.py', 'change_log.py', 'telegram_inbox.py',
+                'availability.py', 'booking_listing.py', 'booking_export.py', 'daily_stats.py']
+
+# Tables that grow with booking history (or traffic); a SCAN of these is a regression,
+# including a scan of a partial index, which still reads every row it holds
+HOT_TABLES = {'bookings', 'check_in_out', 'guest_documents', 'rooms', 'telegram_inbox'}
+
+# Statements that legitimately read a whole hot table (or partial index), keyed
+# by a distinctive fragment of the (whitespace-normalised) SQL
+KNOWN_FULL_SCANS = {
+    'SELECT COUNT(*) FROM rooms WHERE is_active = 1': 'platform-wide room count on the admin dashboard',
+    'FROM guest_documents gd LEFT JOIN bookings b ON gd.booking_id = b.id': 'full-text index rebuild',
+    "FROM guest_documents WHERE optimization_status = 'pending'":
+        'image optimizer restart sweep over the pending partial index',
+    "SELECT t.update_id FROM telegram_inbox t WHERE t.status != 'done'":
+        'claiming chat heads walks the open-updates partial index; handled rows are not in it',
+    "SELECT COUNT(*) FROM telegram_inbox WHERE status != 'done'": 'inbox backlog count over the open partial index',
+    'SELECT hotel_id, room_id, check_in_date, check_out_date FROM bookings WHERE booking_status':
+        'room calendar rebuild and consistency check',
+    'SELECT hotel_id, created_at, check_in_date, check_out_date, total_amount, payment_status, '
+    'booking_status FROM bookings': 'daily rollup rebuild',
+}
+
+# Representative SQL for f-string placeholders built at run time, keyed by
+# (file, enclosing function, placeholder source); placeholders naming
+# module-level constants are filled in from the module. A tuple lists
+# variants that are each checked.
+_CALENDAR_BUSY = '((c.month = ? AND c.nights & ?) OR (c.month = ? AND c.nights & ?))'
+FSTRING_FRAGMENTS = {
+    ('availability.py', 'available_rooms', 'busy'): (
+        "SELECT b.room_id FROM bookings b WHERE b.hotel_id = ? "
+        "AND b.booking_status = 'confirmed' AND b.check_in_date < ? AND b.check_out_date > ? AND b.id != ?",
+        f'SELECT c.room_id FROM room_calendar c WHERE c.hotel_id = ? AND {_CALENDAR_BUSY}',
+    ),
+    ('availability.py', 'available_rooms', 'condition'): _CALENDAR_BUSY,
+    ('availability.py', 'is_room_available', 'condition'): _CALENDAR_BUSY,
+    ('booking_listing.py', 'page', "' AND '.join(conditions)"): (
+        'b.hotel_id = ?',
+        'b.hotel_id = ? AND b.booking_status = ? AND b.payment_status = ? AND b.check_in_date >= ? '
+        'AND b.check_in_date <= ? AND (b.created_at, b.id) < (?, ?)',
+    ),
+    ('booking_export.py', 'iter_bookings', "' AND '.join(conditions)"): (
+        'b.hotel_id = ? AND b.created_at >= ? AND b.created_at < ?',
+        'b.hotel_id = ? AND b.check_in_date >= ? AND b.check_in_date <= ?',
+    ),
+    ('booking_export.py', 'iter_revenue', "' AND '.join(conditions)"):
+        's.hotel_id = ? AND s.stat_date >= ? AND s.stat_date <= ?',
+}
+
+_STATEMENT = re.compile(r'^(SELECT|INSERT|UPDATE|DELETE|WITH)\s')
+_TABLE_REF = re.compile(r'\b(?:FROM|JOIN|UPDATE|INTO)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', re.IGNORECASE)
+_NAMED_PARAM = re.compile(r':(\w+)')
+_SQL_KEYWORDS = {'WHERE', 'JOIN', 'LEFT', 'INNER', 'ON', 'GROUP', 'ORDER', 'LIMIT', 'SET', 'VALUES'}
+
+
+def render_fstring(filename, function, node, module):
+    """Every variant of an f-string with its placeholders filled in"""
+    variants = ['']
+    for value in node.values:
+        if isinstance(value, ast.Constant):
+            options = (value.value,)
+        else:
+            source = ast.unparse(value.value)
+            options = FSTRING_FRAGMENTS.get((filename, function, source))
+            if options is None:
+                try:
+                    options = str(eval(source, vars(module)))
+                except NameError:
+                    raise AssertionError(f'{filename}:{node.lineno}: add a FSTRING_FRAGMENTS entry '
+                                         f'for {{{source}}} in {function}()')
+            if isinstance(options, str):
+                options = (options,)
+        variants = [prefix + option for prefix in variants for option in options]
+    return variants
+
+
+def collect_statements():
+    """Yield (location, sql) for every SQL string literal and f-string in SOURCE_FILES"""
+    statements = []
+    for filename in SOURCE_FILES:
+        with open(filename) as f:
+            tree = ast.parse(f.read())
+        module = importlib.import_module(filename[:-3])
+        # The literal parts of an f-string are checked as part of the whole
+        fstring_parts = {id(part) for node in ast.walk(tree) if isinstance(node, ast.JoinedStr)
+                         for part in node.values}
+        functions = {id(child): node.name for node in ast.walk(tree)
+                     if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)) for child in ast.walk(node)}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.JoinedStr):
+                literal = ''.join(part.value for part in node.values if isinstance(part, ast.Constant))
+                if not _STATEMENT.match(literal.lstrip()):
+                    continue
+                variants = render_fstring(filename, functions.get(id(node)), node, module)
+            elif isinstance(node, ast.Constant) and isinstance(node.value, str) and id(node) not in fstring_parts:
+                variants = [node.value]
+            else:
+                continue
+            for number, variant in enumerate(variants):
+                sql = ' '.join(variant.split())
+                if _STATEMENT.match(sql):
+                    suffix = f'#{number + 1}' if len(variants) > 1 else ''
+                    statements.append((f'{filename}:{node.lineno}{suffix}', sql))
+    return statements
+
+
+def dummy_params(sql):
+    """NULL bindings for a statement's positional or named parameters"""
+    named = _NAMED_PARAM.findall(sql)
+    if named:
+        return {name: None for name in named}
+    return [None] * sql.count('?')
+
+
+def table_aliases(sql):
+    """Map every table name and alias used in a statement to its table"""
+    aliases = {}
+    for table, alias in _TABLE_REF.findall(sql):
+        aliases[table] = table
+        if alias and alias.upper() not in _SQL_KEYWORDS:
+            aliases[alias] = table
+    return aliases
+
+
+STATEMENTS = collect_statements()
+
+
+@pytest.fixture(scope='module')
+def schema_db(tmp_path_factory):
+    from multi_hotel_app import setup_database
+    db_name = str(tmp_path_factory.mktemp('plans') / 'multi_hotel.db')
+    setup_database(db_name)
+    conn = sqlite3.connect(db_name)
+    yield conn
+    conn.close()
+
+
+def test_statements_found():
+    assert len(STATEMENTS) > 50
+
+
+@pytest.mark.parametrize('location,sql', STATEMENTS, ids=[loc for loc, _ in STATEMENTS])
+def test_no_full_scan_on_hot_tables(schema_db, location, sql):
+    plan = schema_db.execute(f'EXPLAIN QUERY PLAN {sql}', dummy_params(sql)).fetchall()
+    aliases = table_aliases(sql)
+
+    scans = []
+    for row in plan:
+        detail = row[3]
+        if not detail.startswith('SCAN '):
+            continue
+        table = aliases.get(detail.split()[1], detail.split()[1])
+        if table in HOT_TABLES:
+            scans.append(detail)
+
+    if scans and not any(fragment in sql for fragment in KNOWN_FULL_SCANS):
+        pytest.fail(f'{location} falls back to {scans}: {sql}')
@@ -0,0 +1,132 @@
+"""
+Tests for the AI chatbot response cache
+"""
+import time
+import threading
+import pytest
+from fake_openai import FakeOpenAIServer
+from response_cache import ResponseCache, normalize_question
+from conftest import add_room, add_booking
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_question():
+    assert normalize_question("  What’s my   OCCUPANCY?? ") == "what's my occupancy"
+    assert normalize_question('Revenue today.') == normalize_question('revenue today')
+
+
+def test_ttl_and_lru_eviction():
+    clock = FakeClock()
+    cache = ResponseCache(max_entries=2, ttl=60, clock=clock)
+
+    assert cache.get_or_compute('a', lambda: 1) == (1, 'miss')
+    assert cache.get_or_compute('a', lambda: 2) == (1, 'hit')
+    cache.get_or_compute('b', lambda: 3)
+    cache.get_or_compute('a', lambda: 4)          # refreshes 'a'
+    cache.get_or_compute('c', lambda: 5)          # evicts 'b'
+    assert cache.get_or_compute('b', lambda: 6) == (6, 'miss')
+
+    clock.now += 61
+    assert cache.get_or_compute('b', lambda: 7) == (7, 'miss')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['expirations']) == (2, 5, 2, 1)
+
+
+def test_concurrent_identical_requests_share_one_call():
+    cache = ResponseCache()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return 'answer'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute('q', compute)))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()['in_flight'] == 0:
+        time.sleep(0.001)
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert sorted(source for _, source in results) == ['coalesced'] * 7 + ['miss']
+    assert all(value == 'answer' for value, _ in results)
+    assert cache.stats()['hit_rate'] == 0.875
+
+
+def test_failures_are_not_cached():
+    cache = ResponseCache()
+
+    def fail():
+        raise RuntimeError('upstream down')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute('q', fail)
+    assert cache.get_or_compute('q', lambda: 'ok') == ('ok', 'miss')
+    assert cache.stats()['errors'] == 1
+
+
+def test_interrupted_call_is_not_left_in_flight():
+    cache = ResponseCache()
+    started, release = threading.Event(), threading.Event()
+
+    def boom():
+        started.set()
+        release.wait(5)
+        raise KeyboardInterrupt
+
+    def leader():
+        with pytest.raises(KeyboardInterrupt):
+            cache.get_or_compute('k', boom)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    started.wait(5)
+    call = cache._calls['k']
+    release.set()
+    thread.join(5)
+
+    # Waiters get an error rather than a missing value...
+    assert call.done.is_set() and isinstance(call.error, RuntimeError)
+    # ...and the key isn't stuck behind the dead call
+    assert cache.stats()['in_flight'] == 0
+    assert cache.get_or_compute('k', lambda: 42) == (42, 'miss')
+
+
+def test_chatbot_reuses_answers_until_analytics_change(hotel_db, monkeypatch):
+    import multi_hotel_app
+    from llm_gateway import LLMGateway
+    chatbot = multi_hotel_app.ai_chatbot
+    monkeypatch.setattr(chatbot, 'cache', ResponseCache())
+
+    room_id = add_room(hotel_db, '101')
+    with FakeOpenAIServer(reply='Busy week!') as server:
+        monkeypatch.setattr(chatbot, 'gateway', LLMGateway(api_key='test', base_url=server.url))
+        assert chatbot.generate_response(1, "How can I fill more rooms?") == 'Busy week!'
+        assert chatbot.generate_response(1, "how can i fill  more rooms") == 'Busy week!'
+        assert len(server.calls) == 1
+
+        add_booking(hotel_db, room_id, '2030-01-01', '2030-01-03')
+        multi_hotel_app.hotel_metrics.invalidate(1)
+        chatbot.generate_response(1, "How can I fill more rooms?")
+        assert len(server.calls) == 2
+        assert 'Upcoming Bookings' in server.calls[1]['messages'][0]['content']
+
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='admin')
+    stats = client.get('/admin/chatbot-cache-stats').get_json()
+    assert stats['hits'] == 1 and stats['misses'] == 2
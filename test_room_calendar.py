@@ -0,0 +1,132 @@
+"""
+Tests for the per-room occupancy calendar
+"""
+import io
+import datetime
+import database
+import room_calendar
+from availability import AvailabilityEngine
+from booking_import import BookingImporter
+from room_calendar import RoomCalendar, month_masks
+from conftest import add_room, add_booking
+
+
+def calendar_check(db_path):
+    conn = database.connect(db_path)
+    try:
+        return room_calendar.check(conn.cursor())
+    finally:
+        conn.close()
+
+
+def test_month_masks():
+    assert month_masks('2030-03-01', '2030-03-04') == {'2030-03': 0b111}
+    assert month_masks('2030-01-30', '2030-02-02') == {'2030-01': 0b11 << 29, '2030-02': 0b1}
+    assert month_masks('2030-02-27', '2030-03-01') == {'2030-02': 0b11 << 26}
+    assert month_masks('2030-03-05', '2030-03-05') == {}
+
+
+def test_route_writes_keep_calendar_in_sync(hotel_db):
+    import multi_hotel_app
+    room_id = add_room(hotel_db, '101')
+    other_room = add_room(hotel_db, '102')
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+
+    start = datetime.date.today() + datetime.timedelta(days=25)
+    def day(offset):
+        return (start + datetime.timedelta(days=offset)).isoformat()
+
+    for guest, check_in, check_out in (('A', 0, 3), ('B', 3, 8), ('C', 10, 12)):
+        client.post('/owner/add-booking', data={
+            'guest_name': guest, 'guest_email': '', 'guest_phone': '', 'room_id': room_id,
+            'check_in_date': day(check_in), 'check_out_date': day(check_out), 'guest_count': 1,
+        })
+    calendar = RoomCalendar(hotel_db)
+    assert calendar.booked_nights(1, day(0), 14)[room_id] == 0b110011111111
+    assert calendar_check(hotel_db) == []
+
+    client.post('/owner/bookings/2/cancel')
+    client.post('/owner/bookings/3/edit', data={
+        'guest_name': 'C', 'guest_email': '', 'guest_phone': '', 'room_id': other_room,
+        'check_in_date': day(1), 'check_out_date': day(2), 'guest_count': 1,
+    })
+    client.post('/owner/bookings/1/checkout', json={'notes': ''})
+
+    assert calendar.booked_nights(1, day(0), 14) == {room_id: 0, other_room: 0b10}
+    assert calendar.occupancy_by_night(1, day(0), 3) == [0, 1, 0]
+    assert calendar_check(hotel_db) == []
+
+
+def test_cancelling_an_overlapping_booking_keeps_the_other(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    # Double booking left over from before availability checks
+    add_booking(hotel_db, room_id, '2030-01-30', '2030-02-03')
+    second = add_booking(hotel_db, room_id, '2030-02-01', '2030-02-05')
+
+    conn = database.connect(hotel_db)
+    cursor = conn.cursor()
+    stay = room_calendar.load_stay(cursor, second)
+    cursor.execute("UPDATE bookings SET booking_status = 'cancelled' WHERE id = ?", (second,))
+    room_calendar.record_booking_change(cursor, second, stay)
+    conn.commit()
+    conn.close()
+
+    assert RoomCalendar(hotel_db).booked_nights(1, '2030-01-29', 8)[room_id] == 0b11110
+    assert calendar_check(hotel_db) == []
+
+
+def test_availability_matches_bookings(hotel_db):
+    rooms = [add_room(hotel_db, str(100 + n)) for n in range(4)]
+    add_booking(hotel_db, rooms[0], '2030-01-28', '2030-02-02')
+    add_booking(hotel_db, rooms[1], '2030-02-02', '2030-02-04')
+    add_booking(hotel_db, rooms[2], '2030-01-01', '2030-03-01')
+    add_booking(hotel_db, rooms[3], '2030-02-01', '2030-02-03', booking_status='cancelled')
+    engine = AvailabilityEngine(hotel_db)
+
+    free = [room['id'] for room in engine.available_rooms(1, '2030-02-01', '2030-02-02')]
+    assert free == [rooms[1], rooms[3]]
+    assert engine.is_room_available(rooms[0], '2030-02-02', '2030-02-05')
+    assert not engine.is_room_available(rooms[1], '2030-02-03', '2030-02-10')
+    # Editing a booking may keep its own nights
+    assert engine.is_room_available(rooms[1], '2030-02-03', '2030-02-10', exclude_booking_id=2)
+
+
+def test_import_and_repair(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    csv_text = ('room_number,guest_name,check_in_date,check_out_date,booking_status\n'
+                '101,Ann,2030-05-30,2030-06-02,confirmed\n'
+                '101,Bob,2030-06-10,2030-06-11,cancelled\n')
+    BookingImporter(hotel_db).import_csv(1, io.StringIO(csv_text))
+    assert RoomCalendar(hotel_db).occupancy_by_night(1, '2030-05-29', 5) == [0, 1, 1, 1, 0]
+    assert calendar_check(hotel_db) == []
+
+    conn = database.connect(hotel_db)
+    conn.execute("UPDATE room_calendar SET nights = 4 WHERE month = '2030-06'")
+    conn.commit()
+    assert room_calendar.check(conn.cursor()) == [(room_id, '2030-06', 0b100, 0b1)]
+    room_calendar.rebuild(conn)
+    conn.commit()
+    conn.close()
+    assert calendar_check(hotel_db) == []
+
+
+def test_availability_grid_endpoint(hotel_db):
+    import multi_hotel_app
+    first = add_room(hotel_db, '101')
+    second = add_room(hotel_db, '102')
+    add_booking(hotel_db, first, '2030-01-30', '2030-02-02')
+    add_booking(hotel_db, second, '2030-02-03', '2030-02-10')
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+
+    grid = client.get('/api/availability-grid?start=2030-01-29&days=7').get_json()
+    assert [(room['room_number'], room['booked']) for room in grid['rooms']] == \
+        [('101', '0111000'), ('102', '0000011')]
+    assert grid['free_rooms'] == [2, 1, 1, 1, 2, 1, 1]
+    assert len(client.get('/api/availability-grid').get_json()['rooms'][0]['booked']) == 30
+
+    assert client.get('/api/availability-grid?days=1000').status_code == 400
+    assert client.get('/api/availability-grid?start=tomorrow').status_code == 400
@@ -0,0 +1,116 @@
+"""
+Tests for short-lived room holds
+"""
+import time
+import datetime
+import pytest
+import database
+from availability import AvailabilityEngine
+from room_holds import RoomHolds
+from room_nights import RoomUnavailable
+from conftest import add_room, add_booking
+
+START = datetime.date.today() + datetime.timedelta(days=30)
+
+
+def day(offset):
+    return (START + datetime.timedelta(days=offset)).isoformat()
+
+
+def owner_client():
+    import multi_hotel_app
+    client = multi_hotel_app.app.test_client()
+    with client.session_transaction() as sess:
+        sess.update(user_id=1, user_type='owner', hotel_id=1)
+    return client
+
+
+def hold_count(db_path):
+    conn = database.connect(db_path)
+    try:
+        return conn.execute('SELECT COUNT(*) FROM room_holds').fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_held_room_is_busy_for_everyone_else(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    other_room = add_room(hotel_db, '102')
+    add_booking(hotel_db, other_room, day(5), day(7))
+    holds = RoomHolds(hotel_db)
+    engine = AvailabilityEngine(hotel_db)
+
+    token = holds.place(1, room_id, day(0), day(3))['token']
+    assert [room['id'] for room in engine.available_rooms(1, day(2), day(4))] == [other_room]
+    assert [room['id'] for room in engine.available_rooms(1, day(2), day(4), hold_token=token)] == \
+        [room_id, other_room]
+    assert not engine.is_room_available(room_id, day(1), day(2))
+    assert engine.is_room_available(room_id, day(3), day(5))
+
+    with pytest.raises(RoomUnavailable):
+        holds.place(1, room_id, day(2), day(5))
+    with pytest.raises(RoomUnavailable):
+        holds.place(1, other_room, day(6), day(8))
+    # Re-placing under the same token moves the hold
+    holds.place(1, room_id, day(1), day(2), token=token)
+    assert engine.is_room_available(room_id, day(2), day(5))
+    assert holds.release(token)
+    assert engine.is_room_available(room_id, day(1), day(2))
+
+
+def test_booking_converts_its_hold(hotel_db):
+    import multi_hotel_app
+    room_id = add_room(hotel_db, '101')
+    token = multi_hotel_app.held_rooms.place(1, room_id, day(0), day(3))['token']
+    form = {'guest_name': 'Ann', 'guest_email': '', 'guest_phone': '', 'room_id': room_id,
+            'check_in_date': day(1), 'check_out_date': day(2), 'guest_count': 1}
+    client = owner_client()
+
+    response = client.post('/owner/add-booking', data=form, follow_redirects=True)
+    assert b'being booked by someone else' in response.data
+    client.post('/owner/add-booking', data=dict(form, hold_token=token))
+
+    conn = database.connect(hotel_db)
+    try:
+        assert conn.execute("SELECT guest_name FROM bookings").fetchall() == [('Ann',)]
+    finally:
+        conn.close()
+    assert hold_count(hotel_db) == 0
+
+
+def test_expired_holds_are_ignored_and_swept(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    offset = [-120.0]
+    holds = RoomHolds(hotel_db, ttl=60, clock=lambda: time.time() + offset[0])
+    holds.place(1, room_id, day(0), day(3))
+
+    assert AvailabilityEngine(hotel_db).is_room_available(room_id, day(0), day(3))
+    offset[0] = 0.0
+    assert holds.stats()['active'] == 0
+    assert holds.sweep() == 1
+    assert holds.stats()['swept'] == 1
+
+    fast = RoomHolds(hotel_db, ttl=0.2)
+    fast.place(1, room_id, day(0), day(3))
+    fast.start_sweeper()
+    deadline = time.time() + 5
+    while hold_count(hotel_db) and time.time() < deadline:
+        time.sleep(0.05)
+    assert hold_count(hotel_db) == 0
+
+
+def test_hold_endpoints(hotel_db):
+    room_id = add_room(hotel_db, '101')
+    client = owner_client()
+    body = {'room_id': room_id, 'check_in_date': day(0), 'check_out_date': day(2)}
+
+    hold = client.post('/api/room-holds', json=body).get_json()
+    assert hold['expires_in'] > 0
+    assert client.post('/api/room-holds', json=body).status_code == 409
+    assert client.post('/api/room-holds', json=dict(body, token=hold['token'])).status_code == 200
+    rooms = client.post('/api/available-rooms', json=dict(body, hold_token=hold['token'])).get_json()
+    assert [room['id'] for room in rooms['available_rooms']] == [room_id]
+
+    assert client.delete(f"/api/room-holds/{hold['token']}").get_json() == {'released': True}
+    assert client.post('/api/room-holds', json=dict(body, room_id=999)).status_code == 400
+    assert client.post('/api/room-holds', json={'room_id': room_id}).status_code == 400
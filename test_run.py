@@ -0,0 +1,70 @@
+"""
+Tests for the production launcher: warm-up, fork safety and the pre-fork server
+"""
+import os
+import sys
+import signal
+import subprocess
+import urllib.request
+import database
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+SERVER_SCRIPT = '''
+import sys
+sys.path.insert(0, {root!r})
+import run
+from multi_hotel_app import setup_database, warm_up
+setup_database()
+warm_up()
+server = run.PreforkServer('127.0.0.1', 0, workers=2, graceful_timeout=5)
+server.bind()
+print(server.port, flush=True)
+server.serve_forever()
+print('stopped', flush=True)
+'''
+
+
+def test_warm_up_primes_pool_and_metrics(hotel_db):
+    import multi_hotel_app
+    database.close_all_pools()
+    assert multi_hotel_app.warm_up() == 1
+    assert 1 in multi_hotel_app.hotel_metrics._cache
+    assert database.pool_stats(hotel_db)['idle_connections'] >= 1
+
+
+def test_forked_child_opens_its_own_connections(hotel_db):
+    conn = database.connect(hotel_db)
+    conn.close()
+    parent_pool = database.get_pool(hotel_db)
+
+    pid = os.fork()
+    if pid == 0:
+        ok = False
+        try:
+            child_pool = database.get_pool(hotel_db)
+            conn = database.connect(hotel_db)
+            ok = child_pool is not parent_pool and conn.execute('SELECT COUNT(*) FROM hotels').fetchone()[0] == 1
+            conn.close()
+        finally:
+            os._exit(0 if ok else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert database.get_pool(hotel_db) is parent_pool
+
+
+def test_prefork_server_serves_and_stops_on_sigterm(tmp_path):
+    env = dict(os.environ, OPENAI_API_KEY='test-key')
+    process = subprocess.Popen([sys.executable, '-c', SERVER_SCRIPT.format(root=ROOT)], cwd=tmp_path,
+                               env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        port = int(process.stdout.readline())
+        for _ in range(4):
+            with urllib.request.urlopen(f'http://127.0.0.1:{port}/login', timeout=10) as response:
+                assert response.status == 200
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=15) == 0
+        assert process.stdout.read().strip() == 'stopped'
+    finally:
+        if process.poll() is None:
+            process.kill()
@@ -0,0 +1,59 @@
+"""
+Tests for the per-token Telegram client registry
+"""
+import sqlite3
+import database
+import telegram_clients
+from telegram_clients import TelegramClientRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_one_client_per_token():
+    registry = TelegramClientRegistry()
+    first = registry.get('token-a')
+    assert registry.get('token-a') is first
+    assert registry.get('token-b') is not first
+    assert registry.stats() == {'clients': 2, 'created': 2, 'reused': 1, 'evicted': 0}
+    registry.close_all()
+
+
+def test_idle_clients_are_evicted():
+    clock = FakeClock()
+    registry = TelegramClientRegistry(idle_timeout=60, clock=clock)
+    stale = registry.get('token-a')
+    clock.now = 30
+    registry.get('token-b')
+
+    clock.now = 61
+    fresh = registry.get('token-b')
+    assert registry.stats()['clients'] == 1
+    assert registry.get('token-a') is not stale
+    assert fresh is registry.get('token-b')
+    assert registry.stats()['evicted'] == 1
+    registry.close_all()
+
+
+def test_hotel_target_follows_edits_from_other_processes(hotel_db):
+    telegram_clients.invalidate_hotel_target()
+    assert telegram_clients.get_hotel_target(hotel_db, 1) is None
+
+    # Written through another connection, as the web app would while the
+    # outbox worker holds a cached lookup
+    other = sqlite3.connect(hotel_db)
+    other.execute("UPDATE hotels SET telegram_chat_id = '42', telegram_bot_token = '' WHERE id = 1")
+    other.commit()
+    assert telegram_clients.get_hotel_target(hotel_db, 1) == ('42', None)
+    assert telegram_clients._hotel_targets[(hotel_db, 1)][2] == ('42', None)
+
+    other.execute('DELETE FROM hotel_owners WHERE hotel_id = 1')
+    other.execute('DELETE FROM hotels WHERE id = 1')
+    other.commit()
+    other.close()
+    assert telegram_clients.get_hotel_target(hotel_db, 1) is None
@@ -0,0 +1,159 @@
+"""
+Tests for concurrent Telegram update processing, polling and webhook modes
+"""
+import time
+import threading
+import pytest
+import telegram_clients
+import simple_telegram_bot
+import telegram_webhook
+import telegram_inbox
+from fake_telegram import FakeTelegramServer
+from telegram_inbox import UpdateInbox
+from telegram_updates import UpdateDispatcher
+
+
+@pytest.fixture
+def fake_telegram(monkeypatch):
+    server = FakeTelegramServer().start()
+    registry = telegram_clients.TelegramClientRegistry(api_url=server.url)
+    monkeypatch.setattr(telegram_clients, 'registry', registry)
+    yield server
+    registry.close_all()
+    server.stop()
+
+
+def make_update(update_id, chat_id, text='/help'):
+    return {'update_id': update_id, 'message': {'chat': {'id': chat_id}, 'text': text}}
+
+
+def test_dispatcher_keeps_per_chat_order_and_runs_chats_concurrently():
+    handled = []
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def handler(update):
+        with lock:
+            running.append(update['update_id'])
+            peak.append(len(running))
+        time.sleep(0.01)
+        with lock:
+            running.remove(update['update_id'])
+            handled.append((update['message']['chat']['id'], update['update_id']))
+
+    dispatcher = UpdateDispatcher(handler, max_workers=4)
+    for update_id in range(1, 41):
+        dispatcher.submit(make_update(update_id, chat_id=update_id % 4))
+    assert dispatcher.wait_idle(timeout=10)
+    dispatcher.shutdown()
+
+    for chat_id in range(4):
+        ids = [update_id for chat, update_id in handled if chat == chat_id]
+        assert ids == sorted(ids) and len(ids) == 10
+    assert max(peak) > 1
+    assert dispatcher.stats()['processed'] == 40
+
+
+def test_dispatcher_drops_redelivered_updates_and_pushes_back_when_full():
+    release = threading.Event()
+    dispatcher = UpdateDispatcher(lambda update: release.wait(5), max_workers=1, max_pending=2)
+
+    assert dispatcher.submit(make_update(1, 10), block=False)
+    assert dispatcher.submit(make_update(1, 10), block=False)   # redelivery
+    assert dispatcher.submit(make_update(2, 10), block=False)
+    assert not dispatcher.submit(make_update(3, 10), block=False)
+
+    release.set()
+    assert dispatcher.wait_idle(timeout=5)
+    dispatcher.shutdown()
+    stats = dispatcher.stats()
+    assert (stats['processed'], stats['duplicates'], stats['rejected']) == (2, 1, 1)
+
+
+def test_polling_advances_offset_after_batch(fake_telegram):
+    for chat_id in (101, 102, 101):
+        fake_telegram.push_update(chat_id, '/help')
+
+    dispatcher = UpdateDispatcher(simple_telegram_bot.process_update, max_workers=4)
+    updates = simple_telegram_bot.get_updates()['result']
+    offset = simple_telegram_bot.handle_updates(updates, dispatcher)
+    dispatcher.shutdown()
+
+    assert offset == 4
+    assert len(fake_telegram.sent_messages(101)) == 2
+    assert len(fake_telegram.sent_messages(102)) == 1
+    assert simple_telegram_bot.get_updates(offset)['result'] == []
+
+
+@pytest.fixture
+def inbox_db(tmp_path):
+    from multi_hotel_app import setup_database
+    db_path = str(tmp_path / 'multi_hotel.db')
+    setup_database(db_path)
+    return db_path
+
+
+def test_inbox_orders_chats_across_processes_and_retries_expired_leases(inbox_db):
+    now = [1000.0]
+    # Two inboxes on one database stand in for two web worker processes
+    first = UpdateInbox(None, db_name=inbox_db, clock=lambda: now[0])
+    second = UpdateInbox(None, db_name=inbox_db, clock=lambda: now[0])
+    for update_id, chat_id in ((1, 7), (2, 8), (3, 7), (4, 7)):
+        assert first.store(make_update(update_id, chat_id))
+    assert not second.store(make_update(3, 7))   # redelivery
+
+    # Only the head of each chat is claimable, by one process at a time
+    assert [update['update_id'] for update in first.claim(10)] == [1, 2]
+    assert second.claim(10) == []
+    first.complete(1)
+    assert [update['update_id'] for update in second.claim(10)] == [3]
+
+    # A worker that died mid-handling loses its lease
+    now[0] += telegram_inbox.CLAIM_LEASE + 1
+    assert [update['update_id'] for update in first.claim(10)] == [2, 3]
+    first.complete(2)
+    first.complete(3)
+    assert [update['update_id'] for update in first.claim(10)] == [4]
+    first.complete(4)
+    assert first.pending() == 0
+
+    conn = telegram_inbox.database.connect(inbox_db)
+    now[0] += telegram_inbox.RETENTION + 1
+    assert telegram_inbox.prune(conn, now=now[0]) == 4
+    conn.commit()
+    conn.close()
+
+
+def test_webhook_requires_secret_and_processes_updates(fake_telegram, monkeypatch, inbox_db):
+    inbox = UpdateInbox(simple_telegram_bot.process_update, db_name=inbox_db, max_workers=4)
+    monkeypatch.setattr(telegram_webhook, '_inbox', inbox)
+
+    client = telegram_webhook.create_app(secret=None).test_client()
+    assert client.post(telegram_webhook.WEBHOOK_PATH, json=make_update(1, 7)).status_code == 404
+
+    client = telegram_webhook.create_app(secret='s3cret').test_client()
+    headers = {'X-Telegram-Bot-Api-Secret-Token': 's3cret'}
+    assert client.post(telegram_webhook.WEBHOOK_PATH, json=make_update(1, 7),
+                       headers={'X-Telegram-Bot-Api-Secret-Token': 'wrong'}).status_code == 403
+    assert client.post(telegram_webhook.WEBHOOK_PATH, json={'bogus': 1}, headers=headers).status_code == 400
+
+    for update_id, chat_id in ((1, 7), (2, 8), (3, 7), (3, 7)):
+        response = client.post(telegram_webhook.WEBHOOK_PATH, json=make_update(update_id, chat_id, '/start'),
+                               headers=headers)
+        assert response.get_json() == {'ok': True}
+
+    assert inbox.wait_idle(timeout=10)
+    inbox.shutdown()
+    assert len(fake_telegram.sent_messages(7)) == 2
+    assert len(fake_telegram.sent_messages(8)) == 1
+    assert inbox.stats()['duplicates'] == 1
+
+
+def test_set_webhook_registers_single_connection(fake_telegram):
+    result = telegram_webhook.set_webhook('https://hotel.example.com/', 's3cret', bot_token='token')
+    assert result['ok']
+    assert fake_telegram.webhook['url'] == 'https://hotel.example.com/telegram/webhook'
+    assert fake_telegram.webhook['max_connections'] == '1'
+    assert telegram_webhook.delete_webhook(bot_token='token')['ok']
+    assert fake_telegram.webhook is None